@@ -19,6 +19,8 @@ from ..corpus.corpus import Corpus
 from ..corpus.types import URI
 from ..corpus.loaders.code_library_loader import RCRANLocalCache
 from ..corpus.loaders.schemes import RCranScheme, unmap_scheme
+from ..corpus.util.helpers import env_flag
+from ..corpus.util.tracing import NullTracer, RecordingTracer, span, tracing
 from ..corpus.vector_stores.chromadb_store import ZippedChromaDBStore
 
 
@@ -41,10 +43,13 @@ class BunsenContextConfig:
     ]
     _CONFIG_KEYS_TO_IGNORE = [
         "require-runtime-dependencies",
+        "derive-resources",
     ]
 
     _build_config: dict[str, Any]
     locations: list[URI]
+    # Also add documentation and examples derived from the docstrings of Python libraries to the corpus
+    derive_resources: bool
 
     library_descriptions: dict[str, str]
     libraries: dict[str, dict[str, list[str]]] = {}
@@ -76,6 +81,7 @@ class BunsenContextConfig:
 
         self._build_config = deepcopy(build_config)
         self.locations = []
+        self.derive_resources = bool(build_config.get("derive-resources", False))
 
         for config_opt, transformer in self.CONFIG_LOCATION_MAP.items():
             if config_opt in build_config:
@@ -176,14 +182,40 @@ class BunsenContextHook(BuildHookInterface):
             for location in self.bunsen_config.locations
             if location.scheme == RCranScheme.URI_SCHEME
         ]
-        with RCRANLocalCache(locations=cran_libs):
-            corpus.ingest(
-                self.bunsen_config.locations,
-            )
-            corpus.save_to_dir(corpus_path, overwrite=True)
+        tracer = self.build_tracer()
+        with RCRANLocalCache(locations=cran_libs), tracing(tracer):
+            with span("corpus.ingest"):
+                corpus.ingest(
+                    self.bunsen_config.locations,
+                    derive_resources=self.bunsen_config.derive_resources,
+                )
+            with span("corpus.save"):
+                corpus.save_to_dir(corpus_path, overwrite=True)
+        self.report_trace(tracer)
 
         return corpus_path
 
+    def build_tracer(self) -> NullTracer:
+        """
+        Tracing of the corpus build is enabled by setting the `BUNSEN_TRACE` environment variable to the path to write
+        a Chrome trace to. Setting `BUNSEN_TRACE_MEMORY` also traces memory allocated by each stage.
+        """
+        if not os.environ.get("BUNSEN_TRACE", None):
+            return NullTracer()
+        return RecordingTracer(trace_memory=env_flag("BUNSEN_TRACE_MEMORY"))
+
+    def report_trace(self, tracer: NullTracer):
+        if not isinstance(tracer, RecordingTracer):
+            return
+        trace_path = os.environ["BUNSEN_TRACE"]
+        tracer.write_chrome_trace(trace_path)
+        logger.warning(f"Corpus build trace written to `{trace_path}`\n{tracer.format_summary()}")
+        if tracer.trace_memory:
+            for stage in ("corpus.ingest", "corpus.save"):
+                top_allocations = "\n".join(str(stat) for stat in tracer.top_allocations(stage, limit=5))
+                logger.warning(f"Top allocations at the end of `{stage}`:\n{top_allocations}")
+        tracer.close()
+
     def build_beaker_context(self, base_path: str):
 
         dest_dir = "build/contexts"
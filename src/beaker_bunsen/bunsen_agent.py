@@ -9,6 +9,7 @@ from archytas.tool_utils import AgentRef, LoopControllerRef, tool
 from beaker_kernel.lib.agent import BaseAgent
 
 from beaker_bunsen.corpus.types import QueryResult
+from beaker_bunsen.corpus.util.helpers import estimate_tokens
 
 if typing.TYPE_CHECKING:
     from beaker_kernel.lib.context import BaseContext
@@ -49,6 +50,13 @@ No addtional text is needed in the response, just the code block.
             **kwargs
         )
 
+    async def react_async(self, query: str, react_context: dict = None) -> str:
+        try:
+            return await super().react_async(query, react_context=react_context)
+        finally:
+            # The turn is over, so its timings and counters are complete
+            self.context.finish_turn_telemetry()
+
     @tool()
     async def generate_code(self, code_request: str, agent: AgentRef, loop: LoopControllerRef):
         """
@@ -62,13 +70,15 @@ No addtional text is needed in the response, just the code block.
         """
 
         try:
+            telemetry = self.context.turn_telemetry()
             example_future = self.context.get_example_string(code_request)
             state_future = self.context.get_subkerkel_state_description()
 
-            examples, state_desc = await asyncio.gather(
-                example_future,
-                state_future
-            )
+            with telemetry.span("code_generation.context"):
+                examples, state_desc = await asyncio.gather(
+                    example_future,
+                    state_future
+                )
 
             request_prompt = f"""
 User's Request:
@@ -78,7 +88,7 @@ User's Request:
 """.strip()
 
             prompt = [
-                self.CODE_PROMPT_INTRO.format(self=self),
+                self.context.prompt_fragment("code_intro", lambda: self.CODE_PROMPT_INTRO.format(self=self)).text,
                 request_prompt,
                 self.context.library_description,
             ]
@@ -86,11 +96,13 @@ User's Request:
                 prompt.append(examples)
             if state_desc:
                 prompt.append(state_desc)
-            prompt.append(self.CODE_PROMPT_OUTRO.format(self=self))
+            prompt.append(self.context.prompt_fragment("code_outro", lambda: self.CODE_PROMPT_OUTRO.format(self=self)).text)
 
             code_generation_prompt = "\n\n".join(prompt)
+            telemetry.record("code_generation.tokens", estimate_tokens(code_generation_prompt))
             self.context.beaker_kernel.log("bunsen_prompt_code_gen", code_generation_prompt)
-            response = await agent.inspect(code_generation_prompt)
+            with telemetry.span("code_generation.llm"):
+                response = await agent.inspect(code_generation_prompt)
             preamble, code, coda = re.split(r"```\w*", response)
             loop.set_state(loop.STOP_SUCCESS)
 
@@ -2,7 +2,9 @@ import asyncio
 import json
 import logging
 import os
-from typing import TYPE_CHECKING, Any, Dict, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List
 from dataclasses import dataclass
 
 from beaker_kernel.lib.autodiscovery import LIB_LOCATIONS
@@ -13,6 +15,10 @@ from beaker_kernel.lib.subkernels import autodiscover_subkernels
 from .bunsen_agent import BunsenAgent
 from .corpus.corpus import Corpus
 from .corpus.types import QueryResult, QueryResponse
+from .corpus.util.context_packing import pack_matches, record_tokens
+from .corpus.util.helpers import estimate_tokens
+from .corpus.util.retrieval_cache import RetrievalCache
+from .corpus.util.telemetry import TurnTelemetry, histograms
 
 if TYPE_CHECKING:
     from beaker_kernel.kernel import LLMKernel
@@ -20,6 +26,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Corpora are loaded in the background so that contexts can be constructed without waiting for them
+corpus_loader = ThreadPoolExecutor(thread_name_prefix="bunsen-corpus-loader")
+
 
 class EnvironmentSerializer:
     pass
@@ -37,14 +46,24 @@ class BunsenLanguageLibraries:
     subkernel_cls: type[BaseSubkernel] | None
 
 
+@dataclass
+class PromptFragment:
+    text: str | None
+    token_count: int
+
+
 class BunsenContext(BaseContext):
     agent_cls: BunsenAgent
-    corpus: Corpus
+    corpus_future: Future
 
     enabled_subkernels: list[str]
     bunsen_config: dict[str, Any] | None
     environment_serializer: EnvironmentSerializer
-    _subkernel_state: dict[str, Any] | None
+    retrieval_cache: RetrievalCache
+    _subkernel_state: asyncio.Future | None
+    _static_cache: dict[str, Any]
+    _static_cache_key: tuple
+    _turn_telemetry: TurnTelemetry | None
 
     enabled_subkernels = ["python3"]
 
@@ -62,6 +81,95 @@ Do not guess if you are not sure of an answer. If you are unsure of an answer, a
 unsure of. The user is trusting you to give factual answers and to not just guess.
 """.strip()
 
+    # Token budget for the whole prompt. Retrieved documentation and examples fill, in order of relevance, what is left
+    # after the other sections, up to their own section budgets.
+    PROMPT_TOKEN_BUDGET: int = 8000
+    SECTION_TOKEN_BUDGETS: dict[str, int] = {
+        "documentation": 2500,
+        "examples": 4000,
+    }
+    # Number of matches retrieved for each section, before they are packed in to the budget
+    SECTION_CANDIDATE_COUNTS: dict[str, int] = {
+        "documentation": 10,
+        "examples": 10,
+    }
+    # Matches further than this from the query are never included. None disables the threshold.
+    MAX_MATCH_DISTANCE: float | None = None
+    # Seconds retrieval waits for the corpus to finish loading, after which it is skipped for that request
+    CORPUS_READY_TIMEOUT: float | None = 10.0
+    # Query run against each partition once the corpus is loaded, so the first user turn doesn't pay to load indexes
+    CORPUS_WARM_UP_QUERY: str | None = "warm up"
+
+    # Seconds each section of the auto context may take before it is cancelled. Sections that miss their deadline are
+    # left out of the prompt, or, for those in SECTION_SERVE_STALE, replaced with their last value. None is unbounded.
+    SECTION_DEADLINES: dict[str, float | None] = {
+        "state": 2.0,
+        "context": 2.0,
+        "documentation": 2.0,
+        "examples": 2.0,
+    }
+    SECTION_SERVE_STALE: frozenset[str] = frozenset(("state", "context"))
+
+    # Corpus query results are cached for the current turn. If set, up to this many results are kept for the session.
+    RETRIEVAL_CACHE_SIZE: int = 0
+
+    # Maximum length of the repr of each value in the subkernel state, and of the state description as a whole
+    STATE_VALUE_REPR_LIMIT: int = 200
+    STATE_DESCRIPTION_CHAR_LIMIT: int = 6000
+
+    # Values with more items than this are fingerprinted without their repr, so in place changes to them are only
+    # picked up by the full refresh done every STATE_FULL_REFRESH_INTERVAL fetches.
+    STATE_HASH_SIZE_LIMIT: int = 10_000
+    STATE_FULL_REFRESH_INTERVAL: int = 20
+
+    # Code run in a Python subkernel to fetch only the names that have changed since the last fetch. Names are
+    # fingerprinted by identity, type, size and a hash of their capped repr, so values changed in place are sent again,
+    # and fingerprints are kept in the subkernel between fetches. If there are no fingerprints, e.g. after a restart, or
+    # a full refresh is asked for, the whole namespace is returned.
+    PYTHON_STATE_CODE: str = """
+def _bunsen_fetch_state(_namespace, _repr_limit={repr_limit}, _hash_size_limit={hash_size_limit}, _full={full}):
+    import inspect, reprlib
+    _repr = reprlib.Repr()
+    _repr.maxstring = _repr.maxother = _repr_limit
+    def _describe(value):
+        if callable(value):
+            return "functions", str(value)[:_repr_limit]
+        elif inspect.ismodule(value):
+            return "modules", str(value)[:_repr_limit]
+        try:
+            text = _repr.repr(value)
+        except Exception:
+            text = object.__repr__(value)
+        return "variables", text if len(text) <= _repr_limit else text[:_repr_limit] + "..."
+    previous = _namespace.get("_bunsen_state_fingerprints", None)
+    full = previous is None or _full
+    previous = {{}} if full else previous
+    fingerprints = {{}}
+    changed = {{"modules": {{}}, "variables": {{}}, "functions": {{}}}}
+    for name, value in list(_namespace.items()):
+        if name.startswith('_') or name in ('In', 'Out', 'get_ipython', 'exit', 'quit', 'open'):
+            continue
+        try:
+            size = len(value)
+        except Exception:
+            size = None
+        try:
+            shape = str(getattr(value, "shape", None))
+        except Exception:
+            shape = None
+        description = None if size is not None and size > _hash_size_limit else _describe(value)
+        fingerprint = (id(value), type(value).__qualname__, size, shape, hash(description))
+        fingerprints[name] = fingerprint
+        if previous.get(name, None) == fingerprint:
+            continue
+        kind, text = description or _describe(value)
+        changed[kind][name] = text
+    _namespace["_bunsen_state_fingerprints"] = fingerprints
+    return {{"full": full, "changed": changed, "removed": [name for name in previous if name not in fingerprints]}}
+_bunsen_fetch_state(globals())
+"""
+    STATE_KINDS = ("variables", "functions", "modules")
+
     @classmethod
     def default_payload(cls) -> str:
         return "{}"
@@ -71,12 +179,68 @@ unsure of. The user is trusting you to give factual answers and to not just gues
         beaker_kernel: "LLMKernel",
         config: Dict[str, Any],
     ) -> None:
-        self._subkernel_state = None
+        self._init_caches()
         super().__init__(beaker_kernel, self.agent_cls, config)
-        corpus_dir = self.corpus_location()
-        self.corpus = Corpus.from_dir(corpus_dir)
+        self.start_corpus_loading(self.corpus_location())
         self.bunsen_config = self._load_bunsen_config()
 
+    def _init_caches(self):
+        """
+        Initializes the per-context caches and counters used while building prompts.
+        """
+        self._subkernel_state = None
+        self._subkernel_namespace = {kind: {} for kind in self.STATE_KINDS}
+        self._state_fetch_count = 0
+        self._static_cache = {}
+        self._static_cache_key = ()
+        self._last_section_results = {}
+        self.deadline_misses = Counter()
+        self._turn_telemetry = None
+        self.retrieval_cache = RetrievalCache(max_size=self.RETRIEVAL_CACHE_SIZE)
+
+    def start_corpus_loading(self, corpus_dir: str | None) -> Future:
+        """
+        Starts loading the corpus, and warming it up, in a background thread. See `corpus_ready`.
+        """
+        self.corpus_future = corpus_loader.submit(self._load_corpus, corpus_dir)
+        return self.corpus_future
+
+    def _load_corpus(self, corpus_dir: str | None) -> Corpus:
+        if corpus_dir is None:
+            raise FileNotFoundError(f"Unable to find a corpus for context `{self.slug}`.")
+        corpus = Corpus.from_dir(corpus_dir)
+        if self.CORPUS_WARM_UP_QUERY:
+            for partition in corpus.store.get_partitions():
+                try:
+                    corpus.store.query(query_string=self.CORPUS_WARM_UP_QUERY, partition=partition, limit=1)
+                except Exception as err:
+                    logger.warning(f"Unable to warm up corpus partition `{partition}`: {err}")
+        return corpus
+
+    @property
+    def corpus(self) -> Corpus:
+        """
+        The context's corpus, blocking until it has been loaded. Prefer `await self.corpus_ready()` in async code.
+        """
+        return self.corpus_future.result()
+
+    @corpus.setter
+    def corpus(self, corpus: Corpus):
+        self.corpus_future = Future()
+        self.corpus_future.set_result(corpus)
+
+    async def corpus_ready(self, timeout: float | None = None) -> Corpus | None:
+        """
+        Waits for the corpus to be loaded. Returns None if it isn't ready within `timeout` seconds, or failed to load.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self.corpus_future)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Corpus for context `{self.slug}` is not ready after {timeout} seconds.")
+        except Exception as err:
+            logger.error(f"Corpus for context `{self.slug}` failed to load: {err}", exc_info=err)
+        return None
+
     def _load_bunsen_config(self) -> dict[str, Any]:
         for location in LIB_LOCATIONS:
             target = os.path.join(location, "bunsen", f"{self.slug}.json")
@@ -87,13 +251,12 @@ unsure of. The user is trusting you to give factual answers and to not just gues
         return {}
 
     async def setup(self, context_info=None, parent_header=None):
+        self.invalidate_prompt_fragments()
         return await super().setup(context_info, parent_header)
 
     async def post_execute(self, message):
-        try:
-            self._subkernel_state = await self.get_subkernel_state()
-        except Exception as err:
-            logger.error(msg=str(err), exc_info=err)
+        # Executing code may have changed the state, which is fetched again the next time it is needed
+        self.invalidate_subkernel_state()
 
     def corpus_location(self) -> str | None:
         for location in LIB_LOCATIONS:
@@ -111,17 +274,104 @@ unsure of. The user is trusting you to give factual answers and to not just gues
             return super().available_subkernels()
 
     async def subkernel_state(self) -> dict[str, Any]:
-        if self._subkernel_state:
-            return self._subkernel_state
+        """
+        Returns a snapshot of the subkernel's state. The state is fetched at most once between executions, and
+        concurrent callers share a single fetch.
+        """
+        telemetry = self.turn_telemetry()
+        if self._subkernel_state is None:
+            self._subkernel_state = asyncio.ensure_future(self.fetch_subkernel_state())
+            telemetry.count("state.fetches")
         else:
-            result = await self.get_subkernel_state()
-            return result
+            telemetry.count("state.reused")
+        state_future = self._subkernel_state
+        try:
+            return await asyncio.shield(state_future)
+        except Exception:
+            if self._subkernel_state is state_future:
+                self._subkernel_state = None
+            raise
+
+    def invalidate_subkernel_state(self):
+        self._subkernel_state = None
+
+    def _truncate_value(self, value: Any) -> str:
+        text = value if isinstance(value, str) else str(value)
+        if len(text) > self.STATE_VALUE_REPR_LIMIT:
+            return f"{text[:self.STATE_VALUE_REPR_LIMIT]}..."
+        return text
+
+    async def fetch_subkernel_state(self) -> dict[str, dict[str, str]]:
+        """
+        Fetches the subkernel's state, with each value as a size-capped repr.
+        Python subkernels only send the names that have changed since the last fetch, which are applied to a copy of
+        the namespace kept here. Other subkernels send their full state.
+        """
+        telemetry = self.turn_telemetry()
+        if getattr(self.subkernel, "KERNEL_NAME", None) != "python3":
+            with telemetry.span("state.fetch"):
+                state = await self.get_subkernel_state()
+            if not state:
+                return state
+            return {
+                kind: {name: self._truncate_value(value) for name, value in (state.get(kind, None) or {}).items()}
+                for kind in self.STATE_KINDS
+            }
+
+        with telemetry.span("state.fetch"):
+            self._state_fetch_count += 1
+            interval = self.STATE_FULL_REFRESH_INTERVAL
+            full_refresh = bool(interval) and self._state_fetch_count % interval == 0
+            code = self.PYTHON_STATE_CODE.format(
+                repr_limit=self.STATE_VALUE_REPR_LIMIT,
+                hash_size_limit=self.STATE_HASH_SIZE_LIMIT,
+                full=full_refresh,
+            )
+            diff = (await self.evaluate(code))["return"]
+        if diff["full"]:
+            self._subkernel_namespace = {kind: {} for kind in self.STATE_KINDS}
+        changed_names = set(diff["removed"]).union(*(values.keys() for values in diff["changed"].values()))
+        for values in self._subkernel_namespace.values():
+            for name in changed_names:
+                values.pop(name, None)
+        for kind, values in diff["changed"].items():
+            self._subkernel_namespace[kind].update(values)
+        telemetry.record("state.changed_names", len(changed_names))
+        return {kind: dict(values) for kind, values in self._subkernel_namespace.items()}
+
+    def _cached(self, name: str, build: Callable[[], Any]) -> Any:
+        """
+        Returns the value of `build()`, computed once for the current subkernel and bunsen config.
+        """
+        key = (getattr(self, "subkernel", None), self.bunsen_config)
+        if not (self._static_cache_key and all(a is b for a, b in zip(key, self._static_cache_key))):
+            self._static_cache = {}
+            self._static_cache_key = key
+        if name not in self._static_cache:
+            self._static_cache[name] = build()
+        return self._static_cache[name]
+
+    def prompt_fragment(self, name: str, build: Callable[[], str | None]) -> PromptFragment:
+        """
+        Returns a static section of a prompt, along with its token count, built once for the current subkernel and
+        bunsen config. Fragments are rebuilt when either changes, or after `invalidate_prompt_fragments`.
+        """
+        def build_fragment():
+            text = build()
+            return PromptFragment(text=text, token_count=estimate_tokens(text) if text else 0)
+        return self._cached(f"fragment:{name}", build_fragment)
+
+    def invalidate_prompt_fragments(self):
+        self._static_cache = {}
 
     @property
     def libraries(self) -> dict[str, BunsenLanguageLibraries]:
         """
         Enrich the libraries with information about the subkernel, if available.
         """
+        return self._cached("libraries", self._build_libraries)
+
+    def _build_libraries(self) -> dict[str, BunsenLanguageLibraries]:
         libraries: dict[str, dict[str, str]] = self.bunsen_config.get("libraries", {})
         installed_subkernels = autodiscover_subkernels()
         output = {}
@@ -136,7 +386,11 @@ unsure of. The user is trusting you to give factual answers and to not just gues
     @property
     def library_description(self) -> str:
         """
+        Describes the libraries available in the current subkernel.
         """
+        return self.prompt_fragment("library_description", self._build_library_description).text
+
+    def _build_library_description(self) -> str:
         if not self.libraries:
             return ""
 
@@ -167,49 +421,62 @@ unsure of. The user is trusting you to give factual answers and to not just gues
         state = await self.subkernel_state()
         if not state:
             return None
+        sections = [
+            ("variables", "The coding environment's state currently has the following local variables:"),
+            ("functions", "The coding environment's state currently has the following local functions defined:"),
+            ("modules", "The coding environment's state currently has the following modules imported:"),
+        ]
         output = []
-        if state["variables"]:
-            output.append("The coding environment's state currently has the following local variables:")
-            output.extend(
-                f"    `{var_name}`: `{var_value}`" for var_name, var_value in state["variables"].items()
-            )
-        if state["functions"]:
-            output.append("The coding environment's state currently has the following local functions defined:")
-            output.extend(
-                f"    `{func_name}`: `{func_value}`" for func_name, func_value in state["functions"].items()
-            )
-        if state["modules"]:
-            output.append("The coding environment's state currently has the following modules imported:")
-            output.extend(
-                f"    `{mod_name}`: `{mod_value}`" for mod_name, mod_value in state["modules"].items()
-            )
+        remaining = self.STATE_DESCRIPTION_CHAR_LIMIT
+        for kind, heading in sections:
+            values = state.get(kind, None)
+            if not values:
+                continue
+            output.append(heading)
+            remaining -= len(heading)
+            for shown, (name, value) in enumerate(values.items()):
+                line = f"    `{name}`: `{value}`"
+                if len(line) > remaining:
+                    output.append(f"    ... and {len(values) - shown} more not shown")
+                    remaining = 0
+                    break
+                output.append(line)
+                remaining -= len(line) + 1
         return "\n".join(output)
 
-    async def get_documentation_string(self) -> str:
-        docs = await self.get_documentation(query=self.current_llm_query)
-        if docs:
-            document_str = "\n\n".join(
-                """
+    def pack_section(
+        self,
+        section: str,
+        matches: list[QueryResult] | None,
+        token_budget: int | None = None,
+    ) -> list[QueryResult]:
+        """
+        Packs matches for a section of the prompt in to the section's token budget, or `token_budget` if it is smaller.
+        """
+        section_budget = self.SECTION_TOKEN_BUDGETS.get(section, self.PROMPT_TOKEN_BUDGET)
+        if token_budget is not None:
+            section_budget = min(section_budget, token_budget)
+        return pack_matches(matches, section_budget, max_distance=self.MAX_MATCH_DISTANCE)
+
+    def format_documentation(self, docs: list[QueryResult] | None) -> str | None:
+        if not docs:
+            return None
+        document_str = "\n\n".join(
+            """
 ======== documentation excerpt {num}: {document_id} start ========
 {document}
 ======== documentation excerpt {num}: {document_id} end   ========
-                """.strip().format(document_id=document["record"].id, document=document["record"].content, num=num)
-                for num, document in enumerate(docs, start=1)
-            )
-            return "\n".join([
-                """Below are some excerpts from the documentation that help you. Please use them if they are relevent.""",
-                document_str,
-            ])
-        else:
-            return None
-
-    async def get_example_string(self, query: str) -> str | None:
-        examples: list[QueryResult] = await self.get_examples(
-            query=query
+            """.strip().format(document_id=document["record"].id, document=document["record"].content, num=num)
+            for num, document in enumerate(docs, start=1)
         )
+        return "\n".join([
+            """Below are some excerpts from the documentation that help you. Please use them if they are relevent.""",
+            document_str,
+        ])
+
+    def format_examples(self, examples: list[QueryResult] | None) -> str | None:
         if not examples:
             return None
-
         code_example_str = "\n\n".join(
             """
 ======== example {num}: {example_id} start ========
@@ -230,6 +497,20 @@ If the request from the user is similar enough to one of these examples, use it
             code_example_str,
         ])
 
+    async def get_documentation_string(self, token_budget: int | None = None) -> str | None:
+        docs = await self.get_documentation(
+            query=self.current_llm_query,
+            count=self.SECTION_CANDIDATE_COUNTS["documentation"],
+        )
+        return self.format_documentation(self.pack_section("documentation", docs, token_budget))
+
+    async def get_example_string(self, query: str, token_budget: int | None = None) -> str | None:
+        examples: list[QueryResult] = await self.get_examples(
+            query=query,
+            count=self.SECTION_CANDIDATE_COUNTS["examples"],
+        )
+        return self.format_examples(self.pack_section("examples", examples, token_budget))
+
     async def get_examples(
         self,
         query=None,
@@ -268,49 +549,103 @@ If the request from the user is similar enough to one of these examples, use it
         query=None,
         count=3,
     ):
-        matches = self.corpus.store.query(
-            query_string=query,
+        matches = (await self.query_corpus(
+            query_str=query,
             partition="code",
             limit=count,
-        )["matches"]
+        ))["matches"]
         return matches
 
+    async def run_section(self, section: str, awaitable: Awaitable[Any]) -> Any:
+        """
+        Runs the work for a section of the prompt within the section's deadline. If the deadline is missed the work is
+        cancelled, the miss is counted in `deadline_misses`, and the section's last value is returned if it may be
+        served stale, otherwise None.
+        """
+        deadline = self.SECTION_DEADLINES.get(section, None)
+        telemetry = self.turn_telemetry()
+        try:
+            with telemetry.span(f"prompt.section.{section}"):
+                result = await asyncio.wait_for(awaitable, deadline)
+        except asyncio.TimeoutError:
+            self.deadline_misses[section] += 1
+            telemetry.count(f"prompt.deadline_misses.{section}")
+            logger.warning(f"Prompt section `{section}` missed its deadline of {deadline} seconds and was skipped.")
+            if section in self.SECTION_SERVE_STALE:
+                return self._last_section_results.get(section, None)
+            return None
+        self._last_section_results[section] = result
+        return result
+
     async def build_prompt(
             self,
         ) -> str:
 
         state_description_future = self.get_subkerkel_state_description()
         context_prompt_future = self.get_context_prompt()
-        docs_future = self.get_documentation_string()
+        docs_future = self.get_documentation(
+            query=self.current_llm_query,
+            count=self.SECTION_CANDIDATE_COUNTS["documentation"],
+        )
         current_query = getattr(self.agent, "current_query", None)
         if current_query:
-            example_future = self.get_example_string(current_query)
+            example_future = self.get_examples(
+                query=current_query,
+                count=self.SECTION_CANDIDATE_COUNTS["examples"],
+            )
         else:
             example_future = asyncio.sleep(0.0)
 
-        state_description, context_prompt, docs_result, example_result = await asyncio.gather(
-            state_description_future,
-            context_prompt_future,
-            docs_future,
-            example_future,
+        # Each section is bounded by its own deadline, so one slow section can't hold up the whole prompt
+        state_description, context_prompt, docs, examples = await asyncio.gather(
+            self.run_section("state", state_description_future),
+            self.run_section("context", context_prompt_future),
+            self.run_section("documentation", docs_future),
+            self.run_section("examples", example_future),
         )
 
-        prompt = [
-            self.PROMPT_INTRO,
-            self.library_description,
-            state_description,
-            docs_result,
-            context_prompt,
-            example_result,
-            self.PROMPT_OUTRO
-        ]
-
-        result = "\n\n".join(part for part in prompt if part)
+        telemetry = self.turn_telemetry()
+        with telemetry.span("prompt.assemble"):
+            intro = self.prompt_fragment("intro", lambda: self.PROMPT_INTRO)
+            library_description = self.prompt_fragment("library_description", self._build_library_description)
+            outro = self.prompt_fragment("outro", lambda: self.PROMPT_OUTRO)
+            section_tokens = {
+                "intro": intro.token_count,
+                "library_description": library_description.token_count,
+                "outro": outro.token_count,
+                "state": estimate_tokens(state_description) if state_description else 0,
+                "context": estimate_tokens(context_prompt) if context_prompt else 0,
+            }
+
+            # Retrieved sections get whatever is left of the budget once the other sections are accounted for
+            remaining_budget = self.PROMPT_TOKEN_BUDGET - sum(section_tokens.values())
+            packed_docs = self.pack_section("documentation", docs, remaining_budget)
+            section_tokens["documentation"] = sum(record_tokens(doc["record"]) for doc in packed_docs)
+            remaining_budget -= section_tokens["documentation"]
+            packed_examples = self.pack_section("examples", examples, remaining_budget)
+            section_tokens["examples"] = sum(record_tokens(example["record"]) for example in packed_examples)
+
+            prompt = [
+                intro.text,
+                library_description.text,
+                state_description,
+                self.format_documentation(packed_docs),
+                context_prompt,
+                self.format_examples(packed_examples),
+                outro.text,
+            ]
+
+            result = "\n\n".join(part for part in prompt if part)
+
+        for section, token_count in section_tokens.items():
+            telemetry.record(f"prompt.tokens.{section}", token_count)
+        telemetry.record("prompt.tokens.total", sum(section_tokens.values()))
         return result
 
 
     async def auto_context(self):
-        prompt = await self.build_prompt()
+        with self.turn_telemetry().span("auto_context"):
+            prompt = await self.build_prompt()
         self.beaker_kernel.log("bunsen_auto_context", prompt)
         return prompt
 
@@ -321,9 +656,66 @@ If the request from the user is similar enough to one of these examples, use it
         partition: str = "default",
         limit: int = 5,
     ) -> QueryResponse:
-        results = self.corpus.store.query(
-            query_string=query_str,
-            partition=partition,
-            limit=limit,
-        )
-        return results
+        """
+        Queries the corpus, reusing the response for any query already made in the current turn (or session, if
+        `RETRIEVAL_CACHE_SIZE` is set), so that building the prompt and generating code only query the store once.
+        """
+        self.retrieval_cache.start_turn(self.current_llm_query)
+        telemetry = self.turn_telemetry()
+
+        corpus = await self.corpus_ready(timeout=self.CORPUS_READY_TIMEOUT)
+        if corpus is None:
+            # Answer without retrieved context rather than failing the request. Not cached, so later turns retry.
+            telemetry.count("query.corpus_not_ready")
+            return QueryResponse(query=query_str, matches=[])
+
+        async def run_query() -> QueryResponse:
+            # Queried in a thread so that the event loop, and deadlines, aren't blocked by the store
+            return await asyncio.to_thread(
+                corpus.store.query,
+                query_string=query_str,
+                partition=partition,
+                limit=limit,
+            )
+
+        cached = (partition, query_str, limit) in self.retrieval_cache
+        telemetry.count("retrieval_cache.hits" if cached else "retrieval_cache.misses")
+        with telemetry.span(f"query.{partition}"):
+            response = await self.retrieval_cache.get_or_query(partition, query_str, limit, run_query)
+        if not cached:
+            matches = response.get("matches", None) or []
+            telemetry.record(f"query.{partition}.matches", len(matches))
+            for match in matches:
+                telemetry.record(f"query.{partition}.distance", match["distance"])
+        return response
+
+    def turn_telemetry(self) -> TurnTelemetry:
+        """
+        Returns the timings and counters for the current turn, finishing the previous turn's if the turn has changed.
+        """
+        turn = getattr(self, "current_llm_query", None)
+        if self._turn_telemetry is not None and self._turn_telemetry.turn != turn:
+            self.finish_turn_telemetry()
+        if self._turn_telemetry is None:
+            self._turn_telemetry = TurnTelemetry(turn)
+        return self._turn_telemetry
+
+    def finish_turn_telemetry(self) -> dict[str, Any] | None:
+        """
+        Adds the current turn's telemetry to the in-process histograms and emits it as a `bunsen_turn_telemetry` event.
+        """
+        telemetry, self._turn_telemetry = self._turn_telemetry, None
+        if telemetry is None:
+            return None
+        event = telemetry.finish(histograms)
+        try:
+            self.beaker_kernel.log("bunsen_turn_telemetry", event)
+        except Exception as err:
+            logger.warning(f"Unable to emit telemetry for context `{self.slug}`: {err}")
+        return event
+
+    def dump_telemetry(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the count, sum and percentiles of every timing and counter, aggregated over the turns in this process.
+        """
+        return histograms.dump()
@@ -10,7 +10,7 @@ from typing_extensions import Self
 from .vector_stores.chromadb_store import ZippedChromaDBStore
 from .vector_stores.base_vector_store import VectorStore
 from .loaders import BaseLoader
-from .loaders.schemes import read_from_uri, CorpusResourceScheme, unmap_scheme
+from .loaders.schemes import read_from_uri, read_many, split_derived_uri, CorpusResourceScheme, unmap_scheme
 from .embedders import Embedder
 from .types import (
     Record, DefaultType, Default, URI,
@@ -19,6 +19,7 @@ from .protocols import EmbeddingFunction
 from .resources import ResourceType
 from .util.helpers import common_path_portion
 from .util.logging import logger
+from .util.tracing import span, traced_iter
 
 
 default_resource_partition_map: dict[ResourceType, str] = {
@@ -53,6 +54,9 @@ class Corpus:
     default_embedding_function: EmbeddingFunction | None
     resource_location: str | None
 
+    # Number of resources read at once when saving a corpus
+    SAVE_READ_BATCH_SIZE: int = 64
+
     def __init__(
             self,
             store: VectorStore,
@@ -107,7 +111,15 @@ class Corpus:
             partition: str | DefaultType = Default,
             resource_partition_map: dict[ResourceType, str] = Default,
             embedder_map: dict[ResourceType, Embedder] = Default,
+            derive_resources: bool = False,
     ):
+        """
+        Loads, embeds and adds the resources at `locations` to the store.
+
+        If `derive_resources` is set, loaders that can derive further resources from a single read and parse of a
+        resource (e.g. documentation and examples from the docstrings of a Python module) do so. Derived resources
+        always go to the partition for their own resource type, even if a `partition` is passed in.
+        """
         grouped_locations = defaultdict(list)
 
         batch: dict[str, list[Record]] = defaultdict(list)
@@ -128,40 +140,52 @@ class Corpus:
         for scheme_str, scheme_locations in grouped_locations.items():
             scheme = unmap_scheme(scheme_str)
             loader: BaseLoader = scheme.default_loader()
+            loader.derive_resources = derive_resources
             # Pass all locations in one call to the loader to allow for exclusions, etc
-            for resource in loader.discover(locations=scheme_locations):
-                # Split resource in to properly embedded, records, chunked/split if necessary
-                embedder = embedder_map.get(     # Get embedder from passed in option
-                    resource.resource_type,
-                    default_embedder_map.get(    # If doesn't exist in dict, try to get from defaults
-                        resource.resource_type,
-                        Embedder()               # Finally, default to basic Embedder
+            discovered = traced_iter(loader.discover(locations=scheme_locations), "loader.discover", scheme=scheme_str)
+            for resource in discovered:
+                # A resource can produce records for several partitions, e.g. a code resource can carry documentation
+                # and examples derived from the same parse of its source.
+                for sub_resource in (resource, *resource.derived_resources):
+                    # Split resource in to properly embedded, records, chunked/split if necessary
+                    embedder = embedder_map.get(     # Get embedder from passed in option
+                        sub_resource.resource_type,
+                        default_embedder_map.get(    # If doesn't exist in dict, try to get from defaults
+                            sub_resource.resource_type,
+                            Embedder()               # Finally, default to basic Embedder
+                        )
+                    )
+                    records = traced_iter(
+                        embedder.embed(sub_resource),
+                        "embedder.embed",
+                        resource_type=sub_resource.resource_type,
                     )
-                )
-                records = embedder.embed(resource)
 
-                for record in records:
-                    # Enforce partition if passed in, but otherwise determine partition from resource
-                    if partition is Default:
-                        record_partition = resource_partition_map.get(resource.resource_type)
+                    # Enforce partition if passed in, but otherwise determine partition from resource. Derived
+                    # resources always go to the partition for their type.
+                    if partition is Default or sub_resource is not resource:
+                        record_partition = resource_partition_map.get(sub_resource.resource_type)
                     else:
                         record_partition = partition
 
-                    # Batch records by partition as a loader can generate more than one type of resource
-                    # e.g. a code library loader can generate code, documentation, and example resources
-                    batch[record_partition].append(record)
-                    resource_record_count[record_partition] += 1
-
-                    if batching_enabled and (batch_len(batch) >= batch_size):
-                        logger.debug(f"Adding intermediate batch of {batch_len(batch)} records")
-                        for record_partition, bundle in batch.items():
-                            self.store.add_records(bundle=bundle, partition=record_partition)
-                        batch.clear()
+                    for record in records:
+                        # Batch records by partition as a loader can generate more than one type of resource
+                        # e.g. a code library loader can generate code, documentation, and example resources
+                        batch[record_partition].append(record)
+                        resource_record_count[record_partition] += 1
+
+                        if batching_enabled and (batch_len(batch) >= batch_size):
+                            logger.debug(f"Adding intermediate batch of {batch_len(batch)} records")
+                            for batch_partition, bundle in batch.items():
+                                with span("store.add_records", partition=batch_partition, records=len(bundle)):
+                                    self.store.add_records(bundle=bundle, partition=batch_partition)
+                            batch.clear()
                 # Final add for anything not added in a batch above
                 if batch:
                     logger.debug(f"Adding final batch of {batch_len(batch)} records")
                     for record_partition, bundle in batch.items():
-                        self.store.add_records(bundle=bundle, partition=record_partition)
+                        with span("store.add_records", partition=record_partition, records=len(bundle)):
+                            self.store.add_records(bundle=bundle, partition=record_partition)
                     batch.clear()
                 if resource_record_count:
                     count_by_type_str = ", ".join(
@@ -191,7 +215,8 @@ class Corpus:
         resource_dir = save_dir / "resources"
         resource_dir.mkdir(parents=True)
 
-        temp_store = self.store.clone()
+        with span("save.clone_store"):
+            temp_store = self.store.clone()
 
         partitions = self.store.get_partitions()
         default_partition = self.store.default_partition
@@ -216,7 +241,9 @@ class Corpus:
             partition: [] for partition in partitions
         }
         for partition in partitions:
-            for record in temp_store.get_all(partition=partition, include_embeddings=True):
+            with span("save.get_records", partition=partition):
+                partition_records = temp_store.get_all(partition=partition, include_embeddings=True)
+            for record in partition_records:
                 if record.uri:
                     resources[partition].add(record.uri)
                     records_to_update_by_partition[partition].append(record)
@@ -232,30 +259,44 @@ class Corpus:
 
         uri_remap = {}
         for (partition, resource_set) in resources.items():
-            for resource_uri in resource_set:
-                if resource_uri.scheme in ("file", "zipped-file"):
-                    uri_path = Path(resource_uri.path).relative_to(partition_common_paths[partition])
-                else:
-                    uri_path = Path(resource_uri.path)
-
-                resource_path = Path(partition) / uri_path
-                new_uri = CorpusResourceScheme.get_uri_for_location(resource_path)
-                content = read_from_uri(resource_uri)
-                mode = "wb" if isinstance(content, bytes) else "w"
-                dest = resource_dir / resource_path
-                if not dest.parent.exists():
-                    dest.parent.mkdir(parents=True)
-                with open(dest, mode) as fh:
-                    fh.write(content)
-                uri_remap[resource_uri] = new_uri
+            resource_uris = sorted(resource_set)
+            # Read resources in batches, grouped by scheme, so archives/packages are opened once per batch
+            batches = (
+                resource_uris[idx:idx + self.SAVE_READ_BATCH_SIZE]
+                for idx in range(0, len(resource_uris), self.SAVE_READ_BATCH_SIZE)
+            )
+            for batch_uris in batches:
+                with span("save.read_resources", partition=partition, resources=len(batch_uris)):
+                    contents = read_many(batch_uris)
+                for resource_uri, content in zip(batch_uris, contents):
+                    if resource_uri.scheme in ("file", "zipped-file"):
+                        uri_path = Path(resource_uri.path).relative_to(partition_common_paths[partition])
+                    else:
+                        uri_path = Path(resource_uri.path)
+                    # Derived resources are saved alongside each other, under the resource they came from
+                    _, derived_key = split_derived_uri(resource_uri)
+                    if derived_key:
+                        uri_path = uri_path / derived_key
+
+                    resource_path = Path(partition) / uri_path
+                    new_uri = CorpusResourceScheme.get_uri_for_location(resource_path)
+                    mode = "wb" if isinstance(content, bytes) else "w"
+                    dest = resource_dir / resource_path
+                    if not dest.parent.exists():
+                        dest.parent.mkdir(parents=True)
+                    with open(dest, mode) as fh:
+                        fh.write(content)
+                    uri_remap[resource_uri] = new_uri
 
         for partition, record_set in records_to_update_by_partition.items():
             for record in record_set:
                 if record.uri not in uri_remap:
                     raise ValueError(f"Record that needs to be moved not moved?: {record.uri}")
                 record.uri = uri_remap[record.uri]
-            temp_store.update_records(record_set, partition=partition)
-        temp_store.save_to(destination=store_zipfile)
+            with span("save.update_records", partition=partition, records=len(record_set)):
+                temp_store.update_records(record_set, partition=partition)
+        with span("save.write_store"):
+            temp_store.save_to(destination=store_zipfile)
 
 
     def save_to_zip(self, zipfile_path: str | Path, overwrite: bool = False):
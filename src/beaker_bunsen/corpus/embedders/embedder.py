@@ -3,6 +3,7 @@ from ..protocols import EmbeddingFunction
 from ..types import DefaultType, Default, ValidationError
 from ..resources import Resource, find_splitter_for_resource
 from ..util.logging import logger
+from ..util.tracing import span
 
 
 class Embedder:
@@ -40,7 +41,8 @@ class Embedder:
             # If there is a custom embedding function, apply that for each record
             if embedding_function:
                 for record in records:
-                    record.embedding = embedding_function(resource)
+                    with span("embedder.embedding_function"):
+                        record.embedding = embedding_function(resource)
                     yield record
             else:
                 yield from records
@@ -1,15 +1,19 @@
 from .base import BaseLoader
-from .code_library_loader import BaseCodeLoader, PythonLibraryLoader, RCRANSourceLoader
+from .exclusions import ExclusionMatcher
+from .code_library_loader import BaseCodeLoader, PythonArchiveLoader, PythonLibraryLoader, RCRANSourceLoader
 from .local_file_loader import LocalFileLoader
-from .schemes import read_from_uri, LocalFileScheme
+from .schemes import read_from_uri, read_many, LocalFileScheme
 
 
 __all__ = [
     "BaseLoader",
-    "BaseCodeLoader,"
-    "PythonLibraryLoader,"
-    "LocalFileLoader"
+    "BaseCodeLoader",
+    "ExclusionMatcher",
+    "PythonArchiveLoader",
+    "PythonLibraryLoader",
+    "LocalFileLoader",
     "LocalFileScheme",
     "RCRANSourceLoader",
     "read_from_uri",
+    "read_many",
 ]
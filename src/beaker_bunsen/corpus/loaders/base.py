@@ -1,19 +1,28 @@
 import uuid
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Callable, Optional, TypeAlias
 
+from .exclusions import ExclusionMatcher
 from ..types import Default, DefaultType
 from ..resources import Resource, ResourceFilter
 
 
+# Filter that only needs a location/path to make its decision, so it can be run before a resource is ever opened.
+PathFilter: TypeAlias = Optional[Callable[[str], bool]]
+
+
 class BaseLoader(ABC):
 
     SLUG: str
     URI_SCHEME: str
+    # Separator between the parts of the locations this loader checks exclusions against.
+    EXCLUSION_SEPARATOR: str = "/"
 
     locations: Optional[list[str]]
     metadata: Optional[dict]
     filter: ResourceFilter
+    # Whether to attach resources derived from the same read and parse to discovered resources, for loaders that can.
+    derive_resources: bool = False
 
     def __init__(
             self,
@@ -53,6 +62,13 @@ class BaseLoader(ABC):
     ):
         ...
 
+    def read_many(
+        self,
+        locations: list[str],
+        base: str = "",
+    ) -> list:
+        return [self.read(location, base) for location in locations]
+
 
     def parse_locations(
         self,
@@ -67,17 +83,28 @@ class BaseLoader(ABC):
         return locations, exclusions
 
 
+    def compile_exclusions(
+        self,
+        exclusions: list[str] | ExclusionMatcher | DefaultType = Default,
+    ) -> ExclusionMatcher:
+        if exclusions is Default:
+            exclusions = self.exclusions
+        return ExclusionMatcher.compile(exclusions, separator=self.EXCLUSION_SEPARATOR)
+
     def should_exclude(
         self,
         location: str,
-        exclusions: list[str] | DefaultType = Default
+        exclusions: list[str] | ExclusionMatcher | DefaultType = Default,
+        is_dir: bool = False,
+        root: str = "",
     ):
-        if exclusions is Default:
-            exclusions = self.exclusions
-        for exclusion in exclusions:
-            if exclusion in location:
-                return True
-        return False
+        """
+        Returns True if `location` is excluded. When checking many locations, pass the matcher from
+        `compile_exclusions`, as a list of patterns has to be looked up in the compiled matcher cache on every call.
+        """
+        if not isinstance(exclusions, ExclusionMatcher):
+            exclusions = self.compile_exclusions(exclusions)
+        return exclusions.matches(location, is_dir=is_dir, root=root)
 
     @classmethod
     def get_id_for_resource(cls, resource: Resource):
@@ -1,21 +1,35 @@
 import contextlib
+import hashlib
 import importlib
+import importlib.machinery
 import importlib.util
+import inspect
+import json
 import logging
 import os
 import pkgutil
 import requests
-import sys
-import tarfile
 import tempfile
+import threading
+import time
 from collections import deque, defaultdict
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
 from typing import Any
 
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
 from .base import BaseLoader
-from .schemes import LocalFileScheme, PythonModuleScheme, RCranScheme, read_from_uri
+from .exclusions import ExclusionMatcher
+from .python_source import derive_python_resources
+from .schemes import (
+    LocalFileScheme, PythonArchiveScheme, PythonModuleScheme, RCranScheme, module_path_index, python_archive_index,
+    read_from_uri, read_many, tarball_index,
+)
 from ..types import Default, DefaultType, URI
 from ..resources import CodeResource, ExampleResource, DocumentationResource, ResourceFilter
+from ..util.helpers import default_cache_dir, env_flag
 
 logger = logging.getLogger("beaker_bunsen")
 
@@ -34,11 +48,38 @@ class BaseCodeLoader(BaseLoader):
             uri = self.Scheme.get_uri_for_location(location, base)
         return read_from_uri(uri)
 
+    def read_many(
+        self,
+        locations: list[str],
+        base: str = "",
+    ):
+        uris = [
+            location if location.startswith(self.Scheme.URI_SCHEME) else self.Scheme.get_uri_for_location(location, base)
+            for location in locations
+        ]
+        return read_many(uris)
+
 
 class PythonLibraryLoader(BaseCodeLoader):
 
     Scheme = PythonModuleScheme
     SLUG = "python"
+    EXCLUSION_SEPARATOR = "."
+
+    def __init__(
+        self,
+        locations: list[str] | None = None,
+        metadata: dict | None = None,
+        exclusions: list[str] | None = None,
+        filter: ResourceFilter | None = None,
+        static: bool = True,
+        max_workers: int | None = None,
+        derive_resources: bool = False,
+    ) -> None:
+        super().__init__(locations, metadata, exclusions, filter)
+        self.static = static
+        self.max_workers = max_workers
+        self.derive_resources = derive_resources
 
     def discover(
         self,
@@ -46,6 +87,7 @@ class PythonLibraryLoader(BaseCodeLoader):
         metadata: dict | DefaultType = Default,
         exclusions: list[str] | DefaultType = Default,
         filter: ResourceFilter | DefaultType = Default,
+        static: bool | DefaultType = Default,
     ):
         """
         The `locations` should be Python packages, modules or submodules that are installed via the pyproject
@@ -58,6 +100,15 @@ class PythonLibraryLoader(BaseCodeLoader):
         Note: "from" import syntax is not valid. Loading a module loads the entire module and it's submodules and
         it is not possible to select only certain items from the module.
 
+        By default, modules are discovered statically by walking the package directories found on `sys.path`, which
+        does not import (and so does not execute) the packages or any of their dependencies. Locations that cannot be
+        found this way (e.g. modules provided by custom import hooks) fall back to being discovered via the import
+        system, as they are when `static` is False.
+
+        If `derive_resources` is set, each module's source is parsed once to also produce documentation resources for
+        its docstrings and example resources for any doctests. These are attached to the code resource as
+        `derived_resources`.
+
         Example: locations=["requests", "os.path", "pandas.core", "pandas.util"]
         """
         if locations is Default:
@@ -68,16 +119,53 @@ class PythonLibraryLoader(BaseCodeLoader):
             exclusions = self.exclusions
         if filter is Default:
             filter = self.filter
+        if static is Default:
+            static = self.static
 
         # Update or define locations and exclusions based on '!' prefix in location.
         locations, parsed_exclusions = self.parse_locations(locations)
         exclusions.extend(parsed_exclusions)
+        exclusions = self.compile_exclusions(exclusions)
 
-        modules_to_collect = deque()
+        module_names = []
         for module_name in locations:
             uri = URI(module_name)
             if uri.scheme:
                 module_name = uri.path
+            module_names.append(module_name)
+
+        if static:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                static_modules = list(executor.map(self._walk_static, module_names, [exclusions] * len(module_names)))
+            for module_name, found_modules in zip(module_names, static_modules):
+                if found_modules is None:
+                    logger.info(f"Unable to statically locate module '{module_name}', falling back to the import system")
+                    continue
+                # Record the discovered paths so that later reads of these modules don't need to locate them again
+                module_path_index.update({
+                    found_module_name: origin
+                    for found_module_name, origin in found_modules
+                    if origin and origin.endswith('.py')
+                })
+                for found_module_name, origin in found_modules:
+                    if not origin or not origin.endswith('.py'):
+                        logger.info(f"Skipping importing non-python file {origin}")
+                        continue
+                    with open(origin, 'rb') as source_file:
+                        source = importlib.util.decode_source(source_file.read())
+                    resource = self._create_resource(found_module_name, source, metadata)
+                    if filter and not filter(resource):
+                        continue
+                    yield resource
+            # Only locations that could not be found statically need to be discovered via the import system
+            module_names = [
+                module_name
+                for module_name, found_modules in zip(module_names, static_modules)
+                if found_modules is None
+            ]
+
+        modules_to_collect = deque()
+        for module_name in module_names:
             module_spec = importlib.util.find_spec(module_name)
             if module_spec is None:
                 raise ValueError(
@@ -92,10 +180,12 @@ class PythonLibraryLoader(BaseCodeLoader):
             if getattr(module_spec, "submodule_search_locations", []):
                 subpkg_info: pkgutil.ModuleInfo = pkgutil.iter_modules(path=module_spec.submodule_search_locations)
                 subpkg_specs = (info.module_finder.find_spec(f"{module_spec.name}.{info.name}") for info in subpkg_info)
-                if self.exclusions:
+                if exclusions:
                     subpkg_specs = (
                         spec for spec in subpkg_specs
-                        if not self.should_exclude(spec.name)
+                        if not self.should_exclude(
+                            spec.name, exclusions, is_dir=bool(spec.submodule_search_locations)
+                        )
                     )
                 modules_to_collect.extend(
                     subpkg_specs
@@ -105,122 +195,472 @@ class PythonLibraryLoader(BaseCodeLoader):
                 logger.info(f"Skipping importing non-python file {module_spec.origin}")
                 continue
 
+            module_path_index.add(module_spec.name, module_spec.origin)
             if hasattr(module_spec, "loader"):
                 source = module_spec.loader.get_source(module_spec.name)
             else:
                 source = None
 
-            origin_path = Path(module_spec.origin)
-            for sys_path in sys.path:
-                if origin_path.is_relative_to(sys_path):
-                    basedir = sys_path
-                    break
-            else:
-                basedir = ""
-
-            resource = CodeResource(
-                uri=self.Scheme.get_uri_for_location(module_spec.name),
-                content=source,
-                metadata={
-                    "package": module_spec.name,
-                    "type": "code",
-                    "language": "python3",
-                    **metadata,
-                }
-                # basedir=basedir
-            )
-            resource.id = self.get_id_for_resource(resource)
+            resource = self._create_resource(module_spec.name, source, metadata)
             if filter and not filter(resource):
                 continue
             yield resource
 
+    def _create_resource(self, module_name: str, source: str | None, metadata: dict) -> CodeResource:
+        resource = CodeResource(
+            uri=self.Scheme.get_uri_for_location(module_name),
+            content=source,
+            metadata={
+                "package": module_name,
+                "type": "code",
+                "language": "python3",
+                **metadata,
+            }
+        )
+        resource.id = self.get_id_for_resource(resource)
+        if self.derive_resources and source:
+            resource.derived_resources = derive_python_resources(resource, source, module_name)
+        return resource
+
+    @staticmethod
+    def find_module_static(module_name: str) -> tuple[str | None, list[str] | None] | None:
+        """
+        Locates a module on `sys.path` without importing it or any of its parent packages.
+        Returns a tuple of the module's origin file and, if it is a package, its submodule search locations.
+        Returns None if the module cannot be found on the filesystem.
+        """
+        head, *tail = module_name.split('.')
+        spec = importlib.machinery.PathFinder.find_spec(head)
+        if spec is None:
+            return None
+        origin = spec.origin
+        search_locations = list(spec.submodule_search_locations or []) or None
+        for part in tail:
+            for location in search_locations or []:
+                package_dir = os.path.join(location, part)
+                package_init = os.path.join(package_dir, "__init__.py")
+                if os.path.isfile(package_init):
+                    origin, search_locations = package_init, [package_dir]
+                    break
+                elif os.path.isfile(f"{package_dir}.py"):
+                    origin, search_locations = f"{package_dir}.py", None
+                    break
+            else:
+                return None
+        return origin, search_locations
+
+    @staticmethod
+    def _find_package_init(package_dir: str) -> str | None:
+        # Mirrors `pkgutil.iter_modules`, which only treats directories that contain an `__init__` module as packages.
+        try:
+            with os.scandir(package_dir) as dir_iter:
+                for entry in dir_iter:
+                    if inspect.getmodulename(entry.name) == "__init__" and entry.is_file():
+                        return entry.path
+        except OSError:
+            pass
+        return None
+
+    def _walk_static(
+        self,
+        module_name: str,
+        exclusions: ExclusionMatcher,
+    ) -> list[tuple[str, str | None]] | None:
+        """
+        Walks the module tree below `module_name` on the filesystem, returning `(module_name, origin)` pairs in the
+        same order as they are discovered via the import system.
+        """
+        found = self.find_module_static(module_name)
+        if found is None:
+            return None
+        modules = []
+        modules_to_collect = deque([(module_name, *found)])
+        while modules_to_collect:
+            name, origin, search_locations = modules_to_collect.popleft()
+            modules.append((name, origin))
+            seen = set()
+            for location in search_locations or []:
+                try:
+                    with os.scandir(location) as dir_iter:
+                        entries = sorted(dir_iter, key=lambda entry: entry.name)
+                except OSError:
+                    continue
+                for entry in entries:
+                    submodule_locations = None
+                    submodule_name = inspect.getmodulename(entry.name)
+                    if submodule_name is None and '.' not in entry.name and entry.is_dir():
+                        submodule_origin = self._find_package_init(entry.path)
+                        if submodule_origin is None:
+                            continue
+                        submodule_name = entry.name
+                        submodule_locations = [entry.path]
+                    elif submodule_name:
+                        submodule_origin = entry.path
+                    else:
+                        continue
+                    if submodule_name == "__init__" or submodule_name in seen:
+                        continue
+                    seen.add(submodule_name)
+                    full_name = f"{name}.{submodule_name}"
+                    if exclusions and self.should_exclude(full_name, exclusions, is_dir=bool(submodule_locations)):
+                        continue
+                    modules_to_collect.append((full_name, submodule_origin, submodule_locations))
+        return modules
+
+
+class PythonArchiveLoader(BaseCodeLoader):
+
+    Scheme = PythonArchiveScheme
+    SLUG = "python-archive"
+    EXCLUSION_SEPARATOR = "."
+
+    def __init__(
+        self,
+        locations: list[str] | None = None,
+        metadata: dict | None = None,
+        exclusions: list[str] | None = None,
+        filter: ResourceFilter | None = None,
+        derive_resources: bool = False,
+    ) -> None:
+        super().__init__(locations, metadata, exclusions, filter)
+        self.derive_resources = derive_resources
+
+    def discover(
+        self,
+        locations: list[str] | DefaultType = Default,
+        metadata: dict | DefaultType = Default,
+        exclusions: list[str] | DefaultType = Default,
+        filter: ResourceFilter | DefaultType = Default,
+    ):
+        """
+        The `locations` should be paths to wheel (`.whl`) or sdist (`.tar.gz`, `.zip`) archives of Python packages.
+        The source of every module in the archive is read straight out of the archive, so packages do not need to be
+        installed (or even installable) in the build environment.
+
+        Exclusions are module names, and documentation and example resources can be derived from each module, as they
+        are for the `PythonLibraryLoader`.
+
+        Example: locations=["dist/requests-2.31.0-py3-none-any.whl", "!requests.help"]
+        """
+        if locations is Default:
+            locations = self.locations
+        if metadata is Default:
+            metadata = self.metadata
+        if exclusions is Default:
+            exclusions = self.exclusions
+        if filter is Default:
+            filter = self.filter
+
+        # Update or define locations and exclusions based on '!' prefix in location.
+        locations, parsed_exclusions = self.parse_locations(locations)
+        exclusions.extend(parsed_exclusions)
+        exclusions = self.compile_exclusions(exclusions)
+
+        archive_paths = []
+        for location in locations:
+            uri = URI(location)
+            if uri.scheme:
+                location = uri.path
+            archive_path = os.path.abspath(location)
+            if not (os.path.isfile(archive_path) and python_archive_index.is_archive(archive_path)):
+                raise ValueError(f"Location `{location}` is not a Python wheel or sdist archive.")
+            archive_paths.append(archive_path)
+
+        for archive_path in archive_paths:
+            modules = {
+                module_name: member_name
+                for module_name, member_name in python_archive_index.modules(archive_path).items()
+                if not (exclusions and self.should_exclude(
+                    module_name, exclusions, is_dir=member_name.endswith("/__init__.py")
+                ))
+            }
+            # Read all of the selected members from the archive in one go
+            contents = python_archive_index.read(archive_path, list(modules.values()))
+            for module_name, member_name in modules.items():
+                source = importlib.util.decode_source(contents[member_name])
+                resource = CodeResource(
+                    uri=self.Scheme.get_uri_for_location(module_name, base=archive_path),
+                    content=source,
+                    metadata={
+                        "package": module_name,
+                        "type": "code",
+                        "language": "python3",
+                        **metadata,
+                    }
+                )
+                resource.id = self.get_id_for_resource(resource)
+                if self.derive_resources and source:
+                    resource.derived_resources = derive_python_resources(resource, source, module_name)
+                if filter and not filter(resource):
+                    continue
+                yield resource
+
+
+# Status codes that are worth retrying when fetching from CRAN
+RETRYABLE_STATUS_CODES = frozenset((408, 429, 500, 502, 503, 504))
+
+
+def _is_retryable_error(exc: BaseException) -> bool:
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is not None and exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
 
 class RCRANLocalCache(contextlib.AbstractContextManager):
+    """
+    Persistent, on-disk cache of CRAN packages.
+
+    The parsed `PACKAGES` index for each repo is cached as json and revalidated with a conditional request once it is
+    older than `index_ttl` seconds. Source tarballs are downloaded once per package@version, verified against the
+    index's md5 sum, and kept in the cache. Tarballs are never extracted, their members are streamed or read directly
+    through `tarball_index`.
+
+    In offline mode (`offline=True` or the `BUNSEN_OFFLINE` environment variable), nothing is fetched and everything
+    is served purely from the cache.
+
+    Packages are fetched and extracted concurrently over a shared, pooled `requests.Session`, with transient errors
+    retried with exponential backoff. All class level state is protected by `cache_lock`, and each package has its own
+    lock so two contexts asking for the same package only download it once.
+
+    The tarballs found by a context are memoized in its `local_package_cache`, keyed by repo, cache directory, package
+    and version, so a context never hands out another repo's or cache's tarball, or a tarball for an outdated version.
+    """
     # Class attributes
     remote_package_cache: dict[str, dict[str, str]] = {}
-    local_package_cache: dict[str, str] = {}
-    tempdir_context_holder: dict[str, contextlib.AbstractContextManager] = {}
-    ref_counts: dict[str, int] = defaultdict(lambda: 0)
+    remote_package_cache_repo: str | None = None
+    cache_lock = threading.RLock()
+    package_locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+    _session: requests.Session | None = None
+
+    INDEX_TTL: int = 24 * 60 * 60
+    MAX_WORKERS: int = 8
+    REQUEST_TIMEOUT: int = 60
 
     # Instance/context attributes
     repo: str
     context_locations: list[str]
+    cache_dir: Path
+    offline: bool
+    index_ttl: int
+    local_package_cache: dict[tuple[str, str, str, str], str]
 
     def __init__(
         self,
         locations: list[str],
         repo="https://cran.rstudio.com/src/contrib",
+        cache_dir: str | Path | None = None,
+        offline: bool | None = None,
+        index_ttl: int | None = None,
+        max_workers: int | None = None,
     ) -> None:
         self.repo = repo
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir() / "cran"
+        self.offline = offline if offline is not None else env_flag("BUNSEN_OFFLINE")
+        self.index_ttl = index_ttl if index_ttl is not None else self.INDEX_TTL
+        self.local_package_cache = {}
         self.context_locations = [
             location.path  # Only work on paths.
             for location in map(URI, locations)  # Ensure we are working on URIs
             if location.scheme in ("rcran-package", "", None)  # Only for r-cran packages, or if no scheme is provided
         ]
-        if not self.remote_package_cache:
-            self.build_package_cache()
+        if self.context_locations:
+            with self.cache_lock:
+                if not self.remote_package_cache or self.remote_package_cache_repo != self.repo:
+                    self.build_package_cache()
 
     def __enter__(self) -> dict[str, str]:
-        results = {}
-        for location in self.context_locations:
-            # Increase ref counter to reflect usage in new context
-            self.__class__.ref_counts[location] += 1
-
-            # Return the cached if it exists
-            existing_cache = self.local_package_cache.get(location, None)
-            if existing_cache and os.path.isdir(existing_cache):
-                results[location] = existing_cache
-                continue
-
-            if '@' in location:
-                package_name, version = location.split("@", maxsplit=1)
-            else:
-                package = self.remote_package_cache.get(location, None)
-                if not package:
-                    raise LookupError(f"Unable to find CRAN package name '{location}'")
-                package_name = package["package"]
-                version = package["version"]
+        if len(self.context_locations) <= 1:
+            return {location: self.fetch_package(location) for location in self.context_locations}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.context_locations))) as executor:
+            # Keep results in the same order as the locations
+            return dict(zip(self.context_locations, executor.map(self.fetch_package, self.context_locations)))
 
-            source_tarball_url = f"{self.repo}/{package_name}_{version}.tar.gz"
-            tarball_req = requests.get(source_tarball_url, stream=True)
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Packages are kept in the persistent cache, so there is nothing to clean up.
+        return super().__exit__(exc_type, exc_value, traceback)
 
-            context_mgr = tempfile.TemporaryDirectory()
-            tmpdir = context_mgr.__enter__()
-            results[location] = tmpdir
-            self.tempdir_context_holder[location] = context_mgr
-            self.local_package_cache[location] = tmpdir
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Returns a session shared by all caches, so connections to the repo are pooled and reused."""
+        with cls.cache_lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=cls.MAX_WORKERS * 2)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls._session = session
+            return cls._session
+
+    @retry(
+        retry=retry_if_exception(_is_retryable_error),
+        stop=stop_after_attempt(4),
+        wait=wait_exponential(multiplier=0.5, max=10),
+        reraise=True,
+    )
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET request using the shared session.
+        Raises for retryable status codes so they are retried, other responses are returned for the caller to handle.
+        """
+        response = self.get_session().get(url, timeout=self.REQUEST_TIMEOUT, **kwargs)
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            # Release the connection back to the pool before retrying, as streamed responses aren't read
+            response.close()
+            response.raise_for_status()
+        return response
+
+    @property
+    def index_path(self) -> Path:
+        repo_key = hashlib.sha256(self.repo.encode()).hexdigest()[:16]
+        return self.cache_dir / "index" / f"{repo_key}.json"
+
+    def resolve_package(self, location: str) -> tuple[str, str]:
+        """Returns the package name and version for a location, which may or may not specify a version."""
+        if '@' in location:
+            package_name, version = location.split("@", maxsplit=1)
+            return package_name, version
+        with self.cache_lock:
+            package = self.remote_package_cache.get(location, None)
+        if not package:
+            raise LookupError(f"Unable to find CRAN package name '{location}'")
+        return package["package"], package["version"]
+
+    def package_key(self, package_name: str, version: str) -> tuple[str, str, str, str]:
+        return (self.repo, str(self.cache_dir), package_name, version)
+
+    def tarball_path(self, package_name: str, version: str) -> Path:
+        return self.cache_dir / "tarballs" / f"{package_name}_{version}.tar.gz"
+
+    def cached_tarball(self, location: str) -> str | None:
+        """
+        Returns the path to the package's tarball if it is already in the cache, without fetching anything. Packages
+        without a version can only be found if the repo's index has already been loaded.
+        """
+        if '@' not in location:
+            with self.cache_lock:
+                if self.remote_package_cache_repo != self.repo:
+                    return None
+        try:
+            package_name, version = self.resolve_package(location)
+        except LookupError:
+            return None
+        tarball_path = self.tarball_path(package_name, version)
+        return str(tarball_path) if tarball_path.is_file() else None
+
+    def fetch_package(self, location: str) -> str:
+        """
+        Returns the path to the source tarball for the package, downloading it if it is not already in the cache.
+        """
+        package_name, version = self.resolve_package(location)
+        key = self.package_key(package_name, version)
+        with self.cache_lock:
+            existing_cache = self.local_package_cache.get(key, None)
+        if existing_cache and os.path.isfile(existing_cache):
+            return existing_cache
+
+        with self.cache_lock:
+            package_lock = self.package_locks[f"{package_name}@{version}"]
+        with package_lock:
+            tarball_path = self.fetch_tarball(package_name, version)
+        with self.cache_lock:
+            self.local_package_cache[key] = str(tarball_path)
+        return str(tarball_path)
+
+    def fetch_tarball(self, package_name: str, version: str) -> Path:
+        tarball_path = self.tarball_path(package_name, version)
+        if tarball_path.is_file():
+            return tarball_path
+        if self.offline:
+            raise LookupError(
+                f"CRAN package '{package_name}@{version}' is not in the cache at `{self.cache_dir}` and offline mode "
+                f"is enabled."
+            )
 
-            tar_file = tarfile.open(mode="r:gz", fileobj=tarball_req.raw)
-            tar_file.extractall(path=tmpdir)
-        return results
+        tarball_path.parent.mkdir(parents=True, exist_ok=True)
+        source_tarball_url = f"{self.repo}/{package_name}_{version}.tar.gz"
+        tarball_req = self._get(source_tarball_url, stream=True)
+        if tarball_req.status_code == 404:
+            # Older versions of packages are moved to the archive
+            tarball_req.close()
+            source_tarball_url = f"{self.repo}/Archive/{package_name}/{package_name}_{version}.tar.gz"
+            tarball_req = self._get(source_tarball_url, stream=True)
+        tarball_req.raise_for_status()
+
+        md5 = hashlib.md5()
+        with tarball_req, tempfile.NamedTemporaryFile(dir=tarball_path.parent, delete=False) as tmp_tarball:
+            try:
+                for chunk in tarball_req.iter_content(chunk_size=1024 * 64):
+                    md5.update(chunk)
+                    tmp_tarball.write(chunk)
+            except BaseException:
+                os.unlink(tmp_tarball.name)
+                raise
 
-    def __exit__(self, exc_type, exc_value, traceback):
-        # Update ref counts for local context
-        for location in self.context_locations:
-            self.__class__.ref_counts[location] -= 1
-        # Clean up if there are no references
-        locations_to_cleanup = [
-            location
-            for location, ref_count in self.__class__.ref_counts.items()
-            if ref_count == 0
-        ]
-        for location in locations_to_cleanup:
-            context_mgr = self.tempdir_context_holder[location]
-            context_mgr.__exit__(exc_type, exc_value, traceback)
-            del self.tempdir_context_holder[location]
-            del self.local_package_cache[location]
-            del self.__class__.ref_counts[location]
-        return super().__exit__(exc_type, exc_value, traceback)
+        with self.cache_lock:
+            package_info = self.remote_package_cache.get(package_name, {})
+        expected_md5 = package_info.get("md5sum", None)
+        known_version = package_info.get("version", None)
+        if expected_md5 and known_version == version and md5.hexdigest() != expected_md5:
+            os.unlink(tmp_tarball.name)
+            raise ValueError(f"Checksum mismatch for CRAN package '{package_name}@{version}' from `{source_tarball_url}`")
+        os.replace(tmp_tarball.name, tarball_path)
+        return tarball_path
 
     def build_package_cache(self):
-        package_page = f"{self.repo}/PACKAGES"
-        package_req = requests.get(package_page)
-        package_content = package_req.text
+        cached_index = None
+        if self.index_path.is_file():
+            try:
+                with self.index_path.open() as index_file:
+                    cached_index = json.load(index_file)
+            except (OSError, json.JSONDecodeError):
+                logger.warning(f"Ignoring unreadable CRAN index cache `{self.index_path}`")
+
+        if cached_index and (self.offline or time.time() - cached_index["fetched_at"] < self.index_ttl):
+            packages = cached_index["packages"]
+        elif self.offline:
+            logger.warning(f"No cached CRAN index for `{self.repo}` and offline mode is enabled.")
+            packages = {}
+        else:
+            headers = {}
+            if cached_index and cached_index.get("etag"):
+                headers["If-None-Match"] = cached_index["etag"]
+            if cached_index and cached_index.get("last_modified"):
+                headers["If-Modified-Since"] = cached_index["last_modified"]
+            package_page = f"{self.repo}/PACKAGES"
+            package_req = self._get(package_page, headers=headers)
+            if package_req.status_code == 304 and cached_index:
+                packages = cached_index["packages"]
+            else:
+                package_req.raise_for_status()
+                packages = self.parse_package_index(package_req.text)
+            self._write_index({
+                "repo": self.repo,
+                "fetched_at": time.time(),
+                "etag": package_req.headers.get("ETag", None),
+                "last_modified": package_req.headers.get("Last-Modified", None),
+                "packages": packages,
+            })
+
+        with self.cache_lock:
+            self.remote_package_cache.clear()
+            self.remote_package_cache.update(packages)
+            RCRANLocalCache.remote_package_cache_repo = self.repo
+
+    def _write_index(self, index: dict[str, Any]):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.index_path.parent, delete=False) as tmp_index:
+            json.dump(index, tmp_index)
+        os.replace(tmp_index.name, self.index_path)
+
+    @staticmethod
+    def parse_package_index(package_content: str) -> dict[str, dict[str, str]]:
         packages = {}
         current_package = {}
         for line in package_content.splitlines():
             if line == "":
-                packages[current_package["package"]] = current_package
+                if current_package:
+                    packages[current_package["package"]] = current_package
                 current_package = {}
                 continue
             elif line.startswith("       "):
@@ -233,8 +673,9 @@ class RCRANLocalCache(contextlib.AbstractContextManager):
             except ValueError:
                 raise
             current_package[label] = value
-        self.remote_package_cache.clear()
-        self.remote_package_cache.update(packages)
+        if current_package:
+            packages[current_package["package"]] = current_package
+        return packages
 
 
 class RCRANSourceLoader(BaseCodeLoader):
@@ -246,6 +687,46 @@ class RCRANSourceLoader(BaseCodeLoader):
     remote_package_cache: dict[str, Any] | None = {}
     local_package_cache: dict[str, str] | None = {}
 
+    def __init__(
+        self,
+        locations: list[str] | None = None,
+        metadata: dict | None = None,
+        exclusions: list[str] | None = None,
+        filter: ResourceFilter | None = None,
+        cache_dir: str | Path | None = None,
+        offline: bool | None = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.offline = offline
+        super().__init__(locations, metadata, exclusions, filter)
+
+    @property
+    def cache_options(self) -> dict[str, Any]:
+        """Options for the `RCRANLocalCache` used by this loader, which are also passed on to the scheme's reads."""
+        return {"repo": self.REPO, "cache_dir": self.cache_dir, "offline": self.offline}
+
+    def read(
+        self,
+        location: str,
+        base: str = "",
+    ):
+        if location.startswith(self.Scheme.URI_SCHEME):
+            uri = location
+        else:
+            uri = self.Scheme.get_uri_for_location(location, base)
+        return read_from_uri(uri, **self.cache_options)
+
+    def read_many(
+        self,
+        locations: list[str],
+        base: str = "",
+    ):
+        uris = [
+            location if location.startswith(self.Scheme.URI_SCHEME) else self.Scheme.get_uri_for_location(location, base)
+            for location in locations
+        ]
+        return read_many(uris, **self.cache_options)
+
     def discover(
         self,
         locations: list[str] | DefaultType = Default,
@@ -271,45 +752,51 @@ class RCRANSourceLoader(BaseCodeLoader):
         # Update or define locations and exclusions based on '!' prefix in location.
         locations, parsed_exclusions = self.parse_locations(locations)
         exclusions.extend(parsed_exclusions)
+        exclusions = self.compile_exclusions(exclusions)
+
+        with RCRANLocalCache(locations=locations, **self.cache_options) as cache:
+            for package_name, tarball_path in cache.items():
+                def select_member(location: str, package_name=package_name) -> bool:
+                    if self.member_resource_type(location) is None:
+                        return False
+                    return not (exclusions and self.should_exclude(
+                        f"{package_name}/{location}", exclusions, root=package_name
+                    ))
+
+                # Stream the relevant members straight out of the tarball in a single pass
+                for location, content in tarball_index.iter_members(tarball_path, select=select_member):
+                    resource_type = self.member_resource_type(location)
+                    resource = resource_type(
+                        uri=self.Scheme.get_uri_for_location(
+                            base=package_name,
+                            location=location,
+                        ),
+                        content=content.decode(),
+                        metadata={
+                            "package": package_name,
+                            "path": location,
+                            "type": resource_type.resource_type.value,
+                            "language": "rlang",
+                            **metadata,
+                        }
+                    )
+                    resource.id = self.get_id_for_resource(resource)
+                    if filter and not filter(resource):
+                        continue
+                    yield resource
 
-        with RCRANLocalCache(locations=locations) as cache:
-            for package_name, tempdir in cache.items():
-                for dirpath, _dirnames, filenames in os.walk(top=tempdir):
-                    for filename in filenames:
-                        if filename.startswith('.'):
-                            continue
-                        full_path = Path(os.path.join(dirpath, filename))
-                        if "R" in full_path.parts and full_path.suffix == ".R":
-                            resource_type = CodeResource
-                            location = str(full_path.relative_to(tempdir))
-                        elif "vignettes" in full_path.parts and full_path.suffix.startswith(".R"):
-                            resource_type = ExampleResource
-                            location = str(full_path.relative_to(tempdir))
-                        elif "man" in full_path.parts and full_path.suffix.startswith(".R"):
-                            resource_type = DocumentationResource
-                            location = str(full_path.relative_to(tempdir))
-                        else:
-                            continue
-
-                        with open(full_path, 'r') as fh:
-                            content = fh.read()
-                            fh.seek(0)
-                            resource = resource_type(
-                                uri=self.Scheme.get_uri_for_location(
-                                    base=package_name,
-                                    location=location,
-                                ),
-                                file_handle=fh,
-                                content=content,
-                                metadata={
-                                    "package": package_name,
-                                    "path": str(full_path),
-                                    "type": resource_type.resource_type.value,
-                                    "language": "rlang",
-                                    **metadata,
-                                }
-                            )
-                            resource.id = self.get_id_for_resource(resource)
-                            if filter and not filter(resource):
-                                continue
-                            yield resource
+    @staticmethod
+    def member_resource_type(location: str) -> type[CodeResource | ExampleResource | DocumentationResource] | None:
+        """
+        Returns the type of resource for a file in an R package source tarball, or None if it isn't collected.
+        """
+        path = PurePosixPath(location)
+        if path.name.startswith('.'):
+            return None
+        if "R" in path.parts and path.suffix == ".R":
+            return CodeResource
+        elif "vignettes" in path.parts and path.suffix.startswith(".R"):
+            return ExampleResource
+        elif "man" in path.parts and path.suffix.startswith(".R"):
+            return DocumentationResource
+        return None
@@ -0,0 +1,237 @@
+import re
+from functools import lru_cache
+from typing import Iterable
+
+
+GLOB_CHARS = "*?["
+
+
+def _translate_glob(pattern: str) -> str:
+    """
+    Translates a gitignore style glob in to a regular expression fragment.
+    `*` and `?` never match across a `/`, while `**` matches across any number of directories.
+    """
+    result = []
+    idx, length = 0, len(pattern)
+    while idx < length:
+        char = pattern[idx]
+        if pattern.startswith("**/", idx):
+            # Zero or more leading directories
+            result.append("(?:.*/)?")
+            idx += 3
+            continue
+        elif pattern.startswith("**", idx):
+            result.append(".*")
+            idx += 2
+            continue
+        elif char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            start = idx + 1
+            if pattern[start:start + 1] in ("!", "^"):
+                start += 1
+            # A `]` straight after the opening `[` (or `[!`) is part of the class
+            end = pattern.find("]", start + 1)
+            if end == -1:
+                result.append(re.escape(char))
+            else:
+                negate = "^" if start > idx + 1 else ""
+                result.append(f"[{negate}{_translate_char_class(pattern[start:end])}]")
+                idx = end + 1
+                continue
+        else:
+            result.append(re.escape(char))
+        idx += 1
+    return "".join(result)
+
+
+def _translate_char_class(body: str) -> str:
+    """
+    Translates the contents of a glob character class, e.g. `a-z_`, keeping ranges and escaping everything else so that
+    characters like `\\` or a trailing `-` are matched literally.
+    """
+    result = []
+    idx, length = 0, len(body)
+    while idx < length:
+        if idx + 2 < length and body[idx + 1] == "-":
+            result.append(f"{re.escape(body[idx])}-{re.escape(body[idx + 2])}")
+            idx += 3
+        else:
+            result.append(re.escape(body[idx]))
+            idx += 1
+    return "".join(result)
+
+
+class ExclusionRule:
+    """
+    A single compiled exclusion pattern.
+
+    Patterns that contain glob characters (`*`, `?`, `[`) or that start or end with a `/` follow gitignore semantics
+    and are matched against the path relative to the location being walked:
+        * A leading `/`, or a `/` in the middle of the pattern, anchors the pattern to the root of the location.
+          Otherwise the pattern is a name that can match any component of the path.
+        * `**` matches across any number of directories.
+        * A trailing `/` only matches directories (and everything inside them).
+    Plain patterns keep the historical behavior of matching if they appear anywhere in the full location.
+    """
+    pattern: str
+    negated: bool
+    substring: bool
+    directory_only: bool
+    name_only: bool
+    literal: bool
+    value: str
+    name_regex: str
+    file_regex: str
+    directory_regex: str
+
+    def __init__(self, pattern: str) -> None:
+        self.pattern = pattern
+        self.negated = pattern.startswith("!")
+        if self.negated:
+            pattern = pattern[1:]
+        self.directory_only = pattern.endswith("/")
+        self.literal = not any(char in pattern for char in GLOB_CHARS)
+        self.substring = self.literal and not (self.directory_only or pattern.startswith("/"))
+        self.value = pattern.strip("/")
+        # No slash in the pattern means it is a name that can match at any depth
+        self.name_only = not self.substring and "/" not in self.value and not pattern.startswith("/")
+
+        self.name_regex = _translate_glob(self.value)
+        body = self.name_regex
+        if self.name_only:
+            body = "(?:.*/)?" + body
+        # A pattern that matches a directory also matches everything inside of it.
+        self.directory_regex = body + "(?:/.*)?"
+        if self.directory_only:
+            # Files can only be matched via one of their parent directories
+            self.file_regex = body + "/.*"
+        else:
+            self.file_regex = self.directory_regex
+
+
+class _RuleGroup:
+    """
+    Consecutive rules with the same polarity, compiled so each path is checked against the whole group at once:
+        * Plain patterns are looked for in the full location.
+        * Name patterns are checked against each component of the relative path, by set lookup if they have no glob
+          characters or else by a single combined regular expression.
+        * Anchored patterns are combined in to a single regular expression matched against the relative path.
+    """
+
+    def __init__(self, negated: bool, rules: list[ExclusionRule]) -> None:
+        self.negated = negated
+        self.substrings = tuple(rule.value for rule in rules if rule.substring)
+
+        name_rules = [rule for rule in rules if rule.name_only]
+        self.directory_names = frozenset(rule.value for rule in name_rules if rule.literal)
+        self.file_names = frozenset(rule.value for rule in name_rules if rule.literal and not rule.directory_only)
+        self.directory_name_regex = self._combine([rule.name_regex for rule in name_rules if not rule.literal])
+        self.file_name_regex = self._combine([
+            rule.name_regex for rule in name_rules if not rule.literal and not rule.directory_only
+        ])
+        self.has_names = bool(name_rules)
+
+        anchored_rules = [rule for rule in rules if not rule.substring and not rule.name_only]
+        self.file_regex = self._combine([rule.file_regex for rule in anchored_rules])
+        self.directory_regex = self._combine([rule.directory_regex for rule in anchored_rules])
+
+    @staticmethod
+    def _combine(regexes: list[str]) -> re.Pattern | None:
+        if not regexes:
+            return None
+        return re.compile("|".join(f"(?:{regex})" for regex in regexes), re.DOTALL)
+
+    def _name_matches(self, name: str, is_dir: bool) -> bool:
+        names, regex = (
+            (self.directory_names, self.directory_name_regex) if is_dir else (self.file_names, self.file_name_regex)
+        )
+        return name in names or bool(regex and regex.fullmatch(name))
+
+    def matches(self, full_path: str, relative_path: str, is_dir: bool) -> bool:
+        if self.substrings and any(value in full_path for value in self.substrings):
+            return True
+        if self.has_names:
+            *parents, name = relative_path.split("/")
+            # Every parent is a directory, and matching a directory also matches everything inside of it
+            if any(self._name_matches(parent, is_dir=True) for parent in parents):
+                return True
+            if self._name_matches(name, is_dir=is_dir):
+                return True
+        regex = self.directory_regex if is_dir else self.file_regex
+        return bool(regex and regex.fullmatch(relative_path))
+
+
+class ExclusionMatcher:
+    """
+    Compiled set of exclusion patterns shared by all loaders.
+
+    Rules are evaluated gitignore style, where the last matching rule wins, so an exclusion prefixed with `!` can
+    re-include paths excluded by an earlier rule. Consecutive rules of the same polarity are combined in to a single
+    regular expression, so each path is checked once per group of rules instead of once per rule.
+
+    Loaders that work with dotted names instead of file paths (e.g. Python modules) can pass a different `separator`,
+    which is normalized to `/` in both the patterns and the locations being checked.
+    """
+    patterns: tuple[str, ...]
+    separator: str
+
+    def __init__(self, patterns: Iterable[str], separator: str = "/") -> None:
+        self.patterns = tuple(str(pattern) for pattern in patterns if pattern)
+        self.separator = separator
+        self.rules = [ExclusionRule(self._normalize(pattern)) for pattern in self.patterns]
+
+        self._groups: list[_RuleGroup] = []
+        current_rules: list[ExclusionRule] = []
+        for rule in self.rules:
+            if current_rules and current_rules[-1].negated != rule.negated:
+                self._groups.append(_RuleGroup(current_rules[-1].negated, current_rules))
+                current_rules = []
+            current_rules.append(rule)
+        if current_rules:
+            self._groups.append(_RuleGroup(current_rules[-1].negated, current_rules))
+
+    @classmethod
+    def compile(cls, patterns: "Iterable[str] | ExclusionMatcher", separator: str = "/") -> "ExclusionMatcher":
+        if isinstance(patterns, cls) and patterns.separator == separator:
+            return patterns
+        return _compile_cached(tuple(patterns), separator)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def __iter__(self):
+        return iter(self.patterns)
+
+    def _normalize(self, value: str) -> str:
+        if self.separator != "/":
+            return value.replace(self.separator, "/")
+        return value
+
+    def matches(self, location: str, is_dir: bool = False, root: str = "") -> bool:
+        """
+        Returns True if `location` is excluded.
+        `root` is the location being walked that gitignore style patterns are anchored to.
+        """
+        if not self._groups:
+            return False
+        full_path = self._normalize(str(location))
+        relative_path = full_path
+        if root:
+            root = self._normalize(str(root)).rstrip("/")
+            if full_path.startswith(f"{root}/"):
+                relative_path = full_path[len(root) + 1:]
+        relative_path = relative_path.lstrip("/")
+
+        # Last matching rule wins, so check groups from the end.
+        for group in reversed(self._groups):
+            if group.matches(full_path, relative_path, is_dir):
+                return not group.negated
+        return False
+
+
+@lru_cache(maxsize=64)
+def _compile_cached(patterns: tuple[str, ...], separator: str) -> ExclusionMatcher:
+    return ExclusionMatcher(patterns, separator=separator)
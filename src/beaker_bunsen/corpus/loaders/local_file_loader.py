@@ -1,10 +1,11 @@
 import json
 import os
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from .base import BaseLoader
-from .schemes import LocalFileScheme, read_from_uri
+from .base import BaseLoader, PathFilter
+from .exclusions import ExclusionMatcher
+from .schemes import LocalFileScheme, read_from_uri, read_many
 from ..types import Default, DefaultType, URI
 from ..resources import Resource, ResourceType, get_resource_cls, ResourceFilter
 
@@ -13,6 +14,10 @@ class LocalFileLoader(BaseLoader):
 
     Scheme = LocalFileScheme
     SLUG = "local"
+    EXCLUSION_SEPARATOR = os.sep
+
+    # Minimum number of directories in a level of the walk before scanning them on the thread pool.
+    PARALLEL_SCAN_THRESHOLD: int = 4
 
     def __init__(
         self,
@@ -21,6 +26,8 @@ class LocalFileLoader(BaseLoader):
         exclusions: list[str] | None = None,
         resource_type: ResourceType = ResourceType.Generic,
         filter: ResourceFilter | None = None,
+        path_filter: PathFilter = None,
+        max_workers: int | None = None,
     ):
         exclusions = exclusions or []
         if locations:
@@ -28,6 +35,8 @@ class LocalFileLoader(BaseLoader):
             exclusions.extend(parsed_exclusions)
             self._check_locations_exist(locations)
         self.resource_type = resource_type
+        self.path_filter = path_filter
+        self.max_workers = max_workers
         super().__init__(locations, metadata, exclusions, filter)
 
 
@@ -59,7 +68,8 @@ class LocalFileLoader(BaseLoader):
         metadata: dict | DefaultType = Default,
         exclusions: list[str] | DefaultType = Default,
         filter: ResourceFilter | DefaultType = Default,
-        resource_type: ResourceType | DefaultType = Default
+        resource_type: ResourceType | DefaultType = Default,
+        path_filter: PathFilter | DefaultType = Default,
     ):
         # Initialize exclusions first so we can extend it if there are any negated locations
         if exclusions is Default:
@@ -87,9 +97,60 @@ class LocalFileLoader(BaseLoader):
         if filter is Default:
             filter = self.filter
 
-        locations_queue = deque((location, [metadata]) for location in locations)
-        while locations_queue:
-            location, location_metadata = locations_queue.popleft()
+        if path_filter is Default:
+            path_filter = self.path_filter
+
+        # Compile exclusions once for the whole walk
+        exclusions = self.compile_exclusions(exclusions)
+
+        # Each level of the walk is a list of `(path, is_dir, metadata, root)` entries, ordered by name within each
+        # directory. Walking level by level keeps the yield order deterministic (breadth first) even though the
+        # directories of a level may be scanned concurrently.
+        level = self._scan_roots(locations, metadata, exclusions, path_filter)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                directories = [
+                    (path, dir_metadata, exclusions, path_filter, root)
+                    for path, is_dir, dir_metadata, root in level
+                    if is_dir
+                ]
+                if len(directories) >= self.PARALLEL_SCAN_THRESHOLD:
+                    scans = [executor.submit(self._scan_directory, *directory) for directory in directories]
+                    children = (scan.result() for scan in scans)
+                else:
+                    children = (self._scan_directory(*directory) for directory in directories)
+
+                for location, is_dir, file_metadata, _root in level:
+                    if is_dir:
+                        continue
+                    with open(location, 'r') as doc:
+                        resource_cls: type[Resource] = get_resource_cls(resource_type)
+                        resource = resource_cls(
+                            uri=self.Scheme.get_uri_for_location(location),
+                            file_handle=doc,
+                            metadata=dict(file_metadata),
+                        )
+                        resource.id = self.get_id_for_resource(resource)
+                        if filter and not filter(resource):
+                            continue
+                        yield resource
+
+                level = [child for scanned in children for child in scanned]
+
+    @staticmethod
+    def _load_metadata(metadata_path: str, base_metadata: dict) -> dict:
+        with open(metadata_path, 'r') as metadata_file:
+            return {**base_metadata, **json.load(metadata_file)}
+
+    def _scan_roots(
+        self,
+        locations: list[str],
+        metadata: dict,
+        exclusions: ExclusionMatcher,
+        path_filter: PathFilter,
+    ) -> list[tuple[str, bool, dict, str]]:
+        roots = []
+        for location in locations:
             uri = URI(location)
             if uri.scheme:
                 location = uri.path
@@ -97,38 +158,69 @@ class LocalFileLoader(BaseLoader):
             if isinstance(location, Path):
                 location = str(location.absolute())
 
-            if self.should_exclude(str(location)):
+            is_dir = os.path.isdir(location)
+            # Patterns only apply below the root's parent, so that its ancestors' names can't exclude it
+            parent = os.path.dirname(str(location).rstrip(os.sep)) or str(location)
+            if self.should_exclude(str(location), exclusions, is_dir=is_dir, root=parent):
                 continue
 
-            if os.path.isdir(location):
-                # Check for directory metadata file
-                dir_metadata_path = os.path.join(location, '.metadata')
-                if os.path.isfile(dir_metadata_path):
-                    with open(dir_metadata_path, 'r') as metadata_file:
-                        dir_metadata = json.load(metadata_file)
-                        location_metadata.append(dir_metadata)
-                locations_queue.extend((os.path.join(location, child), location_metadata[:]) for child in os.listdir(location) if not child.startswith('.'))
+            if is_dir:
+                roots.append((location, True, metadata, location))
             # Skip pipes, symbolic links, and other non-file types
             # TODO: maybe allow by configuration
             elif os.path.isfile(location):
-                if location.endswith(".metadata"):
+                # Don't load .metadata files as regular files.
+                if location.endswith(".metadata") or (path_filter and not path_filter(location)):
+                    continue
+                file_metadata = metadata
+                if os.path.isfile(f"{location}.metadata"):
+                    file_metadata = self._load_metadata(f"{location}.metadata", metadata)
+                roots.append((location, False, file_metadata, os.path.dirname(location)))
+        return roots
+
+    def _scan_directory(
+        self,
+        location: str,
+        metadata: dict,
+        exclusions: ExclusionMatcher,
+        path_filter: PathFilter,
+        root: str,
+    ) -> list[tuple[str, bool, dict, str]]:
+        """
+        Scans a single directory, returning its children sorted by name.
+        The directory entries returned by `os.scandir` are reused for all type checks and `.metadata` sidecar lookups,
+        and path-based exclusions and filters are applied here so rejected files are never opened.
+        """
+        with os.scandir(location) as dir_iter:
+            entries = sorted(dir_iter, key=lambda entry: entry.name)
+        names = {entry.name for entry in entries}
+
+        # Check for directory metadata file
+        if '.metadata' in names:
+            metadata = self._load_metadata(os.path.join(location, '.metadata'), metadata)
+
+        children = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            is_dir = entry.is_dir()
+            if self.should_exclude(entry.path, exclusions, is_dir=is_dir, root=root):
+                continue
+            if is_dir:
+                children.append((entry.path, True, metadata, root))
+            # Skip pipes, symbolic links, and other non-file types
+            elif entry.is_file():
+                if entry.name.endswith(".metadata"):
                     # Don't load .metadata files as regular files.
-                    # They should be found via the mechanisms below where they are looked for explicitly.
+                    # They are applied to the file they describe via the sidecar lookup below.
                     continue
-                metadata_filename = f"{location}.metadata"
-                if os.path.isfile(metadata_filename):
-                    with open(metadata_filename, 'r') as metadata_file:
-                        dir_metadata = json.load(metadata_file)
-                        location_metadata.append(dir_metadata)
-
-                metadata = self.collapse_metadata(location_metadata)
-                with open(location, 'r') as doc:
-                    resource_cls: type[Resource] = get_resource_cls(resource_type)
-                    resource = resource_cls(uri=self.Scheme.get_uri_for_location(location), file_handle=doc, metadata=metadata)
-                    resource.id = self.get_id_for_resource(resource)
-                    if filter and not filter(resource):
-                        continue
-                    yield resource
+                if path_filter and not path_filter(entry.path):
+                    continue
+                file_metadata = metadata
+                if f"{entry.name}.metadata" in names:
+                    file_metadata = self._load_metadata(f"{entry.path}.metadata", metadata)
+                children.append((entry.path, False, file_metadata, root))
+        return children
 
     def read(self, location: str, base: str = ""):
         if location.startswith(self.Scheme.URI_SCHEME):
@@ -136,3 +228,10 @@ class LocalFileLoader(BaseLoader):
         else:
             uri = self.Scheme.get_uri_for_location(location, base=base)
         return read_from_uri(uri)
+
+    def read_many(self, locations: list[str], base: str = ""):
+        uris = [
+            location if location.startswith(self.Scheme.URI_SCHEME) else self.Scheme.get_uri_for_location(location, base=base)
+            for location in locations
+        ]
+        return read_many(uris)
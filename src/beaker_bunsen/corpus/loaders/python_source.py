@@ -0,0 +1,156 @@
+import ast
+import doctest
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from ..resources import DocumentationResource, ExampleResource, Resource
+from .schemes import get_derived_uri
+
+
+@dataclass
+class Definition:
+    """A documented module, class or function found in Python source."""
+    qualname: str
+    kind: str
+    signature: str
+    docstring: str
+    lineno: int
+    examples: list[doctest.Example] = field(default_factory=list)
+    # Line the cleaned docstring starts on, which the line numbers of the examples are relative to
+    docstring_lineno: int = 1
+
+
+_doctest_parser = doctest.DocTestParser()
+
+
+def _signature(node: ast.AST) -> str:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return f"({ast.unparse(node.args)})"
+    elif isinstance(node, ast.ClassDef) and node.bases:
+        return f"({', '.join(ast.unparse(base) for base in node.bases)})"
+    return ""
+
+
+def _parse_examples(docstring: str, qualname: str) -> list[doctest.Example]:
+    if ">>>" not in docstring:
+        return []
+    try:
+        return _doctest_parser.get_examples(docstring, name=qualname)
+    except ValueError:
+        # Malformed doctests (e.g. inconsistent indentation) are skipped rather than failing the whole module
+        return []
+
+
+def _docstring_lineno(node: ast.AST) -> int:
+    docstring_node = node.body[0]
+    lineno = docstring_node.lineno
+    # `ast.get_docstring` removes leading blank lines, such as the newline right after the opening quotes.
+    raw = docstring_node.value.value
+    return lineno + len(raw) - len(raw.lstrip("\n"))
+
+
+def parse_definitions(module_name: str, source: str) -> list[Definition]:
+    """
+    Collects the docstrings, and any doctest examples in them, of a module and all of its classes and functions, in a
+    single pass over the module's AST. Functions nested inside of other functions are not included.
+    Returns an empty list if the source cannot be parsed.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    definitions = []
+    nodes: deque[tuple[ast.AST, str]] = deque([(tree, module_name)])
+    while nodes:
+        node, qualname = nodes.popleft()
+        docstring = ast.get_docstring(node)
+        if docstring:
+            definitions.append(Definition(
+                qualname=qualname,
+                kind="module" if isinstance(node, ast.Module) else "class" if isinstance(node, ast.ClassDef) else "function",
+                signature=_signature(node),
+                docstring=docstring,
+                lineno=getattr(node, "lineno", 1),
+                examples=_parse_examples(docstring, qualname),
+                docstring_lineno=_docstring_lineno(node),
+            ))
+        if isinstance(node, (ast.Module, ast.ClassDef)):
+            nodes.extend(
+                (child, f"{qualname}.{child.name}")
+                for child in node.body
+                if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+            )
+    return definitions
+
+
+def _format_example(definition: Definition) -> str:
+    code = "".join(example.source for example in definition.examples).rstrip()
+    output = "".join(example.want for example in definition.examples if example.want).rstrip()
+    content = f"""
+# Description
+Example usage of `{definition.qualname}`, from its docstring.
+
+# Code
+```python
+{code}
+```
+""".lstrip()
+    if output:
+        content += f"""
+# Response
+```
+{output}
+```
+"""
+    return content
+
+
+def _derived_entries(source: str, module_name: str) -> Iterator[tuple[str, type[Resource], Definition, str]]:
+    """
+    Yields the derived key, resource type, definition and content of each resource derived from the source. Keys are
+    `<kind>/<qualname>`, numbered if a name is defined more than once (e.g. a property's getter and setter).
+    """
+    seen: Counter[str] = Counter()
+    for definition in parse_definitions(module_name, source):
+        seen[definition.qualname] += 1
+        count = seen[definition.qualname]
+        name = definition.qualname if count == 1 else f"{definition.qualname}~{count}"
+        yield (
+            f"documentation/{name}",
+            DocumentationResource,
+            definition,
+            f"`{definition.qualname}{definition.signature}`\n\n{definition.docstring}",
+        )
+        if definition.examples:
+            yield f"example/{name}", ExampleResource, definition, _format_example(definition)
+
+
+def derive_python_resources(resource: Resource, source: str, module_name: str) -> list[Resource]:
+    """
+    Returns documentation resources for the docstrings, and example resources for the doctests, found in the source
+    of the Python module `resource`. Each derived resource's uri is the module's uri with a `derived` query naming it,
+    which `read_from_uri` resolves by deriving it again from the module's source.
+    """
+    derived = []
+    for key, resource_cls, definition, content in _derived_entries(source, module_name):
+        derived.append(resource_cls(
+            uri=get_derived_uri(resource.uri, key),
+            id=f"{resource.id}#{key.replace('/', ':', 1)}",
+            content=content,
+            metadata={
+                **(resource.metadata or {}),
+                "object": definition.qualname,
+                "object_type": definition.kind,
+                "lineno": definition.lineno,
+                "type": resource_cls.resource_type.value,
+            },
+            content_is_complete=True,
+        ))
+    return derived
+
+
+def derived_contents(source: str, module_name: str) -> dict[str, str]:
+    """Returns the content of each resource derived from the source, keyed by its derived key."""
+    return {key: content for key, _, _, content in _derived_entries(source, module_name)}
@@ -1,15 +1,26 @@
+import gzip
 import importlib
+import importlib.util
 import inspect
+import json
 import os
 import os.path
 import sys
+import tarfile
+import tempfile
+import threading
 import zipfile
 from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import cache
 from pathlib import Path
-from typing import Any, TYPE_CHECKING
+from typing import Any, Callable, Iterator, TYPE_CHECKING
+from urllib.parse import parse_qs, urlparse, urlunparse
 
 from ..types import URI
+from ..util.tracing import span
 if TYPE_CHECKING:
     from .. import Corpus
     from .base import BaseLoader
@@ -53,13 +64,136 @@ def determine_scheme(uri: URI | str | Path) -> "Scheme | None":
         raise ValueError(f"Unable to identify scheme '{uri.scheme}' in uri '{uri}'")
 
 
+# Query parameter naming a resource derived from the one at the rest of the uri, e.g. a docstring of a Python module
+DERIVED_QUERY_KEY = "derived"
+
+
+def get_derived_uri(uri: str, key: str) -> str:
+    """Returns the uri for the resource derived from the resource at `uri` that is identified by `key`."""
+    parts = urlparse(str(uri))
+    return urlunparse(parts._replace(query=f"{DERIVED_QUERY_KEY}={key}"))
+
+
+def split_derived_uri(uri: str) -> tuple[str, str | None]:
+    """
+    Returns the uri of the resource a derived resource came from, along with its derived key, or the uri unchanged and
+    None if it isn't a derived resource.
+    """
+    parts = urlparse(str(uri))
+    key = parse_qs(parts.query).get(DERIVED_QUERY_KEY, None)
+    if not key:
+        return uri, None
+    return urlunparse(parts._replace(query="")), key[0]
+
+
+def _derived_contents(uri: str, content: bytes | str) -> dict[str, str]:
+    # Only Python sources produce derived resources
+    from .python_source import derived_contents
+    if isinstance(content, bytes):
+        content = importlib.util.decode_source(content)
+    return derived_contents(content, URI(uri).path)
+
+
+def _read_derived(uri: str, contents: dict[str, str], key: str) -> str:
+    if key not in contents:
+        raise LookupError(f"Derived resource '{key}' no longer exists in '{uri}'")
+    return contents[key]
+
+
 def read_from_uri(
     uri: str,
     *args,
     **kwargs,
 ) -> bytes:
     scheme_cls = determine_scheme(uri)
-    return scheme_cls.read(uri, *args, **kwargs)
+    with span("loader.read", scheme=scheme_cls.URI_SCHEME):
+        parent_uri, key = split_derived_uri(uri)
+        if key is None:
+            return scheme_cls.read(uri, *args, **kwargs)
+        content = scheme_cls.read(parent_uri, *args, **kwargs)
+        return _read_derived(parent_uri, _derived_contents(parent_uri, content), key)
+
+
+def stat_uri(
+    uri: str,
+    *args,
+    **kwargs,
+) -> tuple[int, int] | None:
+    scheme_cls = determine_scheme(uri)
+    # Derived resources change when the resource they came from does
+    return scheme_cls.stat(split_derived_uri(uri)[0], *args, **kwargs)
+
+
+def _stat_path(path: str | Path | None) -> tuple[int, int] | None:
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def read_many(
+    uris: list[str],
+    *args,
+    max_workers: int | None = None,
+    **kwargs,
+) -> list[bytes | str]:
+    """
+    Reads many uris at once, returning the results in the same order as the uris.
+    The uris are grouped by scheme so that each scheme can read its group in bulk (e.g. opening an archive only once),
+    and the groups are read concurrently.
+    """
+    with span("loader.read_many", uris=len(uris)):
+        split_uris = [split_derived_uri(uri) for uri in uris]
+        if not any(key for _, key in split_uris):
+            return _read_many(uris, *args, max_workers=max_workers, **kwargs)
+
+        # Derived resources are read from the resource they came from, which is read, and parsed, only once
+        parent_uris = list(dict.fromkeys(parent_uri for parent_uri, _ in split_uris))
+        contents = dict(zip(parent_uris, _read_many(parent_uris, *args, max_workers=max_workers, **kwargs)))
+        derived: dict[str, dict[str, str]] = {}
+        results = []
+        for parent_uri, key in split_uris:
+            if key is None:
+                results.append(contents[parent_uri])
+                continue
+            if parent_uri not in derived:
+                derived[parent_uri] = _derived_contents(parent_uri, contents[parent_uri])
+            results.append(_read_derived(parent_uri, derived[parent_uri], key))
+        return results
+
+
+def _read_many(
+    uris: list[str],
+    *args,
+    max_workers: int | None = None,
+    **kwargs,
+) -> list[bytes | str]:
+    uris_by_scheme: dict[type[Scheme], list[tuple[int, str]]] = defaultdict(list)
+    for idx, uri in enumerate(uris):
+        uris_by_scheme[determine_scheme(uri)].append((idx, uri))
+
+    results: list[bytes | str | None] = [None] * len(uris)
+    if len(uris_by_scheme) == 1:
+        scheme_cls, indexed_uris = next(iter(uris_by_scheme.items()))
+        return scheme_cls.read_many([uri for _, uri in indexed_uris], *args, max_workers=max_workers, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (
+                [idx for idx, _ in indexed_uris],
+                executor.submit(
+                    scheme_cls.read_many, [uri for _, uri in indexed_uris], *args, max_workers=max_workers, **kwargs
+                ),
+            )
+            for scheme_cls, indexed_uris in uris_by_scheme.items()
+        ]
+        for indexes, future in futures:
+            for idx, content in zip(indexes, future.result()):
+                results[idx] = content
+    return results
 
 
 class Scheme(ABC):
@@ -81,6 +215,38 @@ class Scheme(ABC):
     ) -> bytes | str:
         ...
 
+    @classmethod
+    def read_many(
+        cls,
+        uris: list[str],
+        *args,
+        max_workers: int | None = None,
+        **kwargs,
+    ) -> list[bytes | str]:
+        """
+        Reads all of the `uris`, returning the results in the same order.
+        By default, each uri is read independently on a thread pool. Schemes that can share work between reads should
+        override this with a bulk implementation.
+        """
+        if len(uris) <= 1:
+            return [cls.read(uri, *args, **kwargs) for uri in uris]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda uri: cls.read(uri, *args, **kwargs), uris))
+
+    @classmethod
+    def stat(
+        cls,
+        uri: str,
+        *args,
+        **kwargs,
+    ) -> tuple[int, int] | None:
+        """
+        Returns a cheap `(mtime_ns, size)` signature for the file backing `uri`, which changes whenever the resource's
+        content may have changed, or None if the scheme can't provide one and the content must be read instead.
+        Resources inside of an archive share the signature of their archive.
+        """
+        return None
+
     @classmethod
     @abstractmethod
     def join_parts(cls, *parts: list[str]) -> str:
@@ -135,6 +301,17 @@ class LocalFileScheme(Scheme):
                 result = resource_file.read()
         return result
 
+    @classmethod
+    def stat(
+        cls,
+        uri: URI | str,
+        base_dir: str | Path = "",
+        *args,
+        **kwargs,
+    ) -> tuple[int, int] | None:
+        uri = URI(uri)
+        return _stat_path(os.path.join(base_dir, uri.path))
+
 
 class ExampleScheme(LocalFileScheme):
     URI_SCHEME = 'examples'
@@ -156,6 +333,60 @@ class DocumentationScheme(LocalFileScheme):
         return LocalFileLoader(resource_type=ResourceType.Documentation)
 
 
+class ModulePathIndex:
+    """
+    Process-wide index of module names to source file paths.
+
+    It is populated by the Python library loader during discovery and lazily by `PythonModuleScheme.read`, so each
+    module only needs to be located once. The whole index is invalidated if `sys.path` changes, as that can change
+    which file a module name resolves to.
+    """
+    _paths: dict[str, str]
+    _sys_path: tuple[str, ...]
+
+    def __init__(self) -> None:
+        self._paths = {}
+        self._sys_path = tuple(sys.path)
+        self._lock = threading.Lock()
+
+    def _check_sys_path(self):
+        current_sys_path = tuple(sys.path)
+        if current_sys_path != self._sys_path:
+            self._paths.clear()
+            self._sys_path = current_sys_path
+
+    def get(self, mod_name: str) -> str | None:
+        with self._lock:
+            self._check_sys_path()
+            return self._paths.get(mod_name, None)
+
+    def add(self, mod_name: str, file_path: str):
+        with self._lock:
+            self._check_sys_path()
+            self._paths[mod_name] = file_path
+
+    def get_many(self, mod_names: list[str]) -> dict[str, str | None]:
+        with self._lock:
+            self._check_sys_path()
+            return {mod_name: self._paths.get(mod_name, None) for mod_name in mod_names}
+
+    def update(self, paths: dict[str, str]):
+        with self._lock:
+            self._check_sys_path()
+            self._paths.update(paths)
+
+    def discard(self, mod_name: str):
+        with self._lock:
+            self._paths.pop(mod_name, None)
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+
+
+module_path_index = ModulePathIndex()
+
+
 class PythonModuleScheme(Scheme):
     URI_SCHEME = 'py-mod'
     ALIASES = [
@@ -170,6 +401,35 @@ class PythonModuleScheme(Scheme):
 
     @staticmethod
     def get_module_path(mod_name) -> str | None:
+        file_path = module_path_index.get(mod_name)
+        if file_path and os.path.isfile(file_path):
+            return file_path
+        elif file_path:
+            module_path_index.discard(mod_name)
+
+        file_path = PythonModuleScheme.resolve_module_path(mod_name)
+        if file_path:
+            module_path_index.add(mod_name, file_path)
+        return file_path
+
+    @classmethod
+    def get_module_paths(cls, mod_names: list[str]) -> dict[str, str | None]:
+        """
+        Locates many modules with a single lookup in the module path index. Modules that aren't indexed, or whose
+        indexed file has gone, are resolved and added to the index together.
+        """
+        paths = module_path_index.get_many(list(dict.fromkeys(mod_names)))
+        for mod_name, file_path in paths.items():
+            if file_path and not os.path.isfile(file_path):
+                module_path_index.discard(mod_name)
+                paths[mod_name] = None
+        resolved = {mod_name: cls.resolve_module_path(mod_name) for mod_name, path in paths.items() if path is None}
+        module_path_index.update({mod_name: path for mod_name, path in resolved.items() if path})
+        paths.update(resolved)
+        return paths
+
+    @staticmethod
+    def resolve_module_path(mod_name) -> str | None:
         # Look for file by just looking for the file
         # First, use the loaders provided by the sys.meta_path
         head, *tail = mod_name.split('.')
@@ -225,8 +485,34 @@ class PythonModuleScheme(Scheme):
             raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
 
         mod_name = uri.path
-        file_path = cls.get_module_path(mod_name)
+        return cls._read_module(mod_name, cls.get_module_path(mod_name))
 
+    @classmethod
+    def read_many(
+        cls,
+        uris: list[str],
+        *args,
+        max_workers: int | None = None,
+        **kwargs,
+    ) -> list[bytes | str]:
+        """
+        Reads the modules for all `uris`, locating them all with one lookup in the module path index instead of one per
+        module, then reading the files on a thread pool. Results are returned in the same order as the uris.
+        """
+        mod_names = []
+        for uri in uris:
+            uri = URI(uri)
+            if uri.scheme != cls.URI_SCHEME:
+                raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
+            mod_names.append(uri.path)
+        paths = cls.get_module_paths(mod_names)
+        if len(mod_names) <= 1:
+            return [cls._read_module(mod_name, paths[mod_name]) for mod_name in mod_names]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda mod_name: cls._read_module(mod_name, paths[mod_name]), mod_names))
+
+    @staticmethod
+    def _read_module(mod_name: str, file_path: str | None) -> str:
         if file_path and os.path.isfile(file_path):
             with open(file_path, 'r') as resource_file:
                 result = resource_file.read()
@@ -234,6 +520,16 @@ class PythonModuleScheme(Scheme):
 
         raise FileNotFoundError(f"Unable to locate a file for module `{mod_name}`")
 
+    @classmethod
+    def stat(
+        cls,
+        uri: str,
+        *args,
+        **kwargs,
+    ) -> tuple[int, int] | None:
+        uri = URI(uri)
+        return _stat_path(cls.get_module_path(uri.path))
+
 
 class S3Scheme(Scheme):
     URI_SCHEME = 's3'
@@ -253,6 +549,89 @@ class S3Scheme(Scheme):
         return ""
 
 
+class _PooledZipfile:
+    """
+    An open `ZipFile` in the pool, along with the lock that serializes its use and the number of callers using it.
+    """
+
+    def __init__(self, path: str, signature: tuple[int, int]) -> None:
+        self.handle = zipfile.ZipFile(path)
+        self.lock = threading.RLock()
+        self.signature = signature
+        self.leases = 0
+        self.evicted = False
+
+
+class ZipfilePool:
+    """
+    Process-wide LRU pool of open `ZipFile` handles, keyed by path.
+
+    Opening a zipfile parses its central directory, so reusing handles makes reading many members from the same
+    archive much cheaper. Each handle has its own lock so that it is only used by one thread at a time, and handles are
+    reopened if the file on disk has changed since it was opened.
+
+    Handles that are evicted, or replaced because the file changed, while still in use are only closed once the last
+    caller using them is done, so eviction never closes a handle out from under a reader.
+    """
+    max_size: int
+
+    def __init__(self, max_size: int = 16) -> None:
+        self.max_size = max_size
+        self._handles: OrderedDict[str, _PooledZipfile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, entry: _PooledZipfile, to_close: list[_PooledZipfile]):
+        # Must be called while holding `self._lock`
+        entry.evicted = True
+        if not entry.leases:
+            to_close.append(entry)
+
+    @contextmanager
+    def open(self, path: str | Path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        to_close: list[_PooledZipfile] = []
+        with self._lock:
+            entry = self._handles.get(path, None)
+            if entry is not None and entry.signature != signature:
+                self._evict(self._handles.pop(path), to_close)
+                entry = None
+            if entry is None:
+                entry = _PooledZipfile(path, signature)
+                self._handles[path] = entry
+            entry.leases += 1
+            self._handles.move_to_end(path)
+            while len(self._handles) > self.max_size:
+                _, evicted = self._handles.popitem(last=False)
+                self._evict(evicted, to_close)
+        # Nobody else can be using these, as they had no leases and are no longer in the pool
+        for evicted in to_close:
+            evicted.handle.close()
+
+        try:
+            with entry.lock:
+                yield entry.handle
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                close = entry.evicted and not entry.leases
+            if close:
+                entry.handle.close()
+
+    def clear(self):
+        to_close: list[_PooledZipfile] = []
+        with self._lock:
+            for entry in self._handles.values():
+                self._evict(entry, to_close)
+            self._handles.clear()
+        for entry in to_close:
+            entry.handle.close()
+
+
+zipfile_pool = ZipfilePool()
+
+
 class ZipfileScheme(Scheme):
     URI_SCHEME = 'zipped-file'
 
@@ -288,9 +667,47 @@ class ZipfileScheme(Scheme):
             raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
         zipfile_path = uri.path
         inner_file = uri.fragment
-        with zipfile.ZipFile(zipfile_path) as zipfile_fh:
-            with zipfile_fh.open(inner_file) as inner_file_fh:
-                content = inner_file_fh.read()
+        with zipfile_pool.open(zipfile_path) as zipfile_fh:
+            content = zipfile_fh.read(inner_file)
+        return cls._decode(content)
+
+    @classmethod
+    def read_many(
+        cls,
+        uris: list[str],
+        *args,
+        max_workers: int | None = None,
+        **kwargs,
+    ) -> list[bytes | str]:
+        """
+        Reads the members for all `uris`, opening each archive only once. Results are returned in the same order as
+        the uris.
+        """
+        uris = [URI(uri) for uri in uris]
+        members_by_zipfile: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        for idx, uri in enumerate(uris):
+            if uri.scheme != cls.URI_SCHEME:
+                raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
+            members_by_zipfile[uri.path].append((idx, uri.fragment))
+
+        results: list[bytes | str | None] = [None] * len(uris)
+        for zipfile_path, members in members_by_zipfile.items():
+            with zipfile_pool.open(zipfile_path) as zipfile_fh:
+                for idx, inner_file in members:
+                    results[idx] = cls._decode(zipfile_fh.read(inner_file))
+        return results
+
+    @classmethod
+    def stat(
+        cls,
+        uri: str,
+        *args,
+        **kwargs,
+    ) -> tuple[int, int] | None:
+        return _stat_path(URI(uri).path)
+
+    @staticmethod
+    def _decode(content: bytes) -> bytes | str:
         try:
             return content.decode()
         except UnicodeDecodeError:
@@ -325,6 +742,346 @@ class CorpusResourceScheme(Scheme):
         return corpus.read_resource(uri.path)
 
 
+class TarballIndex:
+    """
+    Index of the regular file members of gzipped tarballs, mapping member names to their offset and size in the
+    uncompressed stream.
+
+    Indexes are built as a side effect of streaming over a tarball with `iter_members`, kept in memory, and (unless
+    `persist` is False) saved next to the tarball as `<tarball>.index.json`, so members can later be read directly
+    without scanning the tar headers. Indexes are rebuilt if the tarball on disk has changed.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: dict[str, tuple[tuple[int, int], dict[str, tuple[int, int]]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path: str) -> tuple[int, int]:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _sidecar_path(path: str) -> str:
+        return f"{path}.index.json"
+
+    def iter_members(
+        self,
+        path: str | Path,
+        select: Callable[[str], bool] | None = None,
+        persist: bool = True,
+    ) -> Iterator[tuple[str, bytes]]:
+        """
+        Yields `(name, content)` for the regular file members of the tarball accepted by `select`, in archive order,
+        using a single streaming pass over the archive. Nothing is extracted to disk.
+        """
+        path = os.path.abspath(path)
+        signature = self._signature(path)
+        members: dict[str, tuple[int, int]] = {}
+        with tarfile.open(path, mode="r|gz") as tar_file:
+            for member in tar_file:
+                if not member.isfile():
+                    continue
+                members[member.name] = (member.offset_data, member.size)
+                if select is None or select(member.name):
+                    member_file = tar_file.extractfile(member)
+                    yield member.name, member_file.read()
+        self._store(path, signature, members, persist=persist)
+
+    def get(self, path: str | Path, persist: bool = True) -> dict[str, tuple[int, int]]:
+        path = os.path.abspath(path)
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._indexes.get(path, None)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        sidecar_path = self._sidecar_path(path)
+        try:
+            with open(sidecar_path) as sidecar:
+                saved = json.load(sidecar)
+            if tuple(saved["signature"]) == signature:
+                members = {name: tuple(location) for name, location in saved["members"].items()}
+                with self._lock:
+                    self._indexes[path] = (signature, members)
+                return members
+        except (OSError, ValueError, KeyError):
+            pass
+
+        # No usable index, so build one by scanning the headers.
+        for _ in self.iter_members(path, select=lambda name: False, persist=persist):
+            pass
+        return self._indexes[path][1]
+
+    def _store(self, path: str, signature: tuple[int, int], members: dict[str, tuple[int, int]], persist: bool):
+        with self._lock:
+            self._indexes[path] = (signature, members)
+        if not persist:
+            return
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path), delete=False) as tmp_sidecar:
+                json.dump({"signature": signature, "members": members}, tmp_sidecar)
+            os.replace(tmp_sidecar.name, self._sidecar_path(path))
+        except OSError:
+            # The in memory index is still usable if the tarball's directory isn't writable
+            pass
+
+    def read(self, path: str | Path, names: list[str], persist: bool = True) -> dict[str, bytes]:
+        """
+        Reads the members `names` from the tarball, seeking directly to each member in order of their position.
+        """
+        members = self.get(path, persist=persist)
+        missing = [name for name in names if name not in members]
+        if missing:
+            raise FileNotFoundError(f"Members {', '.join(missing)} not found in tarball `{path}`")
+        results = {}
+        with gzip.open(path, "rb") as stream:
+            for name in sorted(set(names), key=lambda name: members[name][0]):
+                offset, size = members[name]
+                stream.seek(offset)
+                results[name] = stream.read(size)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+tarball_index = TarballIndex()
+
+
+class PythonArchiveIndex:
+    """
+    Maps module names to the members of Python package archives (wheels and sdists) that contain their source.
+
+    For wheels, the modules are taken from the `.py` files listed in the `.dist-info/RECORD` file, limited to the
+    packages in `top_level.txt` if the wheel has one. Sdists are laid out however the project chooses, so the project
+    root (and a `src/` directory, if used) is stripped, and only the packages listed in an `.egg-info/top_level.txt`
+    or, failing that, top level directories that have an `__init__.py`, are included.
+
+    Archives are never extracted. Mappings are cached per archive and rebuilt if the archive changes.
+    """
+    ARCHIVE_SUFFIXES = (".whl", ".zip", ".tar.gz", ".tgz")
+
+    # Directories in an sdist that are never treated as packages if the sdist doesn't say which packages it contains
+    NON_PACKAGE_DIRS = frozenset(("tests", "test", "testing", "docs", "doc", "examples", "benchmarks", "scripts"))
+
+    def __init__(self) -> None:
+        self._modules: dict[str, tuple[tuple[int, int], dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_archive(cls, path: str | Path) -> bool:
+        return str(path).endswith(cls.ARCHIVE_SUFFIXES)
+
+    @staticmethod
+    def is_tarball(path: str | Path) -> bool:
+        return str(path).endswith((".tar.gz", ".tgz"))
+
+    def modules(self, path: str | Path) -> dict[str, str]:
+        """
+        Returns a mapping of module name to archive member for every module in the archive, ordered the same as a
+        walk of the installed package would be (each package before its submodules, siblings sorted by name).
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._modules.get(path, None)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        if self.is_tarball(path):
+            # Don't write index files next to the user's archives
+            member_names = list(tarball_index.get(path, persist=False))
+        else:
+            with zipfile_pool.open(path) as archive:
+                member_names = archive.namelist()
+        if path.endswith(".whl"):
+            modules = self._wheel_modules(path, member_names)
+        else:
+            modules = self._sdist_modules(path, member_names)
+        modules = dict(sorted(modules.items(), key=lambda item: (item[0].count("."), item[0].split("."))))
+        with self._lock:
+            self._modules[path] = (signature, modules)
+        return modules
+
+    @staticmethod
+    def _module_name(relative_path: str) -> str | None:
+        if not relative_path.endswith(".py"):
+            return None
+        parts = relative_path[:-len(".py")].split("/")
+        if parts[-1] == "__init__":
+            parts.pop()
+        if not parts or not all(part.isidentifier() for part in parts):
+            return None
+        return ".".join(parts)
+
+    @staticmethod
+    def _read_top_level(content: bytes) -> set[str]:
+        return {line.strip().replace("/", ".") for line in content.decode().splitlines() if line.strip()}
+
+    def _wheel_modules(self, path: str, member_names: list[str]) -> dict[str, str]:
+        record_name = next((name for name in member_names if name.endswith(".dist-info/RECORD")), None)
+        top_level_name = next((name for name in member_names if name.endswith(".dist-info/top_level.txt")), None)
+        with zipfile_pool.open(path) as archive:
+            if record_name:
+                # RECORD is a csv file of `path,hash,size`. Paths with commas in them are quoted, which module paths
+                # never are.
+                record_names = [
+                    line.split(",", 1)[0] for line in archive.read(record_name).decode().splitlines() if line
+                ]
+                archive_names = set(member_names)
+                member_names = [name for name in record_names if name in archive_names]
+            top_level = self._read_top_level(archive.read(top_level_name)) if top_level_name else None
+
+        modules = {}
+        for member_name in member_names:
+            relative_path = member_name
+            head = member_name.split("/", 1)[0]
+            if head.endswith(".dist-info"):
+                continue
+            elif head.endswith(".data"):
+                # Only the purelib and platlib data directories contain importable modules
+                _, scheme_dir, *rest = member_name.split("/")
+                if scheme_dir not in ("purelib", "platlib") or not rest:
+                    continue
+                relative_path = "/".join(rest)
+            module_name = self._module_name(relative_path)
+            if module_name is None:
+                continue
+            if top_level is not None and module_name.split(".", 1)[0] not in top_level:
+                continue
+            modules[module_name] = member_name
+        return modules
+
+    def _sdist_modules(self, path: str, member_names: list[str]) -> dict[str, str]:
+        # All members of an sdist are in a single `{name}-{version}/` directory
+        roots = {name.split("/", 1)[0] for name in member_names if "/" in name}
+        root = f"{roots.pop()}/" if len(roots) == 1 else ""
+        relative_names = {name: name[len(root):] for name in member_names if name.startswith(root)}
+        if any(relative_name.startswith("src/") for relative_name in relative_names.values()):
+            relative_names = {
+                name: relative_name[len("src/"):]
+                for name, relative_name in relative_names.items()
+                if relative_name.startswith("src/")
+            }
+
+        top_level_name = next(
+            (name for name, relative_name in relative_names.items() if relative_name.endswith(".egg-info/top_level.txt")),
+            None,
+        )
+        if top_level_name:
+            top_level = self._read_top_level(self.read(path, [top_level_name])[top_level_name])
+        else:
+            top_level = {
+                relative_name.split("/", 1)[0]
+                for relative_name in relative_names.values()
+                if relative_name.count("/") == 1 and relative_name.endswith("/__init__.py")
+            } - self.NON_PACKAGE_DIRS
+
+        modules = {}
+        for member_name, relative_name in relative_names.items():
+            module_name = self._module_name(relative_name)
+            if module_name is None or module_name.split(".", 1)[0] not in top_level:
+                continue
+            modules[module_name] = member_name
+        return modules
+
+    def read(self, path: str | Path, member_names: list[str]) -> dict[str, bytes]:
+        """Reads the given members from the archive, opening it only once."""
+        if self.is_tarball(path):
+            return tarball_index.read(path, member_names, persist=False)
+        with zipfile_pool.open(path) as archive:
+            return {member_name: archive.read(member_name) for member_name in member_names}
+
+    def clear(self):
+        with self._lock:
+            self._modules.clear()
+
+
+python_archive_index = PythonArchiveIndex()
+
+
+class PythonArchiveScheme(Scheme):
+    """
+    Python modules that are read from a wheel or sdist archive instead of from an installed package.
+    URIs are of the form `py-archive:{module name}#{absolute archive path}`.
+    """
+    URI_SCHEME = 'py-archive'
+    ALIASES = [
+        "wheel",
+        "sdist",
+    ]
+
+    @classmethod
+    def default_loader(cls) -> "BaseLoader":
+        from .code_library_loader import PythonArchiveLoader
+        return PythonArchiveLoader()
+
+    @classmethod
+    def get_uri_for_location(
+        cls,
+        location: str,
+        base: str = "",
+    ):
+        if not (location and base and os.path.isabs(base)):
+            raise ValueError(f"Value '{location}' in base '{base}' is not a valid py-archive location.")
+
+        return f"{cls.URI_SCHEME}:{location}#{base}"
+
+    @classmethod
+    def join_parts(cls, *parts: list[str]) -> str:
+        return ".".join(parts)
+
+    @classmethod
+    def read(
+        cls,
+        uri: str,
+        *args,
+        **kwargs,
+    ) -> bytes | str:
+        return cls.read_many([uri], *args, **kwargs)[0]
+
+    @classmethod
+    def read_many(
+        cls,
+        uris: list[str],
+        *args,
+        max_workers: int | None = None,
+        **kwargs,
+    ) -> list[bytes | str]:
+        """
+        Reads the source of all of the modules in `uris`, opening each archive only once.
+        """
+        uris = [URI(uri) for uri in uris]
+        modules_by_archive: dict[str, list[str]] = defaultdict(list)
+        for uri in uris:
+            if uri.scheme != cls.URI_SCHEME:
+                raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
+            modules_by_archive[uri.fragment].append(uri.path)
+
+        sources: dict[tuple[str, str], str] = {}
+        for archive_path, module_names in modules_by_archive.items():
+            modules = python_archive_index.modules(archive_path)
+            missing = [module_name for module_name in module_names if module_name not in modules]
+            if missing:
+                raise FileNotFoundError(f"Unable to locate modules {', '.join(missing)} in `{archive_path}`")
+            contents = python_archive_index.read(archive_path, [modules[module_name] for module_name in module_names])
+            for module_name in module_names:
+                sources[(archive_path, module_name)] = importlib.util.decode_source(contents[modules[module_name]])
+        return [sources[(uri.fragment, uri.path)] for uri in uris]
+
+    @classmethod
+    def stat(
+        cls,
+        uri: str,
+        *args,
+        **kwargs,
+    ) -> tuple[int, int] | None:
+        return _stat_path(URI(uri).fragment)
+
+
 class RCranScheme(Scheme):
     URI_SCHEME = "rcran-package"
     ALIASES = [
@@ -341,6 +1098,13 @@ class RCranScheme(Scheme):
         from .code_library_loader import RCRANSourceLoader
         return RCRANSourceLoader()
 
+    @staticmethod
+    def _local_cache(locations: list[str], repo: str | None = None, **kwargs):
+        from .code_library_loader import RCRANLocalCache
+        if repo is not None:
+            kwargs["repo"] = repo
+        return RCRANLocalCache(locations, **kwargs)
+
     @classmethod
     def get_uri_for_location(
         cls,
@@ -357,17 +1121,69 @@ class RCranScheme(Scheme):
         cls,
         uri: str,
         *args,
+        repo: str | None = None,
+        cache_dir: str | Path | None = None,
+        offline: bool | None = None,
         **kwargs,
     ):
-        from .code_library_loader import RCRANLocalCache
+        """
+        Reads a member of a package's source tarball. `repo`, `cache_dir` and `offline` configure the `RCRANLocalCache`
+        that the package is fetched through, using its defaults if not given.
+        """
         uri = URI(uri)
         if uri.scheme != cls.URI_SCHEME:
             raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
 
         package = uri.fragment
         subpath = uri.path
-        with RCRANLocalCache([package]) as cache:
-            target_file = Path(cache[package]) / subpath
-            with target_file.open() as source:
-                content = source.read()
-        return content
+        with cls._local_cache([package], repo=repo, cache_dir=cache_dir, offline=offline) as cache:
+            content = tarball_index.read(cache[package], [subpath])[subpath]
+        return content.decode()
+
+    @classmethod
+    def read_many(
+        cls,
+        uris: list[str],
+        *args,
+        max_workers: int | None = None,
+        repo: str | None = None,
+        cache_dir: str | Path | None = None,
+        offline: bool | None = None,
+        **kwargs,
+    ) -> list[bytes | str]:
+        """
+        Reads all `uris` within a single cache context so that each package is only fetched once.
+        """
+        uris = [URI(uri) for uri in uris]
+        for uri in uris:
+            if uri.scheme != cls.URI_SCHEME:
+                raise ValueError(f"Provided scheme '{uri.scheme}' does not match expected scheme '{cls.URI_SCHEME}'.")
+
+        members_by_package: dict[str, list[str]] = defaultdict(list)
+        for uri in uris:
+            members_by_package[uri.fragment].append(uri.path)
+        with cls._local_cache(
+            list(members_by_package), repo=repo, cache_dir=cache_dir, offline=offline
+        ) as cache:
+            # Each tarball is opened once, and its members are read in archive order
+            contents = {
+                package: tarball_index.read(cache[package], members)
+                for package, members in members_by_package.items()
+            }
+        return [contents[uri.fragment][uri.path].decode() for uri in uris]
+
+    @classmethod
+    def stat(
+        cls,
+        uri: str,
+        *args,
+        repo: str | None = None,
+        cache_dir: str | Path | None = None,
+        offline: bool | None = None,
+        **kwargs,
+    ) -> tuple[int, int] | None:
+        """
+        Packages are only stat'ed if their tarball is already in the cache, as fetching would cost more than reading.
+        """
+        cache = cls._local_cache([], repo=repo, cache_dir=cache_dir, offline=offline)
+        return _stat_path(cache.cached_tarball(URI(uri).fragment))
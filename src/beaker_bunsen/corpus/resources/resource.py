@@ -11,6 +11,8 @@ from typing import Any, Generator, TypeAlias, Optional, Callable
 from ..types import (
     RecordID, Image, Metadata, URI, Record, ValidationError
 )
+from ..util.helpers import estimate_tokens, token_count_method
+from ..util.tracing import span
 
 
 class ResourceType(enum.Enum):
@@ -55,6 +57,9 @@ class Resource:
     basedir: str | Path = ""
     content_is_complete: bool | None = None
     validated: bool
+    # Resources produced from the same read and parse of this resource, such as the docstrings and doctests in the
+    # source of a code resource. They are ingested alongside this resource, in to their own partitions.
+    derived_resources: list["Resource"]
 
     def __init__(self,
         uri: URI | str,
@@ -64,6 +69,7 @@ class Resource:
         metadata: Metadata  |  None = None,
         basedir: str | Path = "",
         content_is_complete: bool | None = None,
+        derived_resources: list["Resource"] | None = None,
     ) -> None:
         self.uri = URI(uri)
         self.id = id
@@ -76,6 +82,7 @@ class Resource:
             self.metadata = metadata
         self.basedir = basedir
         self.content_is_complete = content_is_complete
+        self.derived_resources = derived_resources or []
         self.validated = False
 
         if self.content is None and self.file_handle is None:
@@ -115,7 +122,8 @@ class Resource:
         if splitter is None:
             chunks = [content]
         else:
-            chunks = splitter.split_text(content)
+            with span("splitter.split", splitter=type(splitter).__name__, chars=len(content)):
+                chunks = splitter.split_text(content)
 
         for chunk_num, chunk in enumerate(
                 chunks,
@@ -124,7 +132,13 @@ class Resource:
             record = Record(
                 id=f"{self.id}:{chunk_num}",
                 uri=self.uri,
-                metadata=self.metadata,
+                metadata={
+                    **(self.metadata or {}),
+                    # Stored so that prompts can be packed without re-tokenizing, and adjacent chunks merged
+                    "chunk_num": chunk_num,
+                    "token_count": estimate_tokens(chunk),
+                    "token_count_method": token_count_method(),
+                },
                 content=chunk,
             )
             yield record
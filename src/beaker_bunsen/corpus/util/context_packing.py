@@ -0,0 +1,160 @@
+"""
+Packing of query matches in to a token budget, for use as context in prompts.
+
+Adjacent chunks of the same resource are merged back together, duplicates and near-duplicates are dropped, and the
+remaining matches are added in order of relevance while they fit in the budget. Token counts are read from the
+`token_count` stored in each record's metadata at ingest, so packing only has to re-tokenize records whose count was
+made in a different way (see `token_count_method`) than the others it is compared with.
+"""
+import re
+from collections import defaultdict
+
+from .helpers import estimate_tokens, token_count_method
+from ..types import QueryResult, Record
+
+
+# Upper limit on the number of characters searched for the overlap between two adjacent chunks
+MAX_CHUNK_OVERLAP = 1000
+
+# Matches whose words overlap at least this much (Jaccard similarity) with a more relevant match are dropped
+NEAR_DUPLICATE_SIMILARITY = 0.9
+
+_word_re = re.compile(r"\w+")
+
+
+def record_tokens(record: Record) -> int:
+    """
+    Returns the number of tokens in the record, as stored at ingest. Records whose count was made by a different
+    method than `estimate_tokens` uses now, e.g. a corpus built with tiktoken used where its encodings can't be loaded,
+    or that have no count stored, are counted again so that all counts compared in a budget are alike.
+    """
+    metadata = record.metadata or {}
+    token_count = metadata.get("token_count", None)
+    same_method = metadata.get("token_count_method", None) == token_count_method()
+    if isinstance(token_count, int) and (same_method or not record.content):
+        return token_count
+    return estimate_tokens(record.content or "")
+
+
+def _resource_id(record: Record) -> str:
+    return str(record.id).rsplit(":", 1)[0]
+
+
+def _chunk_num(record: Record) -> int | None:
+    chunk_num = (record.metadata or {}).get("chunk_num", None)
+    if isinstance(chunk_num, int):
+        return chunk_num
+    _, _, suffix = str(record.id).rpartition(":")
+    return int(suffix) if suffix.isdigit() else None
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """
+    Joins two consecutive chunks, removing the text repeated at the end of the first and start of the second.
+    """
+    for size in range(min(len(first), len(second), MAX_CHUNK_OVERLAP), 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return f"{first}\n{second}"
+
+
+def merge_adjacent_chunks(matches: list[QueryResult]) -> list[QueryResult]:
+    """
+    Merges matches for consecutive chunks of the same resource in to a single match, keeping the best distance, and
+    drops repeated matches for the same chunk. Results are ordered by distance.
+    """
+    by_resource: dict[str, dict[int | None, QueryResult]] = defaultdict(dict)
+    unchunked: list[QueryResult] = []
+    for match in matches:
+        record = match["record"]
+        chunk_num = _chunk_num(record)
+        if chunk_num is None:
+            unchunked.append(match)
+            continue
+        chunks = by_resource[_resource_id(record)]
+        if chunk_num not in chunks or match["distance"] < chunks[chunk_num]["distance"]:
+            chunks[chunk_num] = match
+
+    merged: list[QueryResult] = list(unchunked)
+    for resource_id, chunks in by_resource.items():
+        runs: list[list[QueryResult]] = []
+        previous_num = None
+        for chunk_num in sorted(chunks):
+            if runs and chunk_num == previous_num + 1:
+                runs[-1].append(chunks[chunk_num])
+            else:
+                runs.append([chunks[chunk_num]])
+            previous_num = chunk_num
+
+        for run in runs:
+            if len(run) == 1:
+                merged.append(run[0])
+                continue
+            first, last = run[0]["record"], run[-1]["record"]
+            content = first.content or ""
+            for match in run[1:]:
+                content = _join_overlapping(content, match["record"].content or "")
+            record = Record(
+                id=f"{resource_id}:{_chunk_num(first)}-{_chunk_num(last)}",
+                uri=first.uri,
+                content=content,
+                metadata={
+                    **(first.metadata or {}),
+                    # The overlap removed when joining is small, so the sum is a close, safe, upper bound
+                    "token_count": sum(record_tokens(match["record"]) for match in run),
+                    "token_count_method": token_count_method(),
+                },
+            )
+            merged.append(QueryResult(record=record, distance=min(match["distance"] for match in run)))
+    return sorted(merged, key=lambda match: match["distance"])
+
+
+def _words(content: str | None) -> frozenset[str]:
+    return frozenset(word.lower() for word in _word_re.findall(content or ""))
+
+
+def drop_near_duplicates(
+    matches: list[QueryResult],
+    similarity: float = NEAR_DUPLICATE_SIMILARITY,
+) -> list[QueryResult]:
+    """
+    Drops matches whose content is the same as, or nearly the same as, a match earlier in the list.
+    """
+    kept: list[tuple[QueryResult, frozenset[str]]] = []
+    for match in matches:
+        words = _words(match["record"].content)
+        if any(
+            words == other_words
+            or (words and other_words and len(words & other_words) / len(words | other_words) >= similarity)
+            for _, other_words in kept
+        ):
+            continue
+        kept.append((match, words))
+    return [match for match, _ in kept]
+
+
+def pack_matches(
+    matches: list[QueryResult] | None,
+    token_budget: int,
+    max_distance: float | None = None,
+    similarity: float = NEAR_DUPLICATE_SIMILARITY,
+) -> list[QueryResult]:
+    """
+    Selects the most relevant matches that fit within `token_budget`. Matches further than `max_distance` from the
+    query are dropped, adjacent chunks are merged and near-duplicates removed before the budget is filled greedily,
+    skipping matches that don't fit in the remaining budget.
+    """
+    if not matches or token_budget <= 0:
+        return []
+    if max_distance is not None:
+        matches = [match for match in matches if match["distance"] <= max_distance]
+    candidates = drop_near_duplicates(merge_adjacent_chunks(matches), similarity=similarity)
+
+    packed = []
+    remaining = token_budget
+    for match in candidates:
+        tokens = record_tokens(match["record"])
+        if tokens <= remaining:
+            packed.append(match)
+            remaining -= tokens
+    return packed
@@ -0,0 +1,351 @@
+"""
+Deterministic extraction of examples from source files and documentation.
+
+Finds doctests, reStructuredText code blocks, markdown fenced code blocks and R `@examples`/`\\examples{}` blocks
+without needing a language model, so that whole libraries can be harvested quickly and reproducibly.
+"""
+import doctest
+import os
+import re
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import PurePosixPath
+
+from .helpers import extract_md_codeblocks
+
+
+@dataclass
+class HarvestedExample:
+    """
+    An example found in a document. `start_line` and `stop_line` are 1-based and inclusive.
+    """
+    description: str
+    code: str
+    language: str | None
+    start_line: int
+    stop_line: int
+    output: str | None = None
+    source: str = ""
+
+    def as_markdown(self) -> str:
+        content = f"""
+# Description
+{self.description}
+
+# Code
+```{self.language or ""}
+{self.code.rstrip()}
+```
+""".lstrip()
+        if self.output:
+            content += f"""
+# Response
+```
+{self.output.rstrip()}
+```
+"""
+        return content
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+# Fenced code in these languages rarely demonstrates how to use a library, so it is not harvested.
+NON_CODE_LANGUAGES = frozenset((
+    "text", "txt", "console", "output", "json", "yaml", "yml", "toml", "ini", "bash", "sh", "shell", "shell-session",
+    "html", "xml", "csv", "diff",
+))
+
+# Minimum number of lines of code for a fenced or rst code block to be considered an example.
+MIN_BLOCK_LINES = 2
+
+PYTHON_EXTENSIONS = (".py", ".pyi")
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".rmd", ".qmd")
+RST_EXTENSIONS = (".rst", ".txt")
+
+_doctest_parser = doctest.DocTestParser()
+_rst_directive_re = re.compile(r"^(?P<indent>[ \t]*)\.\.[ \t]+(?:code-block|code|sourcecode)::[ \t]*(?P<language>\S*)")
+_roxygen_examples_re = re.compile(r"^#'\s*@examples(?:If\b.*)?\s*$")
+_roxygen_tag_re = re.compile(r"^#'\s*@\w+")
+
+
+def _source_kind(location: str) -> str:
+    location = location.lower()
+    if location.startswith(("py-mod:", "py-archive:")):
+        return "python"
+    path = location.split("#", 1)[0]
+    if path.endswith(PYTHON_EXTENSIONS):
+        return "python"
+    elif path.endswith(".r"):
+        return "r"
+    elif path.endswith(".rd"):
+        return "rd"
+    elif path.endswith(MARKDOWN_EXTENSIONS):
+        return "markdown"
+    elif path.endswith(RST_EXTENSIONS):
+        return "rst"
+    return "text"
+
+
+def _display_name(location: str) -> str:
+    if location.startswith(("py-mod:", "py-archive:")):
+        return location.split(":", 1)[1].split("#", 1)[0]
+    return PurePosixPath(location.split("#", 1)[0]).name or location
+
+
+def _doctest_sessions(
+    examples: list[doctest.Example],
+    subject: str,
+    line_offset: int = 0,
+) -> list[HarvestedExample]:
+    """
+    Groups consecutive doctest examples that are only separated by their expected output in to single examples.
+    Example line numbers are 0-based and relative to `line_offset`.
+    """
+    sessions: list[list[doctest.Example]] = []
+    next_expected_line = None
+    for example in examples:
+        if sessions and example.lineno == next_expected_line:
+            sessions[-1].append(example)
+        else:
+            sessions.append([example])
+        next_expected_line = example.lineno + example.source.count("\n") + example.want.count("\n")
+
+    harvested = []
+    for session in sessions:
+        last = session[-1]
+        harvested.append(HarvestedExample(
+            description=f"Example usage of `{subject}`, from its documentation." if subject else "Doctest example.",
+            code="".join(example.source for example in session),
+            output="".join(example.want for example in session) or None,
+            language="python",
+            start_line=line_offset + session[0].lineno + 1,
+            stop_line=line_offset + last.lineno + last.source.count("\n") + last.want.count("\n"),
+            source="doctest",
+        ))
+    return harvested
+
+
+def harvest_doctests(content: str, name: str = "") -> list[HarvestedExample]:
+    """
+    Finds `>>>` doctest sessions in a text document.
+    """
+    if ">>>" not in content:
+        return []
+    try:
+        examples = _doctest_parser.get_examples(content, name=name)
+    except ValueError:
+        return []
+    return _doctest_sessions(examples, name)
+
+
+def harvest_python_doctests(content: str, module_name: str = "") -> list[HarvestedExample]:
+    """
+    Finds doctest sessions in the docstrings of a Python module and its classes and functions.
+    """
+    from ..loaders.python_source import parse_definitions
+    if ">>>" not in content:
+        return []
+    harvested = []
+    for definition in parse_definitions(module_name, content):
+        if definition.examples:
+            harvested.extend(_doctest_sessions(
+                definition.examples, definition.qualname, line_offset=definition.docstring_lineno - 1,
+            ))
+    return harvested
+
+
+def harvest_rst_code_blocks(content: str, name: str = "") -> list[HarvestedExample]:
+    """
+    Finds reStructuredText `code-block`, `code` and `sourcecode` directives.
+    """
+    lines = content.splitlines()
+    harvested = []
+    idx = 0
+    while idx < len(lines):
+        match = _rst_directive_re.match(lines[idx])
+        idx += 1
+        if not match:
+            continue
+        indent = len(match.group("indent").expandtabs())
+        language = match.group("language") or None
+
+        # Skip directive options (e.g. `:linenos:`) and blank lines before the body
+        while idx < len(lines) and (not lines[idx].strip() or (
+            lines[idx].lstrip().startswith(":") and len(lines[idx]) - len(lines[idx].lstrip()) > indent
+        )):
+            idx += 1
+        start = idx
+        while idx < len(lines) and (not lines[idx].strip() or len(lines[idx].expandtabs()) - len(lines[idx].expandtabs().lstrip()) > indent):
+            idx += 1
+        stop = idx
+        while stop > start and not lines[stop - 1].strip():
+            stop -= 1
+        if stop - start < MIN_BLOCK_LINES or (language and language.lower() in NON_CODE_LANGUAGES):
+            continue
+        harvested.append(HarvestedExample(
+            description=f"Code example from `{name}`." if name else "Code example.",
+            code=textwrap.dedent("\n".join(lines[start:stop])) + "\n",
+            language=language,
+            start_line=start + 1,
+            stop_line=stop,
+            source="rst",
+        ))
+    return harvested
+
+
+def harvest_md_codeblocks(content: str, name: str = "") -> list[HarvestedExample]:
+    """
+    Finds markdown fenced code blocks, using `extract_md_codeblocks`. R markdown style languages such as `{r}` are
+    supported.
+    """
+    if "```" not in content:
+        return []
+    try:
+        codeblocks = extract_md_codeblocks(content)
+    except ValueError:
+        # An unterminated or malformed fence
+        return []
+
+    harvested = []
+    cursor = 0
+    for code, codetype in codeblocks:
+        position = content.find(code, cursor)
+        if position == -1:
+            continue
+        cursor = position + len(code)
+        # Handles plain languages (`python`) as well as R markdown style chunk headers (`{r, echo=FALSE}`)
+        language = (codetype or "").strip().strip("{}").split(",")[0].strip() or None
+        if language:
+            language = language.split()[0]
+        if (language and language.lower() in NON_CODE_LANGUAGES) or len(code.strip().splitlines()) < MIN_BLOCK_LINES:
+            continue
+        start_line = content.count("\n", 0, position) + 1
+        harvested.append(HarvestedExample(
+            description=f"Code example from `{name}`." if name else "Code example.",
+            code=code,
+            language=language,
+            start_line=start_line,
+            stop_line=start_line + code.rstrip("\n").count("\n"),
+            source="markdown",
+        ))
+    return harvested
+
+
+def harvest_r_examples(content: str, name: str = "") -> list[HarvestedExample]:
+    """
+    Finds roxygen `@examples` blocks in R source files.
+    """
+    lines = content.splitlines()
+    harvested = []
+    idx = 0
+    while idx < len(lines):
+        if not _roxygen_examples_re.match(lines[idx].strip()):
+            idx += 1
+            continue
+        idx += 1
+        start = idx
+        while idx < len(lines) and lines[idx].lstrip().startswith("#'") and not _roxygen_tag_re.match(lines[idx].strip()):
+            idx += 1
+        code_lines = [re.sub(r"^\s*#' ?", "", line) for line in lines[start:idx]]
+        code = "\n".join(code_lines).strip("\n")
+        if not code.strip():
+            continue
+        harvested.append(HarvestedExample(
+            description=f"Example usage from the documentation in `{name}`." if name else "R example.",
+            code=f"{code}\n",
+            language="r",
+            start_line=start + 1,
+            stop_line=idx,
+            source="roxygen",
+        ))
+    return harvested
+
+
+def harvest_rd_examples(content: str, name: str = "") -> list[HarvestedExample]:
+    """
+    Finds the `\\examples{}` section of R documentation (`.Rd`) files.
+    """
+    start = content.find("\\examples{")
+    if start == -1:
+        return []
+    body_start = start + len("\\examples{")
+    depth = 1
+    idx = body_start
+    while idx < len(content) and depth:
+        char = content[idx]
+        if char == "\\":
+            # Skip escaped characters, e.g. `\%` and `\{`
+            idx += 2
+            continue
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        idx += 1
+    body = content[body_start:idx - 1]
+    code = re.sub(r"\\([%{}\\])", r"\1", body).strip("\n")
+    if not code.strip():
+        return []
+    start_line = content.count("\n", 0, body_start) + 1
+    return [HarvestedExample(
+        description=f"Example usage of `{name.rsplit('.', 1)[0]}`, from its documentation." if name else "R example.",
+        code=textwrap.dedent(code) + "\n",
+        language="r",
+        start_line=start_line,
+        stop_line=content.count("\n", 0, idx) + 1,
+        source="rd",
+    )]
+
+
+def harvest_examples(content: str, location: str = "") -> list[HarvestedExample]:
+    """
+    Harvests all of the examples that can be found in `content`, choosing the harvesters to use based on the type of
+    the document at `location`. Examples are returned in the order they appear in the document.
+    """
+    if not isinstance(content, str) or not content:
+        return []
+    kind = _source_kind(location)
+    name = _display_name(location)
+
+    if kind == "python":
+        module_name = name.removesuffix(".py").removesuffix(".pyi")
+        examples = harvest_python_doctests(content, module_name)
+    elif kind == "r":
+        examples = harvest_r_examples(content, name)
+    elif kind == "rd":
+        examples = harvest_rd_examples(content, name)
+    elif kind == "markdown":
+        examples = harvest_md_codeblocks(content, name)
+        examples.extend(
+            example for example in harvest_doctests(content, name)
+            if not any(other.start_line <= example.start_line <= other.stop_line for other in examples)
+        )
+    elif kind == "rst":
+        examples = harvest_rst_code_blocks(content, name) + harvest_doctests(content, name)
+    else:
+        examples = harvest_md_codeblocks(content, name) + harvest_doctests(content, name)
+    return sorted(examples, key=lambda example: example.start_line)
+
+
+def _harvest_item(item: tuple[str, str]) -> list[HarvestedExample]:
+    content, location = item
+    return harvest_examples(content, location)
+
+
+# Below this many documents, harvesting in the current process is faster than starting worker processes.
+PARALLEL_HARVEST_THRESHOLD = 32
+
+
+def harvest_many(items: list[tuple[str, str]], max_workers: int | None = None) -> list[list[HarvestedExample]]:
+    """
+    Harvests examples from many `(content, location)` pairs, spreading the work over a process pool when there are
+    enough documents for it to pay off. Results are returned in the same order as `items`.
+    """
+    if len(items) < PARALLEL_HARVEST_THRESHOLD or max_workers == 1:
+        return [_harvest_item(item) for item in items]
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(items) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_harvest_item, items, chunksize=chunksize))
@@ -4,6 +4,8 @@ from pathlib import Path
 
 import tiktoken
 
+from .logging import logger
+
 
 def count_words(source: str) -> int:
     """Count the number of words in a string. A word is denoted by whitespace."""
@@ -39,6 +41,43 @@ def count_tokens(
     return len(encoding.encode(source))
 
 
+# Ways that `estimate_tokens` can count tokens. Counts made in different ways aren't comparable.
+TIKTOKEN_TOKEN_COUNT = "tiktoken"
+ESTIMATED_TOKEN_COUNT = "estimate"
+
+# Whether tiktoken's encodings can be loaded, which is only known once they have been tried
+_tiktoken_available: bool | None = None
+
+
+def token_count_method() -> str:
+    """
+    Returns how `estimate_tokens` counts tokens in this environment: with tiktoken when its encodings can be loaded,
+    otherwise by estimating. Counts that are stored should be stored along with the method that made them.
+    """
+    global _tiktoken_available
+    if _tiktoken_available is None:
+        try:
+            tiktoken.get_encoding("cl100k_base")
+            _tiktoken_available = True
+        except Exception as err:
+            # Encodings are downloaded on first use, which isn't possible offline. Don't keep trying.
+            logger.warning(
+                f"Unable to load tiktoken's encodings, so token counts are estimated at ~4 characters per token: {err}"
+            )
+            _tiktoken_available = False
+    return TIKTOKEN_TOKEN_COUNT if _tiktoken_available else ESTIMATED_TOKEN_COUNT
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Counts tokens with tiktoken when its encodings are available, otherwise estimates ~4 characters per token.
+    See `token_count_method`.
+    """
+    if isinstance(text, str) and token_count_method() == TIKTOKEN_TOKEN_COUNT:
+        return count_tokens(text)
+    return len(text) // 4 + 1
+
+
 def extract_md_codeblocks(source: str) -> list[tuple[str, str|None]]:
     """
     Extracts markdown fenced code blocks, along with the code type, if provided.
@@ -80,3 +119,23 @@ def common_path_portion(paths: list[str | Path]) -> str:
         return ""
     else:
         return os.path.join(*path_parts[0][0:step])
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the directory used for persistent caches.
+    Can be set with the `BUNSEN_CACHE_DIR` environment variable, otherwise defaults to the user's cache directory.
+    """
+    cache_dir = os.environ.get("BUNSEN_CACHE_DIR", None)
+    if cache_dir:
+        return Path(cache_dir)
+    base_cache_dir = os.environ.get("XDG_CACHE_HOME", None) or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base_cache_dir) / "beaker-bunsen"
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Reads a boolean flag from the environment."""
+    value = os.environ.get(name, None)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,78 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+class RetrievalCache:
+    """
+    Cache of query responses, keyed by partition, normalized query and limit.
+
+    Entries are kept for a single turn, and dropped when a new turn starts, unless `max_size` is set, in which case up to
+    `max_size` of the most recently used entries are kept for the rest of the session. Concurrent requests for the same
+    key share a single query.
+    """
+    max_size: int
+
+    def __init__(self, max_size: int = 0) -> None:
+        self.max_size = max_size
+        self.turn: Hashable = None
+        self._entries: OrderedDict[tuple, asyncio.Future] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(partition: str | None, query: str, limit: int) -> tuple:
+        return (partition, normalize_query(query), limit)
+
+    def start_turn(self, turn: Hashable):
+        """
+        Starts a new turn if `turn` differs from the current one, dropping the previous turn's entries unless the cache
+        is kept for the session.
+        """
+        if turn == self.turn:
+            return
+        self.turn = turn
+        if not self.max_size:
+            self._entries.clear()
+
+    def __contains__(self, key: tuple[str | None, str, int]) -> bool:
+        """
+        Returns True if a response for `(partition, query, limit)` is cached, or being queried.
+        """
+        partition, query, limit = key
+        return self.key(partition, query, limit) in self._entries
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_query(
+        self,
+        partition: str | None,
+        query: str,
+        limit: int,
+        run_query: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        key = self.key(partition, query, limit)
+        future = self._entries.get(key, None)
+        if future is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.ensure_future(run_query())
+        self._entries[key] = future
+        if self.max_size:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # Failures aren't cached, so the next request tries again
+            if self._entries.get(key, None) is future:
+                del self._entries[key]
+            raise
@@ -0,0 +1,166 @@
+"""
+Timing and counters for the work done answering each turn, e.g. fetching the subkernel state, querying each partition
+and assembling the prompt.
+
+A `TurnTelemetry` collects the spans, counters and values for a single turn. When the turn is finished its values are
+folded in to `histograms`, the in-process histograms that aggregate every turn in the session and can be dumped at any
+time.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Hashable, Iterator
+
+
+# Upper bounds of the histogram buckets, a 1-2-5 series covering distances, milliseconds and token counts alike
+DEFAULT_BUCKETS: tuple[float, ...] = tuple(
+    mantissa * 10 ** exponent
+    for exponent in range(-3, 6)
+    for mantissa in (1, 2, 5)
+)
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, keeping the count, sum, min and max of its values and an estimate of their percentiles.
+    """
+    buckets: tuple[float, ...]
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # The last count is for values over the highest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> float | None:
+        """
+        Returns the upper bound of the bucket containing the `percent`th percentile, clamped to the values seen.
+        """
+        if not self.count:
+            return None
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class HistogramRegistry:
+    """
+    Named histograms, created as values are first observed. Safe to use from multiple threads.
+    """
+
+    def __init__(self) -> None:
+        self._histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            histogram = self._histograms.get(name, None)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def get(self, name: str) -> Histogram | None:
+        return self._histograms.get(name, None)
+
+    def dump(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {name: histogram.as_dict() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+histograms = HistogramRegistry()
+
+
+class TurnTelemetry:
+    """
+    The spans (in milliseconds), counters and values recorded while answering a single turn.
+    """
+    turn: Hashable
+
+    def __init__(self, turn: Hashable) -> None:
+        self.turn = turn
+        self.started_at = time.time()
+        self.spans: dict[str, list[float]] = defaultdict(list)
+        self.counters: Counter[str] = Counter()
+        self.values: dict[str, list[float]] = defaultdict(list)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Times the enclosed block, including any time spent awaiting. Spans with the same name are all kept.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name].append((time.perf_counter() - start) * 1000)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def record(self, name: str, value: float):
+        self.values[name].append(value)
+
+    def finish(self, registry: HistogramRegistry | None = None) -> dict[str, Any]:
+        """
+        Adds the turn to the histograms in `registry` (the module's `histograms` by default), returning the turn's
+        telemetry as a JSON serializable dict.
+        """
+        if registry is None:
+            registry = histograms
+        for name, durations in self.spans.items():
+            for duration in durations:
+                registry.observe(f"{name}.ms", duration)
+        for name, values in self.values.items():
+            for value in values:
+                registry.observe(name, value)
+        for name, count in self.counters.items():
+            registry.observe(name, count)
+        return self.as_dict()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "turn": self.turn,
+            "started_at": self.started_at,
+            "duration_ms": (time.time() - self.started_at) * 1000,
+            "spans_ms": {name: sum(durations) for name, durations in self.spans.items()},
+            "span_counts": {name: len(durations) for name, durations in self.spans.items()},
+            "counters": dict(self.counters),
+            "values": {name: list(values) for name, values in self.values.items()},
+        }
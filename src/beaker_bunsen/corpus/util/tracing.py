@@ -0,0 +1,214 @@
+"""
+Spans for profiling corpus builds: discovering and reading resources, splitting, embedding, adding records to the
+store and saving.
+
+Tracing is off by default. The default tracer is a `NullTracer`, whose spans are a shared no-op context manager, so the
+instrumented code pays no more than a function call per span. To trace a build, install a `RecordingTracer`:
+
+    tracer = RecordingTracer(trace_memory=True)
+    with tracing(tracer):
+        corpus.ingest(locations)
+    tracer.write_chrome_trace("trace.json")  # Open in chrome://tracing or https://ui.perfetto.dev
+    print(tracer.format_summary())
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ContextManager, Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+
+_null_span = nullcontext()
+
+
+@dataclass
+class SpanEvent:
+    name: str
+    start_us: float
+    duration_us: float
+    thread_id: int
+    args: dict[str, Any] = field(default_factory=dict)
+    memory_delta_bytes: int | None = None
+
+
+class NullTracer:
+    """
+    Tracer that records nothing, used while tracing is off.
+    """
+    enabled: bool = False
+
+    def span(self, name: str, **args: Any) -> ContextManager[None]:
+        return _null_span
+
+
+class RecordingTracer(NullTracer):
+    """
+    Tracer that records every span, for export as Chrome trace events or as a summary per stage.
+
+    If `trace_memory` is set, tracemalloc is started and each span records the change in traced memory over the span.
+    A snapshot is also taken as each stage (span name) first completes, to find where a stage's memory was allocated
+    with `top_allocations`.
+    """
+    enabled: bool = True
+    events: list[SpanEvent]
+    snapshots: dict[str, tracemalloc.Snapshot]
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.events = []
+        self.snapshots = {}
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+        self._baseline: tracemalloc.Snapshot | None = None
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        memory_start = tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = SpanEvent(
+                name=name,
+                start_us=(start - self._origin) * 1_000_000,
+                duration_us=(end - start) * 1_000_000,
+                thread_id=threading.get_ident(),
+                args=args,
+            )
+            if memory_start is not None and tracemalloc.is_tracing():
+                event.memory_delta_bytes = tracemalloc.get_traced_memory()[0] - memory_start
+                if name not in self.snapshots:
+                    self.snapshots[name] = tracemalloc.take_snapshot()
+            with self._lock:
+                self.events.append(event)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """
+        Returns the spans in the Chrome trace event format, as complete ("X") events.
+        """
+        pid = os.getpid()
+        trace_events = []
+        for event in self.events:
+            args = {key: value if isinstance(value, (int, float, bool)) else str(value) for key, value in event.args.items()}
+            if event.memory_delta_bytes is not None:
+                args["memory_delta_bytes"] = event.memory_delta_bytes
+            trace_events.append({
+                "name": event.name,
+                "cat": event.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": event.start_us,
+                "dur": event.duration_us,
+                "pid": pid,
+                "tid": event.thread_id,
+                "args": args,
+            })
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str | Path):
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """
+        Returns the count, total, mean and max duration of each stage, along with the net memory allocated by it if
+        memory is traced. Nested spans are included in the totals of their parents.
+        """
+        stages: dict[str, dict[str, Any]] = {}
+        for event in self.events:
+            stage = stages.setdefault(event.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "memory_delta_kb": None})
+            duration_ms = event.duration_us / 1000
+            stage["count"] += 1
+            stage["total_ms"] += duration_ms
+            stage["max_ms"] = max(stage["max_ms"], duration_ms)
+            if event.memory_delta_bytes is not None:
+                stage["memory_delta_kb"] = (stage["memory_delta_kb"] or 0) + event.memory_delta_bytes / 1024
+        for stage in stages.values():
+            stage["mean_ms"] = stage["total_ms"] / stage["count"]
+        return dict(sorted(stages.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':<32} {'count':>8} {'total ms':>12} {'mean ms':>10} {'max ms':>10} {'memory kb':>12}"]
+        for name, stage in self.summary().items():
+            memory = f"{stage['memory_delta_kb']:.1f}" if stage["memory_delta_kb"] is not None else "-"
+            lines.append(
+                f"{name:<32} {stage['count']:>8} {stage['total_ms']:>12.1f} {stage['mean_ms']:>10.2f} "
+                f"{stage['max_ms']:>10.1f} {memory:>12}"
+            )
+        return "\n".join(lines)
+
+    def top_allocations(self, stage: str, limit: int = 10) -> list[tracemalloc.StatisticDiff]:
+        """
+        Returns the source lines that had allocated the most memory, since tracing started, when `stage` first completed.
+        """
+        snapshot = self.snapshots.get(stage, None)
+        if snapshot is None or self._baseline is None:
+            return []
+        return snapshot.compare_to(self._baseline, "lineno")[:limit]
+
+
+_tracer: NullTracer = NullTracer()
+
+
+def get_tracer() -> NullTracer:
+    return _tracer
+
+
+def set_tracer(tracer: NullTracer | None) -> NullTracer:
+    """
+    Installs `tracer` as the process wide tracer, or turns tracing off if None. Returns the previous tracer.
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = tracer if tracer is not None else NullTracer()
+    return previous
+
+
+@contextmanager
+def tracing(tracer: NullTracer) -> Iterator[NullTracer]:
+    previous = set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        set_tracer(previous)
+
+
+def span(name: str, **args: Any) -> ContextManager[None]:
+    return _tracer.span(name, **args)
+
+
+def traced_iter(iterable: Iterable[T], name: str, **args: Any) -> Iterable[T]:
+    """
+    Traces the time taken to produce each item of a lazy iterable, e.g. resources from a loader's `discover`, as a span
+    per item. The iterable is returned unchanged if tracing is off.
+    """
+    if not _tracer.enabled:
+        return iterable
+    return _traced_iter(iter(iterable), name, args)
+
+
+def _traced_iter(iterator: Iterator[T], name: str, args: dict[str, Any]) -> Iterator[T]:
+    while True:
+        with _tracer.span(name, **args):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
@@ -39,10 +39,7 @@ class BaseChromaDBStore(VectorStore):
     @classmethod
     def wrap_data_loader(cls, data_loader: BaseLoader):
         def wrapped_loader(uris: Sequence[str]):
-            result = []
-            for uri in uris:
-                result.append(data_loader.read(uri))
-            return result
+            return data_loader.read_many(list(uris))
         return wrapped_loader
 
     @classmethod
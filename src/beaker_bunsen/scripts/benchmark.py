@@ -0,0 +1,501 @@
+import ast
+import asyncio
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import click
+
+from ..__about__ import __version__
+from ..bunsen_context import BunsenContext
+from ..corpus.corpus import Corpus, default_embedder_map
+from ..corpus.loaders.code_library_loader import PythonLibraryLoader
+from ..corpus.loaders.local_file_loader import LocalFileLoader
+from ..corpus.resources import ResourceType
+from ..corpus.types import QueryResponse, Record
+from ..corpus.util.helpers import estimate_tokens
+from ..corpus.util.splitters import RecursiveCharacterTextSplitter
+from ..corpus.vector_stores.chromadb_store import ZippedChromaDBStore
+from .synthetic_corpus import SCALES, SyntheticCorpus, generate_synthetic_corpus, source_size
+
+
+# Version of the results format, bumped if results stop being comparable with older baselines
+RESULTS_VERSION = 1
+
+# Relative change in a metric, in the worse direction, reported as a regression
+DEFAULT_THRESHOLD = 0.2
+
+# Metrics are grouped by the direction that is better for them
+LOWER_IS_BETTER = ("seconds", "latency_ms")
+HIGHER_IS_BETTER = ("throughput",)
+
+
+@dataclass
+class BenchmarkRun:
+    """
+    State shared by the benchmarks run against a single generated corpus, e.g. the store populated by `add-records` is
+    queried by `query`.
+    """
+    corpus: SyntheticCorpus
+    workdir: Path
+    repeat: int
+    shared: dict[str, Any] = field(default_factory=dict)
+
+
+BENCHMARKS: dict[str, Callable[[BenchmarkRun], dict[str, Any]]] = {}
+
+
+def benchmark(name: str):
+    def register(func: Callable[[BenchmarkRun], dict[str, Any]]):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def timing_stats(durations: list[float]) -> dict[str, float]:
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+        "max": max(durations),
+    }
+
+
+def percentiles_ms(durations: list[float]) -> dict[str, float]:
+    ordered = sorted(durations)
+
+    def percentile(percent: float) -> float:
+        return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)] * 1000
+    return {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)}
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Callable[[], Any] | None = None) -> tuple[dict[str, float], Any]:
+    """
+    Times `func` `repeat` times, after a first, untimed, run to warm up caches. If `setup` is given, it is run before
+    each call, untimed, and its result passed to `func`. Returns the timing stats and the result of the last call.
+    """
+    durations = []
+    result = None
+    for iteration in range(repeat + 1):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        result = func(*args)
+        if iteration:
+            durations.append(time.perf_counter() - start)
+    return timing_stats(durations), result
+
+
+def _benchmark_splitters() -> dict[str, RecursiveCharacterTextSplitter]:
+    # The splitters used at ingest, measuring length with `estimate_tokens` so they can run without tiktoken's encodings
+    code, documentation = default_embedder_map[ResourceType.Code], default_embedder_map[ResourceType.Documentation]
+    return {
+        "py": RecursiveCharacterTextSplitter.from_extension(
+            "py", chunk_size=code.chunk_size, chunk_overlap=code.chunk_overlap, length_function=estimate_tokens,
+        ),
+        "md": RecursiveCharacterTextSplitter.from_extension(
+            "md", chunk_size=documentation.chunk_size, chunk_overlap=documentation.chunk_overlap,
+            length_function=estimate_tokens,
+        ),
+    }
+
+
+@benchmark("splitter")
+def bench_splitter(run: BenchmarkRun) -> dict[str, Any]:
+    splitters = _benchmark_splitters()
+    texts = [
+        (splitters["py"], path.read_text()) for path in sorted(run.corpus.package_root.rglob("*.py"))
+    ] + [
+        (splitters["md"], path.read_text()) for path in sorted(run.corpus.documentation_dir.glob("*.md"))
+    ]
+
+    def split_all():
+        return sum(len(splitter.split_text(text)) for splitter, text in texts)
+
+    seconds, chunks = measure(split_all, run.repeat)
+    chars = sum(len(text) for _, text in texts)
+    return {
+        "seconds": seconds,
+        "throughput": {"chars_per_second": chars / seconds["median"], "chunks_per_second": chunks / seconds["median"]},
+        "size": {"texts": len(texts), "chars": chars, "chunks": chunks},
+    }
+
+
+@benchmark("local-loader")
+def bench_local_loader(run: BenchmarkRun) -> dict[str, Any]:
+    locations = [str(run.corpus.documentation_dir), str(run.corpus.r_dir), str(run.corpus.examples_dir)]
+
+    def discover():
+        return list(LocalFileLoader(locations=locations[:]).discover())
+
+    seconds, resources = measure(discover, run.repeat)
+    return {
+        "seconds": seconds,
+        "throughput": {"resources_per_second": len(resources) / seconds["median"]},
+        "size": {"resources": len(resources)},
+    }
+
+
+@benchmark("python-loader")
+def bench_python_loader(run: BenchmarkRun) -> dict[str, Any]:
+    package_root = str(run.corpus.package_root)
+    sys.path.insert(0, package_root)
+    try:
+        def discover():
+            resources = list(PythonLibraryLoader(derive_resources=True).discover(locations=[run.corpus.package]))
+            return resources + [derived for resource in resources for derived in resource.derived_resources]
+
+        seconds, resources = measure(discover, run.repeat)
+    finally:
+        sys.path.remove(package_root)
+    return {
+        "seconds": seconds,
+        "throughput": {"resources_per_second": len(resources) / seconds["median"]},
+        "size": {"resources": len(resources)},
+    }
+
+
+def _corpus_records(run: BenchmarkRun) -> dict[str, list[Record]]:
+    """
+    Records for each partition of the generated corpus, split as they are at ingest. Built once per run.
+    """
+    if "records" not in run.shared:
+        loaders = [
+            ("documentation", LocalFileLoader(locations=[str(run.corpus.documentation_dir)])),
+            ("examples", LocalFileLoader(
+                locations=[str(run.corpus.examples_dir)], resource_type=ResourceType.Example,
+            )),
+        ]
+        splitter = _benchmark_splitters()["md"]
+        records: dict[str, list[Record]] = {}
+        for partition, loader in loaders:
+            records[partition] = []
+            for resource in loader.discover():
+                # Examples aren't split at ingest
+                resource_splitter = splitter if partition == "documentation" else None
+                records[partition].extend(resource.as_records(splitter=resource_splitter))
+        run.shared["records"] = records
+    return run.shared["records"]
+
+
+@benchmark("add-records")
+def bench_add_records(run: BenchmarkRun) -> dict[str, Any]:
+    records = _corpus_records(run)
+    stores = iter(range(run.repeat + 1))
+
+    def new_store():
+        return ZippedChromaDBStore(path=str(run.workdir / f"store-{next(stores)}.zip"))
+
+    def add_all(store: ZippedChromaDBStore):
+        for partition, bundle in records.items():
+            for idx in range(0, len(bundle), 64):
+                store.add_records(bundle[idx:idx + 64], partition=partition)
+        return store
+
+    seconds, store = measure(add_all, run.repeat, setup=new_store)
+    run.shared["store"] = store
+    record_count = sum(map(len, records.values()))
+    return {
+        "seconds": seconds,
+        "throughput": {"records_per_second": record_count / seconds["median"]},
+        "size": {"records": record_count},
+    }
+
+
+@benchmark("query")
+def bench_query(run: BenchmarkRun) -> dict[str, Any]:
+    store = run.shared.get("store", None)
+    if store is None:
+        raise LookupError("The `query` benchmark requires the store populated by `add-records`.")
+    queries = [function.summary for function in run.corpus.functions]
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query_multi([query], partition="documentation", limit=5)
+        latencies.append(time.perf_counter() - start)
+
+    seconds, _ = measure(lambda: store.query_multi(queries, partition="documentation", limit=5), run.repeat)
+    return {
+        "seconds": seconds,
+        "latency_ms": percentiles_ms(latencies),
+        "throughput": {"queries_per_second": len(queries) / seconds["median"]},
+        "size": {"queries": len(queries)},
+    }
+
+
+@benchmark("save-load")
+def bench_save_load(run: BenchmarkRun) -> dict[str, Any]:
+    store = run.shared.get("store", None)
+    if store is None:
+        raise LookupError("The `save-load` benchmark requires the store populated by `add-records`.")
+    corpus = Corpus(store=store)
+    corpus_dir = run.workdir / "corpus"
+
+    save_seconds, _ = measure(lambda: corpus.save_to_dir(corpus_dir, overwrite=True), run.repeat)
+    load_seconds, _ = measure(lambda: Corpus.from_dir(corpus_dir), run.repeat)
+    return {
+        "seconds": {"save": save_seconds["median"], "load": load_seconds["median"]},
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+    }
+
+
+class BenchmarkStore:
+    """
+    In-memory store returning the nearest records by word overlap, so prompt assembly is measured apart from the store.
+    """
+
+    def __init__(self, records: dict[str, list[Record]]) -> None:
+        self.records = {
+            partition: [(record, set(record.content.lower().split())) for record in bundle]
+            for partition, bundle in records.items()
+        }
+
+    def get_partitions(self) -> list[str]:
+        return list(self.records)
+
+    def query(self, query_string: str, partition: str | None = None, limit: int = -1) -> QueryResponse:
+        words = set(query_string.lower().split())
+        scored = sorted(
+            (1 - len(words & record_words) / (len(words | record_words) or 1), record.id, record)
+            for record, record_words in self.records.get(partition, [])
+        )
+        if limit > 0:
+            scored = scored[:limit]
+        return QueryResponse(query=query_string, matches=[{"record": record, "distance": distance} for distance, _, record in scored])
+
+
+class BenchmarkKernel:
+    """Stands in for the Beaker kernel, discarding logged events."""
+
+    def log(self, event_type: str, content: Any, parent_header=None):
+        pass
+
+
+class BenchmarkContext(BunsenContext):
+    """
+    A context whose subkernel is a namespace in this process and whose kernel is a stub, for timing `build_prompt`.
+    """
+    SLUG = "bunsen_benchmark"
+
+    def __init__(self, corpus: Corpus, namespace: dict[str, Any]) -> None:
+        self._init_caches()
+        self.beaker_kernel = BenchmarkKernel()
+        self.bunsen_config = {}
+        self.subkernel = SimpleNamespace(DISPLAY_NAME="Python 3", KERNEL_NAME="python3", SLUG="python3")
+        self.agent = SimpleNamespace(current_query=None)
+        self.current_llm_query = None
+        self.namespace = namespace
+        self.corpus = corpus
+
+    async def evaluate(self, expression, parent_header={}):
+        module = ast.parse(expression)
+        last = ast.Expression(module.body.pop().value)
+        exec(compile(module, "<state>", "exec"), self.namespace)
+        return {"return": eval(compile(last, "<state>", "eval"), self.namespace)}
+
+
+@benchmark("build-prompt")
+def bench_build_prompt(run: BenchmarkRun) -> dict[str, Any]:
+    corpus = Corpus(store=BenchmarkStore(_corpus_records(run)))
+    namespace = {f"{function.name}_result": list(range(100)) for function in run.corpus.functions[:50]}
+    context = BenchmarkContext(corpus, namespace)
+    queries = [f"How do I {function.summary.lower().rstrip('.')}?" for function in run.corpus.functions]
+
+    async def build_prompts():
+        durations = []
+        for turn, query in enumerate([queries[0]] + queries[:run.repeat * 10]):
+            context.current_llm_query = f"{turn}: {query}"
+            context.agent.current_query = query
+            # Every turn refetches the state, as it would after a cell is executed
+            context.invalidate_subkernel_state()
+            start = time.perf_counter()
+            await context.build_prompt()
+            if turn:
+                durations.append(time.perf_counter() - start)
+        context.finish_turn_telemetry()
+        return durations
+
+    durations = asyncio.run(build_prompts())
+    stats = timing_stats(durations)
+    return {
+        "seconds": stats,
+        "latency_ms": percentiles_ms(durations),
+        "throughput": {"prompts_per_second": 1 / stats["median"]},
+        "size": {"prompts": len(durations)},
+    }
+
+
+def run_benchmarks(
+    scales: list[str],
+    names: list[str] | None = None,
+    repeat: int = 3,
+    seed: int = 0,
+    workdir: str | Path | None = None,
+) -> dict[str, Any]:
+    """
+    Runs the benchmarks in `names` (all, by default) against a generated corpus at each of `scales`. A benchmark that
+    fails is reported with its error rather than stopping the run.
+    """
+    names = list(names or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}")
+    if repeat < 1:
+        raise ValueError("Benchmarks must be run at least once.")
+
+    results: dict[str, Any] = {
+        "version": RESULTS_VERSION,
+        "metadata": {
+            "bunsen_version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    root = Path(workdir) if workdir else Path(tempfile.mkdtemp(prefix="bunsen-benchmark-"))
+    try:
+        for scale in scales:
+            scale_dir = root / scale
+            corpus = generate_synthetic_corpus(scale_dir / "sources", scale=scale, seed=seed)
+            run = BenchmarkRun(corpus=corpus, workdir=scale_dir, repeat=repeat)
+            scale_results = results["results"][scale] = {"_sources": source_size(corpus)}
+            for name in names:
+                try:
+                    scale_results[name] = BENCHMARKS[name](run)
+                except Exception as err:
+                    scale_results[name] = {"error": f"{type(err).__name__}: {err}"}
+    finally:
+        if not workdir:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def flatten_metrics(results: dict[str, Any]) -> dict[str, float]:
+    """
+    Returns the comparable metrics in a set of results, keyed by `scale/benchmark/group/metric`.
+    """
+    metrics = {}
+    for scale, benchmarks in results.get("results", {}).items():
+        for name, result in benchmarks.items():
+            for group in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+                values = result.get(group, None) or {}
+                for metric, value in values.items():
+                    # Only medians are compared for timings, as the other stats are too noisy to gate on
+                    if group == "seconds" and metric in ("min", "mean", "max"):
+                        continue
+                    if isinstance(value, (int, float)):
+                        metrics[f"{scale}/{name}/{group}/{metric}"] = value
+    return metrics
+
+
+def compare_results(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[dict[str, Any]]:
+    """
+    Compares each metric in the baseline with the current results, returning the relative change of each and whether
+    it is a regression, i.e. worse than the baseline by more than `threshold`. A metric of a benchmark that was run but
+    is missing from the current results, and a benchmark that failed, are always regressions. Benchmarks and scales
+    that weren't run this time, e.g. because of `--only`, are skipped.
+    """
+    if baseline.get("version", None) != current.get("version", None):
+        raise ValueError("Benchmark results were recorded with different versions and can't be compared.")
+    baseline_metrics, current_metrics = flatten_metrics(baseline), flatten_metrics(current)
+    current_results = current.get("results", {})
+    comparison = []
+    for key in sorted(baseline_metrics.keys()):
+        scale, name, group, _ = key.split("/", 3)
+        result = current_results.get(scale, {}).get(name, None)
+        if result is None:
+            continue
+        before = baseline_metrics[key]
+        if key not in current_metrics:
+            note = f"error: {result['error']}" if "error" in result else "missing"
+            comparison.append(
+                {"metric": key, "baseline": before, "current": None, "change": None, "regression": True, "note": note}
+            )
+            continue
+        after = current_metrics[key]
+        change = (after - before) / before if before else 0.0
+        worse = change > threshold if group in LOWER_IS_BETTER else change < -threshold
+        comparison.append({"metric": key, "baseline": before, "current": after, "change": change, "regression": worse})
+
+    # Failures with no baseline metrics to report them against, e.g. new benchmarks or ones that failed both times
+    reported = {tuple(row["metric"].split("/", 2)[:2]) for row in comparison if row["current"] is None}
+    for scale, benchmarks in sorted(current_results.items()):
+        for name, result in sorted(benchmarks.items()):
+            if "error" in result and (scale, name) not in reported:
+                comparison.append({
+                    "metric": f"{scale}/{name}", "baseline": None, "current": None, "change": None,
+                    "regression": True, "note": f"error: {result['error']}",
+                })
+    return comparison
+
+
+def format_comparison(comparison: list[dict[str, Any]]) -> str:
+    lines = [f"{'metric':<56} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for row in comparison:
+        flag = "  REGRESSION" if row["regression"] else ""
+        if row.get("note", None):
+            flag = f"{flag} ({row['note']})"
+        baseline = f"{row['baseline']:>12.4g}" if row["baseline"] is not None else f"{'-':>12}"
+        current = f"{row['current']:>12.4g}" if row["current"] is not None else f"{'-':>12}"
+        change = f"{row['change']:>+8.1%}" if row["change"] is not None else f"{'-':>8}"
+        lines.append(f"{row['metric']:<56} {baseline} {current} {change}{flag}")
+    return "\n".join(lines)
+
+
+@click.command(name="benchmark")
+@click.option("--scale", "scales", multiple=True, type=click.Choice(list(SCALES)), default=["small"], show_default=True,
+              help="Size of the generated corpus. May be given more than once.")
+@click.option("--only", "names", multiple=True, type=click.Choice(list(BENCHMARKS)),
+              help="Run only this benchmark. May be given more than once.")
+@click.option("--repeat", type=click.IntRange(1), default=3, show_default=True, help="Number of timed runs of each benchmark")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed for the generated corpus")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the results as JSON to this file")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Compare the results with those in this file, exiting with an error if any have regressed")
+@click.option("--threshold", type=float, default=DEFAULT_THRESHOLD, show_default=True,
+              help="Relative change in a metric that counts as a regression")
+@click.option("--workdir", type=click.Path(file_okay=False), default=None,
+              help="Generate the corpus here, and keep it, instead of in a temporary directory")
+def benchmark_command(scales, names, repeat, seed, output, baseline, threshold, workdir):
+    """
+    Benchmark splitting, loading, storing, querying and prompt assembly against a generated corpus
+    """
+    results = run_benchmarks(list(scales), list(names) or None, repeat=repeat, seed=seed, workdir=workdir)
+    results_json = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as output_file:
+            output_file.write(results_json)
+    else:
+        click.echo(results_json)
+
+    for scale, benchmarks in results["results"].items():
+        for name, result in benchmarks.items():
+            if "error" in result:
+                click.echo(f"Benchmark `{name}` failed at scale `{scale}`: {result['error']}", err=True)
+
+    if baseline:
+        with open(baseline) as baseline_file:
+            comparison = compare_results(json.load(baseline_file), results, threshold=threshold)
+        click.echo(format_comparison(comparison), err=True)
+        if any(row["regression"] for row in comparison):
+            raise click.ClickException(
+                f"Benchmarks failed, or regressed by more than {threshold:.0%}, against `{baseline}`."
+            )
+
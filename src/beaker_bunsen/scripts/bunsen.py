@@ -3,6 +3,8 @@ from typing import List
 
 import click
 
+from .benchmark import benchmark_command
+from .evaluate_retrieval import evaluate_retrieval_command
 from .extract_examples import extract_examples
 from .extract_documentation import extract_documentation
 
@@ -57,3 +59,5 @@ def update():
 
 cli_commands.add_command(extract_examples)
 cli_commands.add_command(extract_documentation)
+cli_commands.add_command(benchmark_command)
+cli_commands.add_command(evaluate_retrieval_command)
@@ -0,0 +1,244 @@
+import json
+import re
+import statistics
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import click
+import yaml
+
+from ..corpus.corpus import Corpus
+from ..corpus.loaders.schemes import split_derived_uri
+from ..corpus.types import URI, Record
+from .benchmark import percentiles_ms
+
+
+DEFAULT_KS: tuple[int, ...] = (1, 3, 5, 10)
+# Path of a resource derived from a definition in a module, e.g. `code/requests.api/documentation/get`
+DERIVED_PATH_RE = re.compile(r"^(?P<module>.+)/(?:documentation|example)/(?P<object>[^/]+?)(?:~\d+)?$")
+
+
+@dataclass
+class GoldenQuery:
+    """
+    A query with known answers. Each expected answer is either a resource URI or path, matched against the end of the
+    record's URI path so that it is unaffected by where the corpus was built, or a symbol such as
+    `package.module.function`. A symbol matches the record of its module, a resource derived from its definition, or a
+    record whose content defines it. Records from other modules of the same package don't match.
+    """
+    query: str
+    partition: str
+    expected: list[str]
+
+    @staticmethod
+    def symbol_source(record: Record) -> tuple[str, str | None]:
+        """
+        Returns the module a record came from, and the object it documents if it was derived from a definition.
+        Saved corpora keep the module name as the last part of the path, e.g. `corpus-resource:code/requests.api`.
+        """
+        uri, derived_key = split_derived_uri(record.uri) if record.uri else ("", None)
+        path = URI(uri).path.rstrip("/") if uri else ""
+        if derived_key:
+            path = f"{path}/{derived_key}"
+        documented_object = (record.metadata or {}).get("object", None)
+        match = DERIVED_PATH_RE.match(path) if documented_object else None
+        if match and match["object"] == documented_object:
+            return match["module"].rsplit("/", 1)[-1], documented_object
+        return path.rsplit("/", 1)[-1], None
+
+    def matches(self, expected: str, record: Record) -> bool:
+        if ":" in expected or "/" in expected:
+            uri = URI(record.uri) if record.uri else None
+            expected_path = URI(expected).path.strip("/")
+            record_path = uri.path.rstrip("/") if uri else ""
+            return bool(expected_path) and (record_path == expected_path or record_path.endswith(f"/{expected_path}"))
+
+        module_path, documented_object = self.symbol_source(record)
+        if documented_object:
+            return expected == f"{module_path}.{documented_object}"
+        if module_path and expected == module_path:
+            return True
+        name = re.escape(expected.rsplit(".", 1)[-1])
+        return bool(re.search(rf"\b(?:def|class)\s+{name}\b|^\s*{name}\s*<-\s*function", record.content or "", re.M))
+
+    def ranks(self, records: list[Record]) -> dict[str, int | None]:
+        """Returns the rank (from 1) at which each expected answer was first found, or None if it wasn't."""
+        ranks: dict[str, int | None] = {expected: None for expected in self.expected}
+        for rank, record in enumerate(records, start=1):
+            for expected, found in ranks.items():
+                if found is None and self.matches(expected, record):
+                    ranks[expected] = rank
+        return ranks
+
+
+@dataclass
+class PartitionReport:
+    queries: int = 0
+    recall: dict[int, list[float]] = field(default_factory=lambda: defaultdict(list))
+    reciprocal_ranks: list[float] = field(default_factory=list)
+    latencies: list[float] = field(default_factory=list)
+    misses: list[str] = field(default_factory=list)
+
+    def as_dict(self, ks: tuple[int, ...]) -> dict[str, Any]:
+        total_seconds = sum(self.latencies)
+        return {
+            "queries": self.queries,
+            "recall": {f"@{k}": statistics.fmean(self.recall[k]) for k in ks if self.recall[k]},
+            "mrr": statistics.fmean(self.reciprocal_ranks) if self.reciprocal_ranks else None,
+            "latency_ms": percentiles_ms(self.latencies) if self.latencies else None,
+            "throughput": {"queries_per_second": len(self.latencies) / total_seconds if total_seconds else None},
+            "misses": self.misses,
+        }
+
+
+def load_golden_queries(path: str | Path) -> list[GoldenQuery]:
+    """
+    Loads golden queries from a YAML or JSON file of the form:
+
+        queries:
+          - query: How do I plot a histogram?
+            partition: documentation
+            expected:
+              - documentation/guides/plotting.md
+              - mylib.plotting.histogram
+    """
+    with open(path) as golden_file:
+        golden = yaml.safe_load(golden_file)
+    queries = golden.get("queries", None) if isinstance(golden, dict) else None
+    if not queries:
+        raise ValueError(f"Golden query file `{path}` does not define any queries.")
+    golden_queries = []
+    for idx, entry in enumerate(queries):
+        missing = [key for key in ("query", "partition", "expected") if not entry.get(key, None)]
+        if missing:
+            raise ValueError(f"Golden query {idx} in `{path}` is missing: {', '.join(missing)}")
+        expected = entry["expected"]
+        golden_queries.append(GoldenQuery(
+            query=entry["query"],
+            partition=entry["partition"],
+            expected=[expected] if isinstance(expected, str) else list(expected),
+        ))
+    return golden_queries
+
+
+def evaluate_retrieval(
+    corpus: Corpus,
+    golden_queries: list[GoldenQuery],
+    ks: tuple[int, ...] = DEFAULT_KS,
+    repeat: int = 1,
+) -> dict[str, Any]:
+    """
+    Runs each golden query against its partition of the corpus, returning recall@k, MRR, latency percentiles and
+    throughput for each partition and for all queries together. Each query is run `repeat` times for latency, after an
+    untimed first run per partition so that loading its index isn't counted.
+    """
+    if repeat < 1:
+        raise ValueError("Each query must be run at least once.")
+    ks = tuple(sorted(ks))
+    limit = ks[-1]
+    reports: dict[str, PartitionReport] = defaultdict(PartitionReport)
+    overall = PartitionReport()
+    warmed_up = set()
+
+    for golden in golden_queries:
+        if golden.partition not in warmed_up:
+            corpus.store.query(query_string=golden.query, partition=golden.partition, limit=limit)
+            warmed_up.add(golden.partition)
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = corpus.store.query(query_string=golden.query, partition=golden.partition, limit=limit)
+            latencies.append(time.perf_counter() - start)
+        records = [match["record"] for match in (response or {}).get("matches", [])]
+        ranks = golden.ranks(records)
+        found_ranks = [rank for rank in ranks.values() if rank is not None]
+
+        for report in (reports[golden.partition], overall):
+            report.queries += 1
+            report.latencies.extend(latencies)
+            report.reciprocal_ranks.append(1 / min(found_ranks) if found_ranks else 0.0)
+            for k in ks:
+                report.recall[k].append(sum(1 for rank in found_ranks if rank <= k) / len(ranks))
+            if not found_ranks:
+                report.misses.append(golden.query)
+
+    return {
+        "ks": list(ks),
+        "partitions": {partition: report.as_dict(ks) for partition, report in sorted(reports.items())},
+        "overall": overall.as_dict(ks),
+    }
+
+
+def check_gates(
+    report: dict[str, Any],
+    min_recall: float | None = None,
+    recall_k: int | None = None,
+    min_mrr: float | None = None,
+    max_p95_ms: float | None = None,
+) -> list[str]:
+    """
+    Returns a description of each gate the report fails, checking every partition as well as the overall results.
+    """
+    failures = []
+    recall_key = f"@{recall_k if recall_k is not None else report['ks'][-1]}"
+    sections = [("overall", report["overall"])] + list(report["partitions"].items())
+    for name, section in sections:
+        recall = section["recall"].get(recall_key, None)
+        if min_recall is not None and recall is not None and recall < min_recall:
+            failures.append(f"{name}: recall{recall_key} {recall:.3f} is below {min_recall:.3f}")
+        if min_mrr is not None and section["mrr"] is not None and section["mrr"] < min_mrr:
+            failures.append(f"{name}: MRR {section['mrr']:.3f} is below {min_mrr:.3f}")
+        p95 = (section["latency_ms"] or {}).get("p95", None)
+        if max_p95_ms is not None and p95 is not None and p95 > max_p95_ms:
+            failures.append(f"{name}: p95 latency {p95:.1f}ms is above {max_p95_ms:.1f}ms")
+    return failures
+
+
+def format_report(report: dict[str, Any]) -> str:
+    recall_headers = " ".join(f"{'R@' + str(k):>7}" for k in report["ks"])
+    lines = [f"{'partition':<20} {'queries':>8} {recall_headers} {'MRR':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'qps':>9}"]
+    sections = list(report["partitions"].items()) + [("overall", report["overall"])]
+    for name, section in sections:
+        recalls = " ".join(f"{section['recall'].get(f'@{k}', 0.0):>7.3f}" for k in report["ks"])
+        latency = section["latency_ms"] or {}
+        qps = section["throughput"]["queries_per_second"] or 0.0
+        lines.append(
+            f"{name:<20} {section['queries']:>8} {recalls} {section['mrr'] or 0.0:>7.3f} "
+            f"{latency.get('p50', 0.0):>9.2f} {latency.get('p95', 0.0):>9.2f} {latency.get('p99', 0.0):>9.2f} {qps:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+@click.command(name="evaluate-retrieval")
+@click.argument("corpus_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("golden_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("-k", "ks", multiple=True, type=int, default=DEFAULT_KS, show_default=True,
+              help="Cut-off for recall@k. May be given more than once.")
+@click.option("--repeat", type=click.IntRange(1), default=3, show_default=True, help="Number of timed runs of each query")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Write the report as JSON to this file")
+@click.option("--min-recall", type=float, default=None, help="Fail if recall@k, at the largest k or --recall-k, is lower")
+@click.option("--recall-k", type=int, default=None, help="The k that --min-recall applies to")
+@click.option("--min-mrr", type=float, default=None, help="Fail if the mean reciprocal rank is lower")
+@click.option("--max-p95-ms", type=float, default=None, help="Fail if the 95th percentile query latency is higher")
+def evaluate_retrieval_command(corpus_dir, golden_file, ks, repeat, output, min_recall, recall_k, min_mrr, max_p95_ms):
+    """
+    Evaluate a built corpus's retrieval quality and latency against a set of golden queries
+    """
+    if recall_k is not None and recall_k not in ks:
+        ks = (*ks, recall_k)
+    golden_queries = load_golden_queries(golden_file)
+    corpus = Corpus.from_dir(corpus_dir)
+    report = evaluate_retrieval(corpus, golden_queries, ks=tuple(ks), repeat=repeat)
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    click.echo(format_report(report))
+
+    failures = check_gates(report, min_recall=min_recall, recall_k=recall_k, min_mrr=min_mrr, max_p95_ms=max_p95_ms)
+    if failures:
+        raise click.ClickException("Retrieval evaluation failed:\n" + "\n".join(failures))
@@ -10,19 +10,28 @@ from functools import reduce
 from pathlib import Path
 from urllib.parse import urlparse
 
-import openai
-
 from ..corpus.resources import Resource
 from ..corpus.loaders.schemes import unmap_scheme, read_from_uri
 from ..corpus.loaders.code_library_loader import RCRANLocalCache
 
 from .helpers import find_pyproject_file
+from .llm_extraction import (
+    FULL_DOCUMENT_EXAMPLE_PROMPT, ExtractionEngine, ExtractionRequest, number_lines, parse_examples,
+)
 
 
 # TODO: Add optional param for setting destination
 @click.command()
+@click.option("--concurrency", type=click.IntRange(1), default=8, show_default=True, help="Maximum number of LLM requests in flight at once")
+@click.option("--requests-per-minute", type=int, default=None, required=False, help="Limit the rate of LLM requests")
+@click.option("--tokens-per-minute", type=int, default=None, required=False, help="Limit the rate of tokens sent to the LLM")
 @click.argument("locations", type=str, required=False, nargs=-1)
-def extract_documentation(locations: list[str]):
+def extract_documentation(
+    locations: list[str],
+    concurrency: int,
+    requests_per_minute: int | None,
+    tokens_per_minute: int | None,
+):
     """
     Extract documentation from Bunsen config or specified locations for use in RAG
     """
@@ -93,6 +102,7 @@ def extract_documentation(locations: list[str]):
         except:
             pass
 
+        resource_contents = []
         for resource in resource_list:
             if resource.content:
                 content = resource.content
@@ -101,64 +111,22 @@ def extract_documentation(locations: list[str]):
                     content = resource.file_handle.read()
                 else:
                     content = read_from_uri(resource.uri)
+            resource_contents.append(content)
 
-            content_lines = content.splitlines(keepends=True)
-            prompt = """
-A document is provided below. It contains line numbers on the left, the content on the right, with the sides separated by ` : `.
-The provided document may be a source code file, a documentation page, an executable notebook, or hand extracted examples created by hand.
-It may contain one or more curated examples as for how to accomplish something using relevant libraries.
-Please identify any such examples and generate a short description of the purpose of the example code, along with the start/stop line numbers (inclusive) where the example occurs.
-For example, if the example is a single line on the line labeled 34, both `start_line` and `stop_line` would be equal to 34.
-If the example was spread of 5 lines, starting at line 12, the values would be `start_line` = 12, `stop_line` = 16.
-Also, make sure to include a prelude of code that contains any imports or definitions needed so the example is as complete as possible and has everything it needs to run as a stand-alone code block.
-The prelude will later be combined with the example to help use the libraries these documents are related to.
-Please ensure that all imports and definitions in the prelude are complete. Do not use statements like "put your code here..." or summarize what should be done.
-Do not identify/extract regular source code from files as examples. Only extract unique tasks that demonstrate how to properly use the library.
-That is, all exracted examples should show usage of functions, not just the code that defines a function. Assume the user will be able to look up argument and parameter information.
-You should err on the side of fewer, more complete examples which show an entire "step" of work rather than examples of subtasks.
-As an example, if you find sample code where a dataset is sorted and a comparison function is defined to help sort, only extract one example that includes all the code. Do not create a separate example of how to define a comparison function.
-If you do not find any examples in the document, do not generate one yourself. Instead return an empty list.
-
-Please be sure to format your answer in json format as response object that matches this format with one object per example object in the `examples` list:
-  {
-    "examples": [
-      {
-        "description": str,
-        "prelude": str,
-        "start_line": int,
-        "stop_line": int,
-      },
-      ...
-    ]
-  }
-
-The document from which to extract begins below this line and runs until the end of the input:\n"""
-
-            full_prompt = "\n".join([
-                prompt,
-                "".join(f"{line_no:6} : {line}" for line_no, line in enumerate(content_lines, start=1)),
-            ])
-            model = "gpt-4o"
-
-            response = openai.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """
-    You are a helpful assistant who is excellent at understanding and describing code and who always responds using JSON.
-    You are helping to identify and explain code examples to allow for better understanding and use on how to use novel and
-    interesting software libaries. These examples will help users to code in and/or use the covered software.
-                        """.strip(),
-                    },
-                    {
-                        "role": "user",
-                        "content": full_prompt,
-                    }
-                ],
-                response_format={"type": "json_object"},
+        engine = ExtractionEngine(
+            concurrency=concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+        responses = engine.run([
+            ExtractionRequest(
+                prompt=FULL_DOCUMENT_EXAMPLE_PROMPT, content=number_lines(content.splitlines(keepends=True)),
             )
+            for content in resource_contents
+        ])
 
+        for resource, content, response_content in zip(resource_list, resource_contents, responses):
+            content_lines = content.splitlines(keepends=True)
             metadata = {
                 "resource_id": resource.id,
                 "source_uri": resource.uri,
@@ -166,14 +134,14 @@ The document from which to extract begins below this line and runs until the end
                 "source_sha256_hash": "TODO",
             }
 
-            if not response:
+            if isinstance(response_content, BaseException):
+                click.echo(f"Request failed when processing {resource.uri}: {response_content}")
                 continue
-            response_content = response.choices[0].message.content.strip()
             if not response_content:
                 continue
             try:
-                example_list = json.loads(response_content)["examples"]
-            except json.JSONDecodeError as err:
+                example_list = parse_examples(response_content)
+            except ValueError as err:
                 click.echo(f"Encountered error {err} when processing {resource.uri}")
                 failure_file_path = os.path.join(dest, f"failure_{num}.txt")
                 with open(failure_file_path, "w") as failure_file:
@@ -184,7 +152,7 @@ The document from which to extract begins below this line and runs until the end
                     json.dump(metadata, failure_file, indent=2)
                     failure_file.write(
                         f"\n{'====' * 20}\n"
-                        f"{err}\n{err.msg}\n"
+                        f"{err}\n"
                     )
                 continue
 
@@ -12,13 +12,18 @@ from pathlib import Path
 from typing import Any
 from urllib.parse import urlparse
 
-import openai
 
 from ..corpus.types import Default, DefaultType, URI
 from ..corpus.resources import Resource
-from ..corpus.loaders.schemes import unmap_scheme, read_from_uri
+from ..corpus.loaders.schemes import unmap_scheme, read_from_uri, stat_uri
 from ..corpus.loaders.code_library_loader import RCRANLocalCache
 from ..corpus.loaders.local_file_loader import LocalFileLoader
+from ..corpus.util.example_harvester import HarvestedExample, harvest_many
+from .extraction_index import ExtractionIndex
+from .llm_extraction import (
+    EXAMPLE_PROMPT, DocumentWindow, ExtractionEngine, ExtractionRequest, build_windows, merge_window_examples,
+    parse_examples,
+)
 
 from .helpers import find_pyproject_file, calculate_content_hash
 
@@ -66,10 +71,29 @@ def generate_existing_example_map(
 @click.command()
 @click.option("--force", is_flag=True, type=bool, default=False, required=False, help="Force processing files even if they haven't changed")
 @click.option("--keep", is_flag=True, type=bool, default=False, required=False, help="Do not remove out-of-date examples when changes are detected")
+@click.option("--llm/--no-llm", default=True, help="Use the LLM to extract examples from resources where none can be harvested directly")
+@click.option("--workers", type=int, default=None, required=False, help="Number of processes to use when harvesting examples")
+@click.option("--concurrency", type=click.IntRange(1), default=8, show_default=True, help="Maximum number of LLM requests in flight at once")
+@click.option("--requests-per-minute", type=int, default=None, required=False, help="Limit the rate of LLM requests")
+@click.option("--tokens-per-minute", type=int, default=None, required=False, help="Limit the rate of tokens sent to the LLM")
 @click.argument("locations", type=str, required=False, nargs=-1)
-def extract_examples(locations: list[str], force: bool, keep: bool):
+def extract_examples(
+    locations: list[str],
+    force: bool,
+    keep: bool,
+    llm: bool,
+    workers: int | None,
+    concurrency: int,
+    requests_per_minute: int | None,
+    tokens_per_minute: int | None,
+):
     """
     Extract examples from Bunsen config or specified locations for use in RAG
+
+    Doctests, code blocks and R examples are harvested directly from the resources. The LLM is only used to extract
+    examples from resources where nothing could be harvested, and is only sent the regions of those resources that
+    may contain examples. LLM requests run concurrently and their responses are cached, so rerunning after an
+    interruption only makes the requests that had not completed.
     """
     total_example_count = 0
 
@@ -103,7 +127,11 @@ def extract_examples(locations: list[str], force: bool, keep: bool):
             raise click.UsageError(f"No locations provided and unable to find a bunsen configuration in the directory tree.")
 
     locations = selected_locations
-    with RCRANLocalCache(locations=locations):
+    with RCRANLocalCache(locations=locations), ExtractionIndex.for_directory(dest) as index:
+        if index.is_empty():
+            # Examples may have been extracted elsewhere, e.g. checked out from source control
+            index.seed(generate_existing_example_map([dest]))
+
         resource_list: list[Resource] = []
         example_locations = [dest]
         click.echo("Collecting resources to inspect for examples:")
@@ -120,6 +148,8 @@ def extract_examples(locations: list[str], force: bool, keep: bool):
             scheme_cls = unmap_scheme(scheme)
 
             loader = scheme_cls.default_loader()
+            # Examples are extracted from the source itself, so there is no need to derive anything from it
+            loader.derive_resources = False
             found_resources = list(loader.discover([location]))
             for resource in found_resources:
                 click.echo(f"    Found resource '{resource.uri}'")
@@ -127,8 +157,6 @@ def extract_examples(locations: list[str], force: bool, keep: bool):
                 found_resources
             )
 
-        example_map = generate_existing_example_map([dest])
-
         click.echo(f"Found {len(resource_list)} resources to check for examples.\n")
 
         existing_example_nums = [filename.split('_')[1] for filename in os.listdir(dest)]
@@ -138,10 +166,21 @@ def extract_examples(locations: list[str], force: bool, keep: bool):
                 num = max(map(int, existing_example_nums)) + 1
         except:
             pass
-        files_to_delete = []
 
-        click.echo(f"Extracting examples from collected resources:")
+        # Skip resources that haven't changed since they were last processed, on a stat check. Only local files are
+        # discovered without reading them, so only they are skipped without ever being read. Other loaders (e.g.
+        # py-mod and rcran) have read their content during discovery, and are only spared hashing and extraction.
+        click.echo(f"Checking collected resources for changes:")
+        changed_resources = []
         for resource in resource_list:
+            signature = stat_uri(resource.uri)
+            if not force and index.is_unchanged(resource.uri, signature):
+                click.echo(f"  Resource {resource.uri} has not changed since it was last processed.\n    Use --force to force extraction.")
+                continue
+            changed_resources.append((resource, signature))
+
+        resource_contents = []
+        for resource, _ in changed_resources:
             if resource.content:
                 content = resource.content
             else:
@@ -149,77 +188,74 @@ def extract_examples(locations: list[str], force: bool, keep: bool):
                     content = resource.file_handle.read()
                 else:
                     content = read_from_uri(resource.uri)
+            resource_contents.append(content)
 
+        # Harvest doctests, code blocks, etc from all resources up front, in parallel
+        click.echo(f"Harvesting examples from collected resources...")
+        harvested_examples = harvest_many(
+            [(content, str(resource.uri)) for (resource, _), content in zip(changed_resources, resource_contents)],
+            max_workers=workers,
+        )
+
+        pending = []
+        for (resource, signature), content, harvested in zip(changed_resources, resource_contents, harvested_examples):
             content_hash = calculate_content_hash(content)
             click.echo(f"  {resource.resource_type.name} resource {resource.uri}:")
 
-            if resource.uri in example_map["sources"]:
-                if example_map["sources"][resource.uri]["hash"] == content_hash:
+            indexed = index.get(resource.uri)
+            previous_files = indexed.example_files if indexed else []
+            if indexed:
+                if indexed.hash == content_hash and indexed.example_files_exist():
                     if not force:
                         click.echo(f"    Hash for resource {resource.uri} has not changed for resource {resource.uri}. Still {content_hash}.\n    Use --force to force extraction.")
+                        index.touch(resource.uri, signature)
                         continue
                     else:
                         print(f"    Reprocessing resource {resource.uri} despite lack of change as --force is active.")
-                # Since we are continuing to process the file, we must delete any original examples based on this file.
-                files_to_delete.extend(example_map["sources"][resource.uri]["example_files"])
-
+            pending.append((resource, signature, content, content_hash, harvested, previous_files))
+
+        def record_examples(resource, signature, content_hash, example_files, previous_files):
+            # The examples previously extracted from the resource are replaced, or kept and still tracked with --keep,
+            # in the same step that records the new ones. Examples that were deleted by hand are dropped.
+            if keep:
+                kept_files = [path for path in previous_files if os.path.isfile(path)]
+                index.record(resource.uri, signature, content_hash, example_files + kept_files)
+                return
+            removed = index.record(resource.uri, signature, content_hash, example_files, remove=previous_files)
+            if removed:
+                click.echo("    Removed out-of-date examples. (Run with --keep flag to preserve out-of-date examples)")
+                for removed_file in removed:
+                    click.echo(f"      {removed_file}")
+
+        # Only the regions of a resource that may contain examples are sent to the LLM, split in to windows. Windows
+        # for every resource that nothing could be harvested from are sent at once, so requests run concurrently.
+        resource_windows: dict[int, list[DocumentWindow]] = {}
+        llm_requests: list[tuple[int, ExtractionRequest]] = []
+        for idx, (resource, _, content, _, harvested, _) in enumerate(pending):
+            if not llm or harvested:
+                continue
             content_lines = content.splitlines(keepends=True)
-            prompt = """
-A document is provided below. It contains line numbers on the left, the content on the right, with the sides separated by ` : `.
-The provided document may be a source code file, a documentation page, an executable notebook, or hand extracted examples created by hand.
-It may contain one or more curated examples as for how to accomplish something using relevant libraries.
-Please identify any such examples and generate a short description of the purpose of the example code, along with the start/stop line numbers (inclusive) where the example occurs.
-For example, if the example is a single line on the line labeled 34, both `start_line` and `stop_line` would be equal to 34.
-If the example was spread of 5 lines, starting at line 12, the values would be `start_line` = 12, `stop_line` = 16.
-Also, make sure to include a prelude of code that contains any imports or definitions needed so the example is as complete as possible and has everything it needs to run as a stand-alone code block.
-The prelude will later be combined with the example to help use the libraries these documents are related to.
-Please ensure that all imports and definitions in the prelude are complete. Do not use statements like "put your code here..." or summarize what should be done.
-Do not identify/extract regular source code from files as examples. Only extract unique tasks that demonstrate how to properly use the library.
-That is, all exracted examples should show usage of functions, not just the code that defines a function. Assume the user will be able to look up argument and parameter information.
-You should err on the side of fewer, more complete examples which show an entire "step" of work rather than examples of subtasks.
-As an example, if you find sample code where a dataset is sorted and a comparison function is defined to help sort, only extract one example that includes all the code. Do not create a separate example of how to define a comparison function.
-If you do not find any examples in the document, do not generate one yourself. Instead return an empty list.
-
-Please be sure to format your answer in json format as response object that matches this format with one object per example object in the `examples` list:
-  {
-    "examples": [
-      {
-        "description": str,
-        "prelude": str,
-        "start_line": int,
-        "stop_line": int,
-      },
-      ...
-    ]
-  }
-
-The document from which to extract begins below this line and runs until the end of the input:\n"""
-
-            full_prompt = "\n".join([
-                prompt,
-                "".join(f"{line_no:6} : {line}" for line_no, line in enumerate(content_lines, start=1)),
-            ])
-            model = "gpt-4o"
-
-            response = openai.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """
-    You are a helpful assistant who is excellent at understanding and describing code and who always responds using JSON.
-    You are helping to identify and explain code examples to allow for better understanding and use on how to use novel and
-    interesting software libaries. These examples will help users to code in and/or use the covered software.
-                        """.strip(),
-                    },
-                    {
-                        "role": "user",
-                        "content": full_prompt,
-                    }
-                ],
-                response_format={"type": "json_object"},
+            resource_windows[idx] = build_windows(content_lines, str(resource.uri))
+            llm_requests.extend(
+                (idx, ExtractionRequest(prompt=EXAMPLE_PROMPT, content=window.render(content_lines)))
+                for window in resource_windows[idx]
+            )
+        llm_responses: dict[int, list[str | BaseException | None]] = defaultdict(list)
+        if llm_requests:
+            click.echo(f"Requesting examples from the LLM for {len(llm_requests)} windows of {len(resource_windows)} resources...")
+            engine = ExtractionEngine(
+                concurrency=concurrency,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
             )
+            responses = engine.run([request for _, request in llm_requests])
+            for (idx, _), response in zip(llm_requests, responses):
+                llm_responses[idx].append(response)
+            click.echo(f"  {engine.requests_made} requests made, {engine.cache_hits} responses reused from the cache.")
 
+        click.echo(f"Extracting examples from collected resources:")
+        for idx, (resource, signature, content, content_hash, harvested, previous_files) in enumerate(pending):
+            click.echo(f"  {resource.resource_type.name} resource {resource.uri}:")
             metadata = {
                 **resource.metadata,
                 "resource_id": resource.id,
@@ -228,38 +264,72 @@ The document from which to extract begins below this line and runs until the end
                 "source_sha256_hash": content_hash,
             }
 
-            if not response:
-                continue
-            response_content = response.choices[0].message.content.strip()
-            if not response_content:
-                continue
-            try:
-                example_list = json.loads(response_content)["examples"]
-            except json.JSONDecodeError as err:
-                click.echo(f"Encountered error {err} when processing {resource.uri}")
-                failure_file_path = os.path.join(dest, f"failure_{num}.txt")
-                with open(failure_file_path, "w") as failure_file:
-                    failure_file.write(
-                        f"{response_content}\n"
-                        f"{'====' * 20}\n"
-                    )
-                    json.dump(metadata, failure_file, indent=2)
-                    failure_file.write(
-                        f"\n{'====' * 20}\n"
-                        f"{err}\n{err.msg}\n"
-                    )
+            content_lines = content.splitlines(keepends=True)
+            if harvested:
+                # Examples that can be harvested deterministically don't need to be extracted by the LLM
+                example_list = harvested
+                metadata["extraction_method"] = "harvested"
+            elif not llm:
+                click.echo("    No examples found.")
                 continue
+            else:
+                metadata["extraction_method"] = "llm"
+                window_examples = []
+                failed = False
+                for response_content in llm_responses[idx]:
+                    if isinstance(response_content, BaseException):
+                        click.echo(f"    Request failed: {response_content}")
+                        failed = True
+                        continue
+                    if not response_content:
+                        window_examples.append([])
+                        continue
+                    try:
+                        window_examples.append(parse_examples(response_content))
+                    except ValueError as err:
+                        click.echo(f"Encountered error {err} when processing {resource.uri}")
+                        failure_file_path = os.path.join(dest, f"failure_{num}.txt")
+                        with open(failure_file_path, "w") as failure_file:
+                            failure_file.write(
+                                f"{response_content}\n"
+                                f"{'====' * 20}\n"
+                            )
+                            json.dump(metadata, failure_file, indent=2)
+                            failure_file.write(
+                                f"\n{'====' * 20}\n"
+                                f"{err}\n"
+                            )
+                        failed = True
+                if failed:
+                    # Successful windows are cached, so only the failed ones are requested again on the next run
+                    continue
+                example_list = merge_window_examples(resource_windows[idx], window_examples)
 
             if not example_list:
                 click.echo("    No examples found.")
+                record_examples(resource, signature, content_hash, [], previous_files)
                 continue
             click.echo(f"    {len(example_list)} examples extracted.")
 
             total_example_count += len(example_list)
 
+            example_files = []
             for example_num, example in enumerate(example_list, start=1):
                 example_filename = os.path.join(dest, f"example_{num}_{example_num}.md")
                 example_metadata_filename = f"{example_filename}.metadata"
+                example_files.append(example_filename)
+                if isinstance(example, HarvestedExample):
+                    example_metadata = {
+                        **metadata,
+                        "start_line": example.start_line - 1,
+                        "stop_line": example.stop_line,
+                        "example_source": example.source,
+                    }
+                    with open(example_filename, "w") as example_file, open(example_metadata_filename, "w") as example_metadata_file:
+                        example_file.write(example.as_markdown())
+                        json.dump(example_metadata, example_metadata_file, indent=2, default=(lambda o: str(o)))
+                    continue
+
                 start = int(example["start_line"]) - 1
                 stop = int(example["stop_line"])
                 prelude_lines = example.get("prelude", "").splitlines(keepends=True)
@@ -289,14 +359,11 @@ The document from which to extract begins below this line and runs until the end
                     example_file.write(example_file_contents)
                     json.dump(example_metadata, example_metadata_file, indent=2, default=(lambda o: str(o)))
 
+            record_examples(resource, signature, content_hash, example_files, previous_files)
+
             # Iterate source file num for next loop
             num += 1
 
-        if files_to_delete and not keep:
-            click.echo("Removing out-of-date examples due to updates in the resources. (Run with --keep flag to preserve out-of-date examples)")
-            for file_to_delete in files_to_delete:
-                os.remove(file_to_delete)
-                click.echo(f"  {file_to_delete}")
     click.echo(f"\nA total of {total_example_count} examples extracted from {len(resource_list)} resources")
 
 
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ..corpus.util.helpers import default_cache_dir
+
+
+@dataclass
+class IndexedSource:
+    """
+    A source that examples have previously been extracted from.
+    The signature is None if the source was indexed from the example files on disk rather than from the source itself.
+    """
+    uri: str
+    hash: str | None
+    signature: tuple[int, int] | None = None
+    example_files: list[str] = field(default_factory=list)
+
+    def example_files_exist(self) -> bool:
+        return all(os.path.isfile(example_file) for example_file in self.example_files)
+
+
+class ExtractionIndex:
+    """
+    Persistent index of the sources examples have been extracted from, recording each source's stat signature
+    (mtime and size), content hash and the example files generated from it.
+
+    The index allows unchanged sources to be skipped with a stat call instead of hashing their content (and, for local
+    files, reading it), and replaces rediscovering and parsing every example file on every run. Each source is updated in a single
+    transaction, so an interrupted run never leaves a source recorded with a partial set of example files, and its
+    out-of-date example files are removed in that same step rather than after it.
+    """
+    path: Path
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sources (
+            uri TEXT PRIMARY KEY,
+            mtime_ns INTEGER,
+            size INTEGER,
+            hash TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS example_files (
+            path TEXT PRIMARY KEY,
+            source_uri TEXT NOT NULL REFERENCES sources(uri) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS example_files_source_uri ON example_files(source_uri);
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        with self.connection:
+            self.connection.executescript(self.SCHEMA)
+
+    @classmethod
+    def for_directory(cls, example_dir: str | Path, cache_dir: str | Path | None = None) -> "ExtractionIndex":
+        """
+        Opens the index for the examples in `example_dir`. Stat signatures are only meaningful on the machine that
+        recorded them, so indexes are kept in the cache directory rather than alongside the examples.
+        """
+        cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        dir_hash = hashlib.sha256(os.path.abspath(example_dir).encode()).hexdigest()[:16]
+        return cls(cache_dir / "extraction" / f"{dir_hash}.sqlite3")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def is_empty(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM sources LIMIT 1").fetchone() is None
+
+    def get(self, uri: str) -> IndexedSource | None:
+        row = self.connection.execute("SELECT mtime_ns, size, hash FROM sources WHERE uri = ?", (uri,)).fetchone()
+        if row is None:
+            return None
+        mtime_ns, size, content_hash = row
+        example_files = [
+            path for (path,) in self.connection.execute(
+                "SELECT path FROM example_files WHERE source_uri = ? ORDER BY path", (uri,)
+            )
+        ]
+        return IndexedSource(
+            uri=uri,
+            hash=content_hash,
+            signature=(mtime_ns, size) if mtime_ns is not None else None,
+            example_files=example_files,
+        )
+
+    def is_unchanged(self, uri: str, signature: tuple[int, int] | None) -> bool:
+        """
+        Returns True if `uri` was indexed with the same stat signature, and all of its example files still exist.
+        """
+        if signature is None:
+            return False
+        indexed = self.get(uri)
+        return bool(indexed and indexed.signature == tuple(signature) and indexed.example_files_exist())
+
+    def record(
+        self,
+        uri: str,
+        signature: tuple[int, int] | None,
+        content_hash: str | None,
+        example_files: list[str],
+        remove: list[str] | None = None,
+    ) -> list[str]:
+        """
+        Records the examples generated from `uri`, replacing any that were recorded previously. The example files in
+        `remove`, and their `.metadata` sidecars, are deleted before the change is committed, so that they are never
+        left on disk untracked by the index. Files that no longer exist are skipped. Returns the example files that were
+        removed.
+        """
+        mtime_ns, size = signature if signature is not None else (None, None)
+        keep = {os.path.abspath(example_file) for example_file in example_files}
+        removed = []
+        with self.connection:
+            self.connection.execute("DELETE FROM example_files WHERE source_uri = ?", (uri,))
+            self.connection.execute(
+                """
+                INSERT INTO sources (uri, mtime_ns, size, hash, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(uri) DO UPDATE SET
+                    mtime_ns = excluded.mtime_ns, size = excluded.size, hash = excluded.hash, updated_at = excluded.updated_at
+                """,
+                (uri, mtime_ns, size, content_hash, time.time()),
+            )
+            # An example file belongs to a single source, so take it over if it was recorded elsewhere
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO example_files (path, source_uri) VALUES (?, ?)",
+                [(os.path.abspath(example_file), uri) for example_file in example_files],
+            )
+            for path in remove or []:
+                if os.path.abspath(path) in keep:
+                    continue
+                if os.path.isfile(f"{path}.metadata"):
+                    os.remove(f"{path}.metadata")
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                removed.append(path)
+        return removed
+
+    def touch(self, uri: str, signature: tuple[int, int] | None):
+        """
+        Updates the stat signature of a source whose content has not changed, so it can be skipped on the next run.
+        """
+        mtime_ns, size = signature if signature is not None else (None, None)
+        with self.connection:
+            self.connection.execute(
+                "UPDATE sources SET mtime_ns = ?, size = ?, updated_at = ? WHERE uri = ?",
+                (mtime_ns, size, time.time(), uri),
+            )
+
+    def seed(self, example_map: dict[str, Any]):
+        """
+        Populates the index from an existing example map (see `generate_existing_example_map`), e.g. when examples were
+        extracted on another machine. Seeded sources have no signature, so they are hashed once on the next run.
+        """
+        with self.connection:
+            for uri, source in example_map["sources"].items():
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO sources (uri, mtime_ns, size, hash, updated_at) VALUES (?, NULL, NULL, ?, ?)",
+                    (uri, source["hash"], time.time()),
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO example_files (path, source_uri) VALUES (?, ?)",
+                    [(os.path.abspath(example_file), uri) for example_file in source["example_files"]],
+                )
@@ -0,0 +1,486 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable
+
+import openai
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from ..corpus.util.helpers import default_cache_dir, estimate_tokens
+from ..corpus.util.logging import logger
+
+
+EXAMPLE_SYSTEM_PROMPT = """
+You are a helpful assistant who is excellent at understanding and describing code and who always responds using JSON.
+You are helping to identify and explain code examples to allow for better understanding and use on how to use novel and
+interesting software libaries. These examples will help users to code in and/or use the covered software.
+""".strip()
+
+_DOCUMENT_INTRO = """A document is provided below. It contains line numbers on the left, the content on the right, with the sides separated by ` : `.
+"""
+
+_EXCERPTS_NOTE = """Only excerpts of a long document may be included. Lines that were left out are marked by a line containing only `...`, and the line numbers are always those of the full document.
+"""
+
+_EXAMPLE_INSTRUCTIONS = """The provided document may be a source code file, a documentation page, an executable notebook, or hand extracted examples created by hand.
+It may contain one or more curated examples as for how to accomplish something using relevant libraries.
+Please identify any such examples and generate a short description of the purpose of the example code, along with the start/stop line numbers (inclusive) where the example occurs.
+For example, if the example is a single line on the line labeled 34, both `start_line` and `stop_line` would be equal to 34.
+If the example was spread of 5 lines, starting at line 12, the values would be `start_line` = 12, `stop_line` = 16.
+Also, make sure to include a prelude of code that contains any imports or definitions needed so the example is as complete as possible and has everything it needs to run as a stand-alone code block.
+The prelude will later be combined with the example to help use the libraries these documents are related to.
+Please ensure that all imports and definitions in the prelude are complete. Do not use statements like "put your code here..." or summarize what should be done.
+Do not identify/extract regular source code from files as examples. Only extract unique tasks that demonstrate how to properly use the library.
+That is, all exracted examples should show usage of functions, not just the code that defines a function. Assume the user will be able to look up argument and parameter information.
+You should err on the side of fewer, more complete examples which show an entire "step" of work rather than examples of subtasks.
+As an example, if you find sample code where a dataset is sorted and a comparison function is defined to help sort, only extract one example that includes all the code. Do not create a separate example of how to define a comparison function.
+If you do not find any examples in the document, do not generate one yourself. Instead return an empty list.
+
+Please be sure to format your answer in json format as response object that matches this format with one object per example object in the `examples` list:
+  {
+    "examples": [
+      {
+        "description": str,
+        "prelude": str,
+        "start_line": int,
+        "stop_line": int,
+      },
+      ...
+    ]
+  }
+
+The document from which to extract begins below this line and runs until the end of the input:\n"""
+
+# Prompt for the windows of candidate regions of a document, as sent by extract-examples
+EXAMPLE_PROMPT = "\n" + _DOCUMENT_INTRO + _EXCERPTS_NOTE + _EXAMPLE_INSTRUCTIONS
+
+# Prompt for whole documents, as sent by extract-documentation
+FULL_DOCUMENT_EXAMPLE_PROMPT = "\n" + _DOCUMENT_INTRO + _EXAMPLE_INSTRUCTIONS
+
+
+def number_lines(content_lines: list[str], start: int = 1) -> str:
+    return "".join(f"{line_no:6} : {line}" for line_no, line in enumerate(content_lines, start=start))
+
+
+def sha256(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+@dataclass
+class ExtractionRequest:
+    """
+    A single request to the LLM. The `content` is the document being processed, which is sent after the `prompt`.
+    """
+    prompt: str
+    content: str
+    system_prompt: str = EXAMPLE_SYSTEM_PROMPT
+
+
+# Documents in these directories, and notebooks, are examples in their entirety
+EXAMPLE_DIRECTORIES = frozenset(("example", "examples", "vignettes", "demo", "demos", "tutorial", "tutorials", "notebooks"))
+EXAMPLE_DOCUMENT_EXTENSIONS = (".ipynb", ".rmd", ".qmd")
+
+# Lines of context kept around each candidate region
+CONTEXT_LINES = 3
+# Maximum number of lines sent in a single request, and the overlap between the windows of a larger region
+WINDOW_LINES = 300
+WINDOW_OVERLAP = 30
+
+_fence_re = re.compile(r"^\s*(```|~~~)")
+_doctest_re = re.compile(r"^\s*>>>")
+_cell_marker_re = re.compile(r"^\s*#\s*(%%|In\s*\[.*\]:)")
+_main_block_re = re.compile(r"""^(?P<indent>\s*)if\s+__name__\s*==\s*['"]__main__['"]\s*:""")
+_rst_block_re = re.compile(r"^(?P<indent>\s*)(\.\.\s+(code-block|code|sourcecode)::.*|.*::\s*)$")
+_r_examples_re = re.compile(r"^\s*(#'\s*@examples|\\examples\{)")
+_r_examples_end_re = re.compile(r"^\s*(#'\s*@\w+|[^#\s])")
+
+
+def _indent(line: str) -> int:
+    return len(line.expandtabs()) - len(line.expandtabs().lstrip())
+
+
+def _block_end(content_lines: list[str], start: int, indent: int) -> int:
+    """
+    Returns the index of the first line after `start` that is indented at or below `indent`, ignoring blank lines.
+    """
+    end = start + 1
+    while end < len(content_lines) and (not content_lines[end].strip() or _indent(content_lines[end]) > indent):
+        end += 1
+    return end
+
+
+def is_example_document(location: str) -> bool:
+    path = PurePosixPath(location.split("#", 1)[0].lower())
+    return path.suffix in EXAMPLE_DOCUMENT_EXTENSIONS or bool(EXAMPLE_DIRECTORIES.intersection(path.parts[:-1]))
+
+
+def find_candidate_regions(content_lines: list[str], location: str = "") -> list[tuple[int, int]]:
+    """
+    Finds the regions of a document that may contain examples: code fences, doctest blocks, notebook cells,
+    `if __name__ == "__main__"` blocks, reStructuredText code blocks and R examples. Whole documents are returned for
+    notebooks, vignettes and documents found in example directories.
+    Regions are returned as sorted, 0-based `(start, stop)` line ranges, where `stop` is exclusive.
+    """
+    if not content_lines:
+        return []
+    if is_example_document(location):
+        return [(0, len(content_lines))]
+
+    regions = []
+    idx = 0
+    while idx < len(content_lines):
+        line = content_lines[idx]
+        if _fence_re.match(line):
+            fence = _fence_re.match(line).group(1)
+            end = idx + 1
+            while end < len(content_lines) and not content_lines[end].lstrip().startswith(fence):
+                end += 1
+            regions.append((idx, min(end + 1, len(content_lines))))
+            idx = end + 1
+        elif _doctest_re.match(line):
+            end = idx + 1
+            while end < len(content_lines) and content_lines[end].strip():
+                end += 1
+            regions.append((idx, end))
+            idx = end
+        elif _cell_marker_re.match(line):
+            end = idx + 1
+            while end < len(content_lines) and not _cell_marker_re.match(content_lines[end]):
+                end += 1
+            regions.append((idx, end))
+            idx = end
+        elif match := _main_block_re.match(line):
+            end = _block_end(content_lines, idx, _indent(match.group("indent")))
+            regions.append((idx, end))
+            idx = end
+        elif (match := _rst_block_re.match(line)) and not line.lstrip().startswith(("#", "//")):
+            end = _block_end(content_lines, idx, _indent(match.group("indent")))
+            if end > idx + 1:
+                regions.append((idx, end))
+            idx = max(end, idx + 1)
+        elif _r_examples_re.match(line):
+            end = idx + 1
+            while end < len(content_lines) and not _r_examples_end_re.match(content_lines[end]):
+                end += 1
+            regions.append((idx, end))
+            idx = end
+        else:
+            idx += 1
+    return regions
+
+
+@dataclass
+class DocumentWindow:
+    """
+    A set of line ranges from a document that are sent to the LLM together. Ranges are 1-based and inclusive, and are
+    rendered with the line numbers of the full document so that the LLM's answers need no translation.
+    """
+    ranges: list[tuple[int, int]]
+
+    @property
+    def line_count(self) -> int:
+        return sum(stop - start + 1 for start, stop in self.ranges)
+
+    def contains(self, start_line: int, stop_line: int) -> bool:
+        return any(start <= start_line <= stop_line <= stop for start, stop in self.ranges)
+
+    def render(self, content_lines: list[str]) -> str:
+        sections = []
+        for start, stop in self.ranges:
+            section = number_lines(content_lines[start - 1:stop], start=start)
+            sections.append(section if section.endswith("\n") else f"{section}\n")
+        return "...\n".join(sections)
+
+
+def build_windows(
+    content_lines: list[str],
+    location: str = "",
+    max_lines: int = WINDOW_LINES,
+    overlap: int = WINDOW_OVERLAP,
+    context: int = CONTEXT_LINES,
+) -> list[DocumentWindow]:
+    """
+    Splits the candidate regions of a document in to windows of at most `max_lines` lines. Nearby regions are merged,
+    small regions are packed together in to a single window, and regions larger than a window are split in to
+    overlapping windows so that examples on a boundary are seen whole by at least one request.
+    """
+    ranges: list[list[int]] = []
+    for start, stop in find_candidate_regions(content_lines, location):
+        start = max(start - context, 0) + 1
+        stop = min(stop + context, len(content_lines))
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], stop)
+        else:
+            ranges.append([start, stop])
+
+    pieces: list[tuple[int, int]] = []
+    step = max(max_lines - overlap, 1)
+    for start, stop in ranges:
+        piece_start = start
+        while True:
+            piece_stop = min(piece_start + max_lines - 1, stop)
+            pieces.append((piece_start, piece_stop))
+            if piece_stop >= stop:
+                break
+            piece_start += step
+
+    windows: list[DocumentWindow] = []
+    for piece in pieces:
+        if windows and windows[-1].line_count + piece[1] - piece[0] + 1 <= max_lines:
+            windows[-1].ranges.append(piece)
+        else:
+            windows.append(DocumentWindow(ranges=[piece]))
+    return windows
+
+
+def parse_examples(response_content: str) -> list[dict]:
+    """
+    Returns the examples listed in an extraction response, raising a ValueError (e.g. a `json.JSONDecodeError`) if the
+    response isn't in the format the prompts ask for.
+    """
+    response = json.loads(response_content)
+    examples = response.get("examples", None) if isinstance(response, dict) else None
+    if not isinstance(examples, list):
+        raise ValueError("Response does not contain a list of `examples`.")
+    return examples
+
+
+def merge_window_examples(windows: list[DocumentWindow], window_examples: list[list[dict]]) -> list[dict]:
+    """
+    Combines the examples found in each window, dropping examples with line numbers outside of the window they came
+    from and examples from overlapping windows that duplicate one already found.
+    """
+    merged = []
+    for window, examples in zip(windows, window_examples):
+        for example in examples:
+            try:
+                start_line, stop_line = int(example["start_line"]), int(example["stop_line"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not window.contains(start_line, stop_line):
+                continue
+            if any(
+                start_line <= int(other["stop_line"]) and int(other["start_line"]) <= stop_line
+                for other in merged
+            ):
+                continue
+            merged.append(example)
+    return sorted(merged, key=lambda example: int(example["start_line"]))
+
+
+class ResponseCache:
+    """
+    Persistent cache of LLM responses, keyed by model, prompt hash and content hash.
+
+    Each response is stored in its own json file, written atomically, so concurrent and interrupted runs never leave
+    a partial entry behind and a rerun only pays for the requests that had not completed.
+    """
+    cache_dir: Path
+
+    def __init__(self, cache_dir: str | Path | None = None) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir() / "llm"
+
+    @staticmethod
+    def key(model: str, request: ExtractionRequest) -> str:
+        prompt_hash = sha256(f"{request.system_prompt}\n{request.prompt}")
+        content_hash = sha256(request.content)
+        return sha256(f"{model}:{prompt_hash}:{content_hash}")
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        try:
+            with self._path(key).open() as cache_file:
+                return json.load(cache_file)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key: str, model: str, response: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, delete=False) as tmp_file:
+            json.dump({"model": model, "created_at": time.time(), "response": response}, tmp_file)
+        os.replace(tmp_file.name, path)
+
+
+class RateLimiter:
+    """
+    Async limiter for requests and tokens per minute, using token buckets that refill continuously.
+    A limit of None is not enforced.
+    """
+
+    def __init__(self, requests_per_minute: int | None = None, tokens_per_minute: int | None = None) -> None:
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self._updated_at) / 60
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute, self._request_allowance + elapsed_minutes * self.requests_per_minute
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute, self._token_allowance + elapsed_minutes * self.tokens_per_minute
+            )
+
+    async def acquire(self, tokens: int = 0):
+        if not (self.requests_per_minute or self.tokens_per_minute):
+            return
+        if self.tokens_per_minute:
+            # A single request larger than the limit would otherwise wait forever
+            tokens = min(tokens, self.tokens_per_minute)
+        # Waiters are served in order, so large requests aren't starved by small ones
+        async with self._lock:
+            while True:
+                self._refill()
+                wait_minutes = 0.0
+                if self.requests_per_minute and self._request_allowance < 1:
+                    wait_minutes = max(wait_minutes, (1 - self._request_allowance) / self.requests_per_minute)
+                if self.tokens_per_minute and self._token_allowance < tokens:
+                    wait_minutes = max(wait_minutes, (tokens - self._token_allowance) / self.tokens_per_minute)
+                if wait_minutes <= 0:
+                    break
+                await asyncio.sleep(wait_minutes * 60)
+            if self.requests_per_minute:
+                self._request_allowance -= 1
+            if self.tokens_per_minute:
+                self._token_allowance -= tokens
+
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class ExtractionEngine:
+    """
+    Runs many LLM requests concurrently, limited to `concurrency` requests in flight and, optionally, to a number of
+    requests and tokens per minute. Transient API errors are retried with exponential backoff, and responses are kept
+    in a persistent `ResponseCache` so that completed requests are never paid for twice. Only responses accepted by
+    `validate` are cached or reused from the cache, so a malformed response is requested again on the next run instead
+    of being replayed.
+
+    The OpenAI client honors the usual `OPENAI_API_KEY` and `OPENAI_BASE_URL` environment variables, so the engine
+    can be pointed at any OpenAI compatible endpoint.
+    """
+    model: str
+    concurrency: int
+    max_attempts: int = 6
+
+    def __init__(
+        self,
+        model: str = "gpt-4o",
+        concurrency: int = 8,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        cache: ResponseCache | None = None,
+        client: "openai.AsyncOpenAI | None" = None,
+        max_attempts: int | None = None,
+        validate: Callable[[str], Any] | None = parse_examples,
+    ) -> None:
+        self.model = model
+        self.validate = validate
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.cache = cache if cache is not None else ResponseCache()
+        self.client = client
+        if max_attempts is not None:
+            self.max_attempts = max_attempts
+        self.cache_hits = 0
+        self.requests_made = 0
+
+    async def _request(
+        self,
+        client: "openai.AsyncOpenAI",
+        request: ExtractionRequest,
+        semaphore: asyncio.Semaphore,
+        limiter: RateLimiter,
+    ) -> str | None:
+        key = self.cache.key(self.model, request)
+        cached = self.cache.get(key)
+        if cached is not None and self._is_valid(cached):
+            self.cache_hits += 1
+            return cached
+
+        user_prompt = "\n".join([request.prompt, request.content])
+        tokens = estimate_tokens(request.system_prompt) + estimate_tokens(user_prompt)
+        async with semaphore:
+            async for attempt in AsyncRetrying(
+                retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                stop=stop_after_attempt(self.max_attempts),
+                wait=wait_random_exponential(multiplier=1, max=60),
+                reraise=True,
+            ):
+                with attempt:
+                    await limiter.acquire(tokens)
+                    self.requests_made += 1
+                    response = await client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": request.system_prompt,
+                            },
+                            {
+                                "role": "user",
+                                "content": user_prompt,
+                            }
+                        ],
+                        response_format={"type": "json_object"},
+                    )
+        if not response or not response.choices:
+            return None
+        content = (response.choices[0].message.content or "").strip()
+        if content and self._is_valid(content):
+            self.cache.set(key, self.model, content)
+        return content
+
+    def _is_valid(self, content: str) -> bool:
+        if self.validate is None:
+            return True
+        try:
+            self.validate(content)
+        except ValueError as err:
+            logger.warning(f"Ignoring malformed LLM response: {err}")
+            return False
+        return True
+
+    async def run_async(self, requests: list[ExtractionRequest]) -> list[str | BaseException | None]:
+        """
+        Runs all of the requests, returning the response content for each in the same order. Requests that fail after
+        all retries return their exception rather than failing the whole batch.
+        """
+        client = self.client or openai.AsyncOpenAI()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        results = await asyncio.gather(
+            *(self._request(client, request, semaphore, limiter) for request in requests),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"LLM extraction request failed: {result}")
+        return results
+
+    def run(self, requests: list[ExtractionRequest]) -> list[str | BaseException | None]:
+        if not requests:
+            return []
+        return asyncio.run(self.run_async(requests))
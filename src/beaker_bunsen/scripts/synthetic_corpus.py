@@ -0,0 +1,197 @@
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Number of each kind of source generated at each scale
+SCALES: dict[str, dict[str, int]] = {
+    "small": {"modules": 10, "functions_per_module": 8, "documents": 10, "r_files": 5, "examples": 10},
+    "medium": {"modules": 50, "functions_per_module": 12, "documents": 50, "r_files": 25, "examples": 50},
+    "large": {"modules": 250, "functions_per_module": 16, "documents": 250, "r_files": 125, "examples": 250},
+}
+
+VERBS = [
+    "load", "save", "plot", "filter", "merge", "resample", "normalize", "aggregate", "validate", "export", "parse",
+    "render", "cluster", "interpolate", "smooth", "forecast", "index", "sample", "transform", "summarize",
+]
+NOUNS = [
+    "dataset", "timeseries", "matrix", "histogram", "dataframe", "raster", "network", "spectrum", "model", "grid",
+    "catalog", "survey", "mesh", "signal", "table", "trajectory", "image", "graph", "record", "field",
+]
+QUALIFIERS = [
+    "weighted", "sparse", "hourly", "regional", "filtered", "cached", "streaming", "nested", "labelled", "gridded",
+]
+FILLER = [
+    "the", "a", "values", "each", "with", "from", "into", "by", "result", "input", "returns", "optional", "default",
+    "when", "is", "are", "for", "of", "and", "to", "using", "data", "option", "parameter", "column", "axis",
+]
+
+
+@dataclass
+class SyntheticFunction:
+    name: str
+    module: str
+    summary: str
+
+
+@dataclass
+class SyntheticCorpus:
+    """
+    Layout of a generated corpus. `functions` records each generated function, along with the one line summary in its
+    docstring, so that queries with known answers can be made against the corpus.
+    """
+    root: Path
+    scale: str
+    seed: int
+    package: str
+    functions: list[SyntheticFunction] = field(default_factory=list)
+
+    @property
+    def package_root(self) -> Path:
+        """Directory to add to `sys.path` to import the generated package."""
+        return self.root / "src"
+
+    @property
+    def documentation_dir(self) -> Path:
+        return self.root / "docs"
+
+    @property
+    def r_dir(self) -> Path:
+        return self.root / "R"
+
+    @property
+    def examples_dir(self) -> Path:
+        return self.root / "examples"
+
+    @property
+    def module_names(self) -> list[str]:
+        return sorted({function.module for function in self.functions})
+
+
+class _Writer:
+    """
+    Deterministic source of names and prose, so that a seed and scale always generate byte for byte identical files.
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+
+    def topic(self) -> tuple[str, str, str]:
+        return self.rng.choice(VERBS), self.rng.choice(QUALIFIERS), self.rng.choice(NOUNS)
+
+    def sentence(self, *keywords: str, words: int = 12) -> str:
+        parts = [self.rng.choice(FILLER) for _ in range(words)]
+        for keyword in keywords:
+            parts.insert(self.rng.randrange(len(parts) + 1), keyword)
+        return " ".join(parts).capitalize() + "."
+
+    def paragraph(self, *keywords: str, sentences: int = 4) -> str:
+        return " ".join(self.sentence(*keywords) for _ in range(sentences))
+
+
+def _python_function(writer: _Writer, name: str, summary: str, verb: str, noun: str) -> str:
+    arguments = ", ".join(writer.rng.sample(["data", "axis", "weights", "window", "method", "threshold"], 3))
+    return f'''
+def {name}({arguments}=None):
+    """
+    {summary}
+
+    {writer.paragraph(verb, noun, sentences=2)}
+
+    >>> {name}([1, 2, 3])
+    [1, 2, 3]
+    """
+    result = []
+    for value in data or []:
+        if value is None:
+            continue
+        result.append(value)
+    return result
+'''
+
+
+def generate_synthetic_corpus(dest: str | Path, scale: str = "small", seed: int = 0) -> SyntheticCorpus:
+    """
+    Generates a corpus of Python modules, markdown documentation, R files and examples in `dest`. The same scale and
+    seed always generate the same files.
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale `{scale}`. Expected one of: {', '.join(SCALES)}")
+    counts = SCALES[scale]
+    writer = _Writer(seed)
+    corpus = SyntheticCorpus(root=Path(dest), scale=scale, seed=seed, package="bunsen_synthetic")
+
+    package_dir = corpus.package_root / corpus.package
+    package_dir.mkdir(parents=True, exist_ok=True)
+    (package_dir / "__init__.py").write_text('"""\nSynthetic package generated for benchmarks.\n"""\n')
+    used_names = set()
+    for module_num in range(counts["modules"]):
+        module_name = f"module_{module_num:04d}"
+        verb, qualifier, noun = writer.topic()
+        source = [f'"""\nUtilities to {verb} {qualifier} {noun} data.\n\n{writer.paragraph(verb, noun)}\n"""\n']
+        for _ in range(counts["functions_per_module"]):
+            verb, qualifier, noun = writer.topic()
+            name = f"{verb}_{qualifier}_{noun}"
+            suffix = 2
+            while name in used_names:
+                name = f"{verb}_{qualifier}_{noun}_{suffix}"
+                suffix += 1
+            used_names.add(name)
+            summary = f"{verb.capitalize()} a {qualifier} {noun}."
+            source.append(_python_function(writer, name, summary, verb, noun))
+            corpus.functions.append(SyntheticFunction(name=name, module=f"{corpus.package}.{module_name}", summary=summary))
+        (package_dir / f"{module_name}.py").write_text("\n".join(source))
+
+    corpus.documentation_dir.mkdir(parents=True, exist_ok=True)
+    for doc_num in range(counts["documents"]):
+        verb, qualifier, noun = writer.topic()
+        sections = [f"# How to {verb} a {qualifier} {noun}\n", writer.paragraph(verb, qualifier, noun)]
+        for _ in range(writer.rng.randint(2, 5)):
+            verb, qualifier, noun = writer.topic()
+            function = writer.rng.choice(corpus.functions)
+            sections.extend([
+                f"\n## {verb.capitalize()} {noun}\n",
+                writer.paragraph(verb, noun, sentences=writer.rng.randint(3, 8)),
+                f"\n```python\nfrom {function.module} import {function.name}\n{function.name}(data)\n```\n",
+            ])
+        (corpus.documentation_dir / f"guide_{doc_num:04d}.md").write_text("\n".join(sections))
+
+    corpus.r_dir.mkdir(parents=True, exist_ok=True)
+    for r_num in range(counts["r_files"]):
+        functions = []
+        for _ in range(counts["functions_per_module"]):
+            verb, qualifier, noun = writer.topic()
+            functions.append(
+                f"#' {writer.sentence(verb, noun, words=8)}\n"
+                f"#' @examples\n#' {verb}_{noun}(df)\n"
+                f"{verb}_{noun} <- function(df, ...) {{\n  df[!is.na(df$value), ]\n}}\n"
+            )
+        (corpus.r_dir / f"utils_{r_num:04d}.R").write_text("\n".join(functions))
+
+    corpus.examples_dir.mkdir(parents=True, exist_ok=True)
+    for example_num in range(counts["examples"]):
+        function = writer.rng.choice(corpus.functions)
+        verb, qualifier, noun = function.name.split("_")[:3]
+        (corpus.examples_dir / f"example_{example_num:04d}.md").write_text(
+            f"# Query\nHow do I {verb} a {qualifier} {noun}?\n\n"
+            f"# Code\n```python\nfrom {function.module} import {function.name}\n{function.name}(data)\n```\n\n"
+            f"# Description\n{writer.paragraph(verb, noun, sentences=2)}\n"
+        )
+
+    return corpus
+
+
+def source_size(corpus: SyntheticCorpus) -> dict[str, int]:
+    """Returns the number of files and characters generated for each kind of source."""
+    sizes = {}
+    for kind, directory in (
+        ("python", corpus.package_root),
+        ("documentation", corpus.documentation_dir),
+        ("r", corpus.r_dir),
+        ("examples", corpus.examples_dir),
+    ):
+        files = [os.path.join(path, name) for path, _, names in os.walk(directory) for name in names]
+        sizes[f"{kind}_files"] = len(files)
+        sizes[f"{kind}_chars"] = sum(os.path.getsize(path) for path in files)
+    return sizes
@@ -0,0 +1,75 @@
+import http.server
+import json
+import re
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def local_llm_endpoint():
+    """
+    A minimal OpenAI compatible chat completions endpoint that echoes the last line of the prompt. The first request
+    for any prompt ending in "flaky" fails with a 429, and the first response to any prompt ending in "malformed" isn't
+    valid JSON.
+    """
+    requests_log = []
+    in_flight = [0, 0]  # current, maximum
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][-1]["content"]
+            last_line = prompt.rstrip().splitlines()[-1]
+            # Claims the whole of the numbered document as a single example
+            line_numbers = [int(number) for number in re.findall(r"^\s*(\d+) : ", prompt, re.MULTILINE)]
+            examples = [{
+                "description": "Everything",
+                "prelude": "",
+                "start_line": min(line_numbers),
+                "stop_line": max(line_numbers),
+            }] if line_numbers else []
+            with lock:
+                requests_log.append(last_line)
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+                status = 429 if last_line.endswith("flaky") and requests_log.count(last_line) == 1 else 200
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+            content = json.dumps({"examples": examples, "line": last_line})
+            if last_line.endswith("malformed") and requests_log.count(last_line) == 1:
+                content = '{"examples": ['
+            payload = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }],
+            }
+            if status != 200:
+                payload = {"error": {"message": "Rate limited", "type": "rate_limit"}}
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1", requests_log, in_flight
+    finally:
+        server.shutdown()
+        server.server_close()
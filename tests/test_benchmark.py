@@ -0,0 +1,61 @@
+import json
+
+from click.testing import CliRunner
+
+from beaker_bunsen.scripts.benchmark import benchmark_command, compare_results, format_comparison
+from beaker_bunsen.scripts.synthetic_corpus import generate_synthetic_corpus
+
+
+def test_synthetic_corpus_is_deterministic(tmp_path):
+    first = generate_synthetic_corpus(tmp_path / "first", scale="small", seed=3)
+    second = generate_synthetic_corpus(tmp_path / "second", scale="small", seed=3)
+    other = generate_synthetic_corpus(tmp_path / "other", scale="small", seed=4)
+
+    def contents(root):
+        return {str(path.relative_to(root)): path.read_text() for path in sorted(root.rglob("*")) if path.is_file()}
+    assert contents(first.root) == contents(second.root) != contents(other.root)
+    assert first.functions == second.functions
+    assert len(first.module_names) == 10 and len(list(first.r_dir.glob("*.R"))) == 5
+
+
+def test_benchmark_command(tmp_path):
+    runner = CliRunner()
+    baseline_path = tmp_path / "baseline.json"
+    args = ["--only", "splitter", "--only", "local-loader", "--only", "build-prompt", "--repeat", "2"]
+    result = runner.invoke(benchmark_command, args + ["--output", str(baseline_path)])
+    assert result.exit_code == 0, result.output
+    baseline = json.loads(baseline_path.read_text())
+    small = baseline["results"]["small"]
+    assert set(small) == {"_sources", "splitter", "local-loader", "build-prompt"}
+    assert small["splitter"]["size"]["chunks"] > 0 and small["local-loader"]["size"]["resources"] == 25
+    assert small["build-prompt"]["latency_ms"]["p50"] > 0
+
+    # Comparing a run with itself finds no regressions
+    comparison = compare_results(baseline, baseline)
+    assert comparison and not any(row["regression"] for row in comparison)
+
+    # A baseline that was much faster fails the run
+    for result_metrics in small.values():
+        for group, values in result_metrics.items():
+            if group in ("seconds", "latency_ms"):
+                result_metrics[group] = {metric: value / 100 for metric, value in values.items()}
+    baseline_path.write_text(json.dumps(baseline))
+    result = runner.invoke(benchmark_command, args + ["--output", str(tmp_path / "current.json"), "--baseline", str(baseline_path)])
+    assert result.exit_code != 0
+    assert "REGRESSION" in result.output and "small/splitter/seconds/median" in result.output
+
+    # Metrics missing from the current run and benchmarks that failed are regressions too
+    current = json.loads((tmp_path / "current.json").read_text())
+    del current["results"]["small"]["splitter"]["seconds"]
+    current["results"]["small"]["build-prompt"] = {"error": "RuntimeError: boom"}
+    rows = {row["metric"]: row for row in compare_results(json.loads(json.dumps(current)), current)}
+    assert rows["small/build-prompt"]["regression"] and "boom" in rows["small/build-prompt"]["note"]
+    rows = {row["metric"]: row for row in compare_results(baseline, current)}
+    assert rows["small/splitter/seconds/median"]["regression"] and rows["small/splitter/seconds/median"]["current"] is None
+    assert rows["small/build-prompt/latency_ms/p50"]["note"] == "error: RuntimeError: boom"
+    assert "small/build-prompt" not in rows
+    assert "missing" in format_comparison(list(rows.values()))
+
+    # Timings need at least one run
+    result = runner.invoke(benchmark_command, ["--only", "splitter", "--repeat", "0"])
+    assert result.exit_code == 2 and "--repeat" in result.output
@@ -0,0 +1,274 @@
+import ast
+import asyncio
+import threading
+import time
+
+import beaker_bunsen.bunsen_context as bunsen_context_module
+from beaker_bunsen.bunsen_context import BunsenContext
+from beaker_bunsen.corpus.types import Record
+from beaker_bunsen.corpus.util.telemetry import HistogramRegistry
+
+
+class FakeSubkernel:
+    DISPLAY_NAME = "Python 3"
+    KERNEL_NAME = "python3"
+
+
+class OtherSubkernel:
+    DISPLAY_NAME = "R"
+    KERNEL_NAME = "ir"
+
+
+class FakeContext(BunsenContext):
+    """
+    A context whose subkernel is a plain namespace, evaluated in process.
+    """
+    SLUG = "bunsen_test"
+
+    def __init__(self, namespace: dict, bunsen_config: dict | None = None):
+        self._init_caches()
+        self.bunsen_config = bunsen_config or {}
+        self.subkernel = FakeSubkernel()
+        self.namespace = namespace
+        self.results = []
+        self.evaluate_delay = 0
+
+    async def evaluate(self, expression, parent_header={}):
+        await asyncio.sleep(self.evaluate_delay)
+        module = ast.parse(expression)
+        last = ast.Expression(module.body.pop().value)
+        exec(compile(module, "<state>", "exec"), self.namespace)
+        result = eval(compile(last, "<state>", "eval"), self.namespace)
+        self.results.append(result)
+        return {"return": result}
+
+
+def test_incremental_subkernel_state():
+    namespace = {"big": list(range(100_000)), "count": 1, "text": "x" * 10_000, "helper": len}
+    context = FakeContext(namespace)
+
+    async def fetch_twice():
+        return await asyncio.gather(context.subkernel_state(), context.subkernel_state())
+
+    first, second = asyncio.run(fetch_twice())
+    assert first == second and len(context.results) == 1
+    assert context.results[0]["full"]
+    assert len(first["variables"]["big"]) < 50
+    assert len(first["variables"]["text"]) <= context.STATE_VALUE_REPR_LIMIT + 3
+    assert first["functions"]["helper"] == "<built-in function len>"
+
+    # Without an execution the snapshot is reused
+    asyncio.run(context.subkernel_state())
+    assert len(context.results) == 1
+
+    # After an execution, only the names that changed are sent
+    namespace["count"] = 2
+    namespace["added"] = {"a": 1}
+    del namespace["text"]
+    asyncio.run(context.post_execute(None))
+    state = asyncio.run(context.subkernel_state())
+    diff = context.results[-1]
+    assert not diff["full"]
+    assert diff["changed"]["variables"] == {"count": "2", "added": "{'a': 1}"}
+    assert diff["removed"] == ["text"]
+    assert state["variables"] == {"big": first["variables"]["big"], "count": "2", "added": "{'a': 1}"}
+    assert state["functions"] == first["functions"]
+
+    # Values changed in place are sent again, not just rebound ones
+    namespace["added"]["a"] = 2
+    namespace["items"] = [1, 2, 3]
+    asyncio.run(context.post_execute(None))
+    asyncio.run(context.subkernel_state())
+    namespace["items"][0] = 99
+    asyncio.run(context.post_execute(None))
+    state = asyncio.run(context.subkernel_state())
+    assert context.results[-1]["changed"]["variables"] == {"items": "[99, 2, 3]"}
+    assert state["variables"]["added"] == "{'a': 2}"
+
+    # Values too large to fingerprint by their repr are picked up by the periodic full refresh
+    namespace["big"][0] = -1
+    context.STATE_FULL_REFRESH_INTERVAL = context._state_fetch_count + 1
+    asyncio.run(context.post_execute(None))
+    state = asyncio.run(context.subkernel_state())
+    assert context.results[-1]["full"]
+    assert state["variables"]["big"].startswith("[-1, ")
+
+
+def test_subkernel_state_description_is_capped():
+    namespace = {f"value_{idx}": "y" * 150 for idx in range(200)}
+    context = FakeContext(namespace)
+    description = asyncio.run(context.get_subkerkel_state_description())
+    assert len(description) <= context.STATE_DESCRIPTION_CHAR_LIMIT + 100
+    assert description.rstrip().endswith("more not shown")
+
+
+def test_static_prompt_fragments_are_cached(monkeypatch):
+    discoveries = []
+
+    def autodiscover_subkernels():
+        discoveries.append(True)
+        return {"python3": FakeSubkernel, "ir": OtherSubkernel}
+    monkeypatch.setattr(bunsen_context_module, "autodiscover_subkernels", autodiscover_subkernels)
+
+    config = {"libraries": {"python3": {"pandas": "Dataframes"}, "ir": {"dplyr": "Data manipulation"}}}
+    context = FakeContext({}, bunsen_config=config)
+    description = context.library_description
+    assert "pandas" in description and "dplyr" not in description
+    assert context.library_description is description
+    assert context.prompt_fragment("library_description", lambda: "unused").token_count > 0
+    assert len(discoveries) == 1
+
+    # Changing the subkernel rebuilds the fragments
+    context.subkernel = OtherSubkernel()
+    assert "dplyr" in context.library_description and "pandas" not in context.library_description
+    assert len(discoveries) == 2
+
+    # As does changing the config, or invalidating explicitly
+    context.bunsen_config = {"libraries": {"ir": {"ggplot2": "Plots"}}}
+    assert "ggplot2" in context.library_description
+    context.invalidate_prompt_fragments()
+    context.library_description
+    assert len(discoveries) == 4
+
+
+class FakeStore:
+    def __init__(self, delay: float = 0):
+        self.queries = []
+        self.delay = delay
+
+    def get_partitions(self):
+        return ["documentation", "examples"]
+
+    def query(self, query_string, partition=None, limit=-1):
+        self.queries.append((query_string, partition, limit))
+        if self.delay:
+            time.sleep(self.delay)
+        return {"query": query_string, "matches": [{"record": Record(id="docs:0", uri="docs", content="Plotting documentation"), "distance": 0.0}]}
+
+
+class FakeCorpus:
+    def __init__(self):
+        self.store = FakeStore()
+
+
+def test_corpus_loads_in_background(monkeypatch):
+    loading = threading.Event()
+    corpus = FakeCorpus()
+
+    def from_dir(corpus_dir):
+        assert corpus_dir == "/corpus"
+        loading.wait(5)
+        return corpus
+    monkeypatch.setattr(bunsen_context_module.Corpus, "from_dir", staticmethod(from_dir))
+
+    context = FakeContext({})
+    context.current_llm_query = "turn"
+    context.start_corpus_loading("/corpus")
+    assert not context.corpus_future.done()
+
+    async def query():
+        return await context.query_corpus("plot a graph", partition="examples", limit=3)
+
+    # Retrieval degrades to no matches while the corpus isn't ready
+    context.CORPUS_READY_TIMEOUT = 0.05
+    assert asyncio.run(query())["matches"] == []
+
+    # And waits for the corpus once it is loading, warming up every partition before the first query
+    loading.set()
+    context.CORPUS_READY_TIMEOUT = 5
+    assert len(asyncio.run(query())["matches"]) == 1
+    assert context.corpus is corpus
+    assert corpus.store.queries == [
+        ("warm up", "documentation", 1),
+        ("warm up", "examples", 1),
+        ("plot a graph", "examples", 3),
+    ]
+
+
+def test_corpus_load_failure_degrades(monkeypatch):
+    def from_dir(corpus_dir):
+        raise FileNotFoundError("Corpus is corrupt or missing required files and cannot be loaded.")
+    monkeypatch.setattr(bunsen_context_module.Corpus, "from_dir", staticmethod(from_dir))
+
+    context = FakeContext({})
+    context.current_llm_query = "turn"
+    context.start_corpus_loading("/corpus")
+    response = asyncio.run(context.query_corpus("plot a graph", partition="examples", limit=3))
+    assert response["matches"] == []
+
+
+def test_build_prompt_sections_have_deadlines(monkeypatch):
+    corpus = FakeCorpus()
+    monkeypatch.setattr(bunsen_context_module.Corpus, "from_dir", staticmethod(lambda corpus_dir: corpus))
+    monkeypatch.setattr(bunsen_context_module, "autodiscover_subkernels", lambda: {"python3": FakeSubkernel})
+
+    context = FakeContext({"count": 1})
+    context.agent = None
+    context.current_llm_query = "first turn"
+    context.start_corpus_loading("/corpus")
+    context.SECTION_DEADLINES = {"state": 0.2, "context": 0.2, "documentation": 0.2, "examples": 0.2}
+
+    prompt = asyncio.run(context.build_prompt())
+    assert "count" in prompt and "Plotting documentation" in prompt
+    assert not context.deadline_misses
+
+    # Slow sections are cut off at their deadline: the state is served from the last prompt, the documentation dropped
+    context.namespace["count"] = 2
+    asyncio.run(context.post_execute(None))
+    context.evaluate_delay = 5
+    corpus.store.delay = 1
+    context.current_llm_query = "second turn"
+
+    async def timed_build_prompt():
+        start = time.monotonic()
+        prompt = await context.build_prompt()
+        return prompt, time.monotonic() - start
+    stale_prompt, elapsed = asyncio.run(timed_build_prompt())
+    assert elapsed < 2
+    assert "`count`: `1`" in stale_prompt and "Plotting documentation" not in stale_prompt
+    assert context.deadline_misses == {"state": 1, "documentation": 1}
+
+
+class FakeKernel:
+    def __init__(self):
+        self.events = []
+
+    def log(self, event_type, content, parent_header=None):
+        self.events.append((event_type, content))
+
+
+def test_turn_telemetry_is_emitted(monkeypatch):
+    corpus = FakeCorpus()
+    monkeypatch.setattr(bunsen_context_module.Corpus, "from_dir", staticmethod(lambda corpus_dir: corpus))
+    monkeypatch.setattr(bunsen_context_module, "autodiscover_subkernels", lambda: {"python3": FakeSubkernel})
+    monkeypatch.setattr(bunsen_context_module, "histograms", HistogramRegistry())
+
+    context = FakeContext({"count": 1})
+    context.agent = None
+    context.beaker_kernel = FakeKernel()
+    context.start_corpus_loading("/corpus")
+
+    async def turn():
+        await context.auto_context()
+        await context.query_corpus("turn one", partition="documentation", limit=10)
+
+    context.current_llm_query = "turn one"
+    asyncio.run(turn())
+    # Starting the next turn emits the previous one
+    context.current_llm_query = "turn two"
+    asyncio.run(context.auto_context())
+    context.finish_turn_telemetry()
+
+    events = [content for event_type, content in context.beaker_kernel.events if event_type == "bunsen_turn_telemetry"]
+    assert [event["turn"] for event in events] == ["turn one", "turn two"]
+    first = events[0]
+    assert {"auto_context", "state.fetch", "prompt.section.state", "query.documentation", "prompt.assemble"} <= set(
+        first["spans_ms"]
+    )
+    assert first["counters"]["retrieval_cache.misses"] == 1 and first["counters"]["retrieval_cache.hits"] == 1
+    assert first["values"]["query.documentation.distance"] == [0.0]
+    assert first["values"]["prompt.tokens.state"][0] > 0
+
+    dump = context.dump_telemetry()
+    assert dump["auto_context.ms"]["count"] == 2
+    assert dump["retrieval_cache.misses"]["sum"] == 2
@@ -1,8 +1,26 @@
+import functools
+import hashlib
+import http.server
+import io
+import sys
+import tarfile
+import threading
+import zipfile
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
 from packaging.version import Version
 from urllib.parse import urlparse
 
+from beaker_bunsen.corpus.corpus import Corpus
+from beaker_bunsen.corpus.embedders import Embedder
 from beaker_bunsen.corpus.resources import isCodeResource, ResourceType
-from beaker_bunsen.corpus.loaders.code_library_loader import PythonLibraryLoader, RCRANSourceLoader, RCRANLocalCache
+from beaker_bunsen.corpus.types import URI
+from beaker_bunsen.corpus.loaders.code_library_loader import (
+    PythonArchiveLoader, PythonLibraryLoader, RCRANSourceLoader, RCRANLocalCache,
+)
+from beaker_bunsen.corpus.loaders.schemes import read_many, read_from_uri, split_derived_uri, stat_uri, tarball_index
 
 
 def test_python_module_discovery():
@@ -125,3 +143,356 @@ def test_r_cran_source_loader_w_filter():
     assert Version(RCRANLocalCache.remote_package_cache["jsonlite"]["version"]) > Version("1.8")
     assert len(resources) > 0
     assert resource_types == {ResourceType.Code,}
+
+
+def test_static_discovery_matches_import_discovery():
+    static_records = list(PythonLibraryLoader(static=True).discover(locations=["requests", "!__version__"]))
+    imported_records = list(PythonLibraryLoader(static=False).discover(locations=["requests", "!__version__"]))
+
+    assert [record.uri for record in static_records] == [record.uri for record in imported_records]
+    assert [record.content for record in static_records] == [record.content for record in imported_records]
+    assert 'py-mod:requests.__version__' not in [record.uri for record in static_records]
+
+
+def test_static_discovery_does_not_import(monkeypatch):
+    monkeypatch.syspath_prepend(str(Path(__file__).parent / "data" / "subproject" / "src"))
+    records = list(PythonLibraryLoader(static=True).discover(locations=["test_project"]))
+
+    assert "test_project" not in sys.modules
+    assert set(record.uri for record in records) == {
+        "py-mod:test_project",
+        "py-mod:test_project.agent",
+        "py-mod:test_project.context",
+    }
+
+
+def _build_cran_tarball(repo_dir: Path, package_name: str, version: str) -> str:
+    files = {
+        f"{package_name}/DESCRIPTION": f"Package: {package_name}\nVersion: {version}\n",
+        f"{package_name}/R/hello.R": "hello <- function() {\n  print('hello')\n}\n",
+        f"{package_name}/man/hello.Rd": "\\name{hello}\n\\title{Say hello}\n",
+    }
+    tarball_path = repo_dir / f"{package_name}_{version}.tar.gz"
+    with tarfile.open(tarball_path, "w:gz") as tar_file:
+        for name, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar_file.addfile(info, io.BytesIO(data))
+    return hashlib.md5(tarball_path.read_bytes()).hexdigest()
+
+
+def _build_cran_repo(repo_dir: Path) -> None:
+    toypkg_md5sum = _build_cran_tarball(repo_dir, "toypkg", "0.1.0")
+    otherpkg_md5sum = _build_cran_tarball(repo_dir, "otherpkg", "2.0")
+    (repo_dir / "PACKAGES").write_text(
+        "Package: toypkg\n"
+        "Version: 0.1.0\n"
+        "Depends: R (>= 3.0),\n"
+        "        methods\n"
+        f"MD5sum: {toypkg_md5sum}\n"
+        "\n"
+        "Package: otherpkg\n"
+        "Version: 2.0\n"
+        f"MD5sum: {otherpkg_md5sum}\n"
+    )
+
+
+@pytest.fixture
+def local_cran_repo(tmp_path):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    _build_cran_repo(repo_dir)
+    requests_log = []
+    flaky_paths = set()
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):
+            # Paths in `flaky_paths` fail once with a transient error before succeeding
+            if self.path in flaky_paths:
+                flaky_paths.discard(self.path)
+                self.send_error(503)
+                return
+            return super().do_GET()
+
+        def log_request(self, code="-", size="-"):
+            requests_log.append((self.path, int(code)))
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(repo_dir)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    RCRANLocalCache.remote_package_cache.clear()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", requests_log, flaky_paths
+    finally:
+        server.shutdown()
+        server.server_close()
+        RCRANLocalCache.remote_package_cache.clear()
+        RCRANLocalCache.remote_package_cache_repo = None
+
+
+def test_r_cran_local_cache_persists_and_works_offline(local_cran_repo, tmp_path):
+    repo, requests_log, _flaky_paths = local_cran_repo
+    cache_dir = tmp_path / "cache"
+
+    with RCRANLocalCache(["toypkg"], repo=repo, cache_dir=cache_dir) as cache:
+        tarball_path = Path(cache["toypkg"])
+    assert tarball_path == cache_dir / "tarballs" / "toypkg_0.1.0.tar.gz"
+    assert tarball_path.is_file()
+    assert RCRANLocalCache.remote_package_cache["toypkg"]["depends"] == "R (>= 3.0), methods"
+    assert "otherpkg" in RCRANLocalCache.remote_package_cache
+    assert [path for path, _ in requests_log] == ["/PACKAGES", "/toypkg_0.1.0.tar.gz"]
+
+    # A fresh process (empty in-memory caches) in offline mode is served entirely from disk.
+    RCRANLocalCache.remote_package_cache.clear()
+    requests_log.clear()
+    loader = RCRANSourceLoader(cache_dir=cache_dir, offline=True)
+    loader.REPO = repo
+    resources = list(loader.discover(locations=["toypkg"]))
+    assert requests_log == []
+    assert {resource.resource_type for resource in resources} == {ResourceType.Code, ResourceType.Documentation}
+    assert "rcran-package:toypkg/R/hello.R#toypkg" in [resource.uri for resource in resources]
+
+    with pytest.raises(LookupError):
+        with RCRANLocalCache(["otherpkg"], repo=repo, cache_dir=cache_dir, offline=True):
+            pass
+
+
+def test_r_cran_local_cache_revalidates_index(local_cran_repo, tmp_path):
+    repo, requests_log, _flaky_paths = local_cran_repo
+    cache_dir = tmp_path / "cache"
+
+    RCRANLocalCache(["toypkg"], repo=repo, cache_dir=cache_dir)
+    assert requests_log == [("/PACKAGES", 200)]
+
+    # Within the ttl, the cached index is used as-is
+    RCRANLocalCache.remote_package_cache.clear()
+    RCRANLocalCache(["toypkg"], repo=repo, cache_dir=cache_dir)
+    assert requests_log == [("/PACKAGES", 200)]
+
+    # Once expired, the index is revalidated with a conditional request
+    RCRANLocalCache.remote_package_cache.clear()
+    RCRANLocalCache(["toypkg"], repo=repo, cache_dir=cache_dir, index_ttl=0)
+    assert requests_log == [("/PACKAGES", 200), ("/PACKAGES", 304)]
+    assert RCRANLocalCache.remote_package_cache["toypkg"]["version"] == "0.1.0"
+
+
+def test_r_cran_local_cache_fetches_concurrently_with_retries(local_cran_repo, tmp_path):
+    repo, requests_log, flaky_paths = local_cran_repo
+    flaky_paths.update({"/toypkg_0.1.0.tar.gz", "/otherpkg_2.0.tar.gz"})
+
+    with RCRANLocalCache(["toypkg", "otherpkg", "toypkg@0.1.0"], repo=repo, cache_dir=tmp_path / "cache") as cache:
+        assert list(cache) == ["toypkg", "otherpkg", "toypkg@0.1.0"]
+        assert cache["toypkg"] == cache["toypkg@0.1.0"]
+        for tarball_path in cache.values():
+            assert Path(tarball_path).is_file()
+
+    tarball_requests = sorted(request for request in requests_log if request[0].endswith(".tar.gz"))
+    # Each tarball fails once and is retried, and the duplicated toypkg location is only downloaded once.
+    assert tarball_requests == [
+        ("/otherpkg_2.0.tar.gz", 200),
+        ("/otherpkg_2.0.tar.gz", 503),
+        ("/toypkg_0.1.0.tar.gz", 200),
+        ("/toypkg_0.1.0.tar.gz", 503),
+    ]
+
+
+def test_r_cran_source_loader_streams_tarball_members(local_cran_repo, tmp_path, monkeypatch):
+    repo, _requests_log, _flaky_paths = local_cran_repo
+    cache_dir = tmp_path / "cache"
+
+    loader = RCRANSourceLoader(cache_dir=cache_dir)
+    loader.REPO = repo
+    resources = list(loader.discover(locations=["toypkg", "!toypkg/man/"]))
+    assert [resource.uri for resource in resources] == ["rcran-package:toypkg/R/hello.R#toypkg"]
+    assert resources[0].content.startswith("hello <- function()")
+
+    # Nothing is extracted, and the member index is saved alongside the tarball
+    tarball_path = cache_dir / "tarballs" / "toypkg_0.1.0.tar.gz"
+    assert not (cache_dir / "sources").exists()
+    assert tarball_path.with_name(f"{tarball_path.name}.index.json").is_file()
+    tarball_index.clear()
+    assert set(tarball_index.get(tarball_path)) == {
+        "toypkg/DESCRIPTION", "toypkg/R/hello.R", "toypkg/man/hello.Rd",
+    }
+
+    # Reads go straight to the members via the index
+    monkeypatch.setenv("BUNSEN_OFFLINE", "1")
+    uris = ["rcran-package:toypkg/man/hello.Rd#toypkg", "rcran-package:toypkg/R/hello.R#toypkg"]
+    assert read_many(uris, repo=repo, cache_dir=cache_dir) == [
+        "\\name{hello}\n\\title{Say hello}\n", resources[0].content,
+    ]
+    assert read_from_uri(uris[1], repo=repo, cache_dir=cache_dir) == resources[0].content
+
+
+def test_r_cran_caches_are_kept_apart(local_cran_repo, tmp_path):
+    repo, requests_log, _flaky_paths = local_cran_repo
+
+    with RCRANLocalCache(["toypkg"], repo=repo, cache_dir=tmp_path / "first") as first:
+        pass
+    with RCRANLocalCache(["toypkg"], repo=repo, cache_dir=tmp_path / "second") as second:
+        pass
+    assert Path(first["toypkg"]).parent == tmp_path / "first" / "tarballs"
+    assert Path(second["toypkg"]).parent == tmp_path / "second" / "tarballs"
+
+    # Reads through a loader use the loader's cache, so an offline loader reads its cached tarball without fetching
+    requests_log.clear()
+    loader = RCRANSourceLoader(cache_dir=tmp_path / "second", offline=True)
+    loader.REPO = repo
+    uri = "rcran-package:toypkg/R/hello.R#toypkg"
+    assert loader.read(uri).startswith("hello <- function()")
+    assert loader.read_many([uri]) == [loader.read(uri)]
+    assert requests_log == []
+    assert stat_uri(uri, **loader.cache_options) is not None
+    assert stat_uri(uri, repo=repo, cache_dir=tmp_path / "empty") is None
+
+
+PACKAGE_SOURCES = {
+    "mypkg/__init__.py": "from .util import helper\n",
+    "mypkg/util.py": (
+        '"""Utilities."""\n'
+        "def helper():\n"
+        '    """\n'
+        "    Returns help.\n"
+        "\n"
+        "    >>> helper()\n"
+        "    'help'\n"
+        '    """\n'
+        "    return 'help'\n"
+        "\n"
+        "class Helper:\n"
+        '    """A helper."""\n'
+        "    def run(self, times=1):\n"
+        '        """Runs the helper."""\n'
+    ),
+    "mypkg/sub/__init__.py": "",
+    "mypkg/sub/mod.py": "VALUE = 1\n",
+}
+
+
+def _build_wheel(dist_dir: Path) -> Path:
+    wheel_path = dist_dir / "mypkg-1.0-py3-none-any.whl"
+    record_lines = [f"{name},," for name in PACKAGE_SOURCES] + ["mypkg-1.0.dist-info/RECORD,,"]
+    with zipfile.ZipFile(wheel_path, "w") as wheel:
+        for name, content in PACKAGE_SOURCES.items():
+            wheel.writestr(name, content)
+        wheel.writestr("mypkg-1.0.dist-info/top_level.txt", "mypkg\n")
+        wheel.writestr("mypkg-1.0.dist-info/RECORD", "\n".join(record_lines))
+    return wheel_path
+
+
+def _build_sdist(dist_dir: Path) -> Path:
+    sdist_path = dist_dir / "mypkg-1.0.tar.gz"
+    files = {
+        **{f"mypkg-1.0/src/{name}": content for name, content in PACKAGE_SOURCES.items()},
+        "mypkg-1.0/src/tests/__init__.py": "",
+        "mypkg-1.0/setup.py": "from setuptools import setup\nsetup()\n",
+    }
+    with tarfile.open(sdist_path, "w:gz") as tar_file:
+        for name, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar_file.addfile(info, io.BytesIO(data))
+    return sdist_path
+
+
+@pytest.mark.parametrize("build_archive", [_build_wheel, _build_sdist])
+def test_python_archive_loader_matches_installed_package(build_archive, tmp_path, monkeypatch):
+    dist_dir = tmp_path / "dist"
+    dist_dir.mkdir()
+    archive_path = build_archive(dist_dir)
+
+    # The same package, "installed" on sys.path
+    site_dir = tmp_path / "site"
+    for name, content in PACKAGE_SOURCES.items():
+        (site_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (site_dir / name).write_text(content)
+    monkeypatch.syspath_prepend(str(site_dir))
+
+    installed_resources = list(PythonLibraryLoader().discover(locations=["mypkg", "!mypkg.util"]))
+    archive_resources = list(PythonArchiveLoader().discover(locations=[str(archive_path), "!mypkg.util"]))
+
+    assert [URI(resource.uri).path for resource in archive_resources] == \
+        [URI(resource.uri).path for resource in installed_resources] == ["mypkg", "mypkg.sub", "mypkg.sub.mod"]
+    assert [resource.content for resource in archive_resources] == [resource.content for resource in installed_resources]
+    assert [resource.metadata for resource in archive_resources] == [resource.metadata for resource in installed_resources]
+    assert archive_resources[0].uri == f"py-archive:mypkg#{archive_path}"
+
+    # Modules can be read back from the archive without extracting it
+    uris = [resource.uri for resource in archive_resources]
+    assert read_many(uris) == [resource.content for resource in archive_resources]
+    assert read_from_uri(uris[-1]) == "VALUE = 1\n"
+    assert sorted(path.name for path in dist_dir.iterdir()) == [archive_path.name]
+
+
+def test_python_loader_derives_documentation_and_examples(tmp_path, monkeypatch):
+    for name, content in PACKAGE_SOURCES.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(content)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    loader = PythonLibraryLoader(derive_resources=True)
+    resources = {URI(resource.uri).path: resource for resource in loader.discover(locations=["mypkg"])}
+    derived = resources["mypkg.util"].derived_resources
+
+    assert [(resource.resource_type, resource.metadata["object"]) for resource in derived] == [
+        (ResourceType.Documentation, "mypkg.util"),
+        (ResourceType.Documentation, "mypkg.util.helper"),
+        (ResourceType.Example, "mypkg.util.helper"),
+        (ResourceType.Documentation, "mypkg.util.Helper"),
+        (ResourceType.Documentation, "mypkg.util.Helper.run"),
+    ]
+    assert derived[4].content == "`mypkg.util.Helper.run(self, times=1)`\n\nRuns the helper."
+    assert all(split_derived_uri(resource.uri)[0] == resources["mypkg.util"].uri for resource in derived)
+    assert len({resource.uri for resource in derived}) == len({resource.id for resource in derived}) == len(derived)
+
+    # Derived resources are read back by deriving them again from their module
+    assert read_many([resource.uri for resource in derived]) == [resource.content for resource in derived]
+    assert read_from_uri(derived[1].uri) == derived[1].content
+
+    example = derived[2]
+    example.validate(example.content)
+    assert ">>> " not in example.content
+    assert "helper()" in example.content and "'help'" in example.content
+
+    # Modules without docstrings don't derive anything, and deriving is opt in
+    assert resources["mypkg.sub.mod"].derived_resources == []
+    no_derived = PythonLibraryLoader().discover(locations=["mypkg"])
+    assert all(resource.derived_resources == [] for resource in no_derived)
+
+
+class WholeResourceEmbedder(Embedder):
+    def embed(self, resource, *args, **kwargs):
+        yield from resource.as_records(splitter=None)
+
+
+class RecordingStore:
+    def __init__(self):
+        self.records = []
+
+    def add_records(self, bundle, partition=None, data_loader=None):
+        self.records.extend((partition, record) for record in bundle)
+
+
+def test_derived_resources_go_to_their_own_partition(tmp_path, monkeypatch):
+    for name, content in PACKAGE_SOURCES.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(content)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    embedder_map = {resource_type: WholeResourceEmbedder() for resource_type in ResourceType}
+
+    store = RecordingStore()
+    Corpus(store=store).ingest(["py-mod:mypkg.util"], partition="code", embedder_map=embedder_map)
+    assert {partition for partition, _ in store.records} == {"code"}
+
+    store = RecordingStore()
+    Corpus(store=store).ingest(
+        ["py-mod:mypkg.util"], partition="code", embedder_map=embedder_map, derive_resources=True,
+    )
+    partitions = defaultdict(list)
+    for partition, record in store.records:
+        partitions[partition].append(record.uri)
+    assert partitions["code"] == ["py-mod:mypkg.util"]
+    assert partitions["examples"] == ["py-mod:mypkg.util?derived=example/mypkg.util.helper"]
+    assert "py-mod:mypkg.util?derived=documentation/mypkg.util.Helper.run" in partitions["documentation"]
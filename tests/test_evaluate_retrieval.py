@@ -0,0 +1,84 @@
+import json
+
+from click.testing import CliRunner
+
+from beaker_bunsen.corpus.corpus import Corpus
+from beaker_bunsen.corpus.types import Record
+from beaker_bunsen.scripts import evaluate_retrieval as evaluate_retrieval_module
+from beaker_bunsen.scripts.benchmark import BenchmarkStore
+
+
+def test_evaluate_retrieval_command(tmp_path, monkeypatch):
+    records = {
+        "documentation": [
+            Record(id="plot:1", uri="corpus-resource:documentation/guides/plotting.md", content="plot a histogram of values"),
+            Record(id="load:1", uri="corpus-resource:documentation/guides/loading.md", content="load a csv dataset"),
+        ],
+        "code": [
+            Record(id="api:1", uri="corpus-resource:code/mylib.api", content="def get(url):\n    pass"),
+            Record(id="hist:1", uri="corpus-resource:code/mylib.plots", content="def histogram(values):\n    # histogram of values\n    pass"),
+        ],
+    }
+    corpus = Corpus(store=BenchmarkStore(records))
+    monkeypatch.setattr(evaluate_retrieval_module.Corpus, "from_dir", staticmethod(lambda corpus_dir: corpus))
+
+    golden_path = tmp_path / "golden.yaml"
+    golden_path.write_text("""
+queries:
+  - query: plot a histogram
+    partition: documentation
+    expected: documentation/guides/plotting.md
+  - query: load a dataset
+    partition: documentation
+    expected: [guides/loading.md, guides/missing.md]
+  - query: histogram of values
+    partition: code
+    expected: mylib.plots.histogram
+  - query: fetch a url
+    partition: code
+    expected: [otherlib.fetch]
+""")
+    report_path = tmp_path / "report.json"
+    runner = CliRunner()
+    result = runner.invoke(
+        evaluate_retrieval_module.evaluate_retrieval_command,
+        [str(tmp_path), str(golden_path), "-k", "1", "-k", "2", "--repeat", "2", "--output", str(report_path)],
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_path.read_text())
+    documentation, code = report["partitions"]["documentation"], report["partitions"]["code"]
+    assert documentation["recall"] == {"@1": 0.75, "@2": 0.75} and documentation["mrr"] == 1.0
+    assert code["recall"] == {"@1": 0.5, "@2": 0.5} and code["misses"] == ["fetch a url"]
+    assert report["overall"]["queries"] == 4 and report["overall"]["mrr"] == 0.75
+    assert report["overall"]["latency_ms"]["p99"] >= report["overall"]["latency_ms"]["p50"] > 0
+    assert "overall" in result.output
+
+    # Gates fail the command
+    result = runner.invoke(
+        evaluate_retrieval_module.evaluate_retrieval_command,
+        [str(tmp_path), str(golden_path), "--min-recall", "0.6", "--recall-k", "1"],
+    )
+    assert result.exit_code != 0 and "code: recall@1 0.500 is below 0.600" in result.output
+
+    # A symbol matches its module or definition, not other modules of its package
+    golden = evaluate_retrieval_module.GoldenQuery(query="", partition="code", expected=["mylib.plots.histogram"])
+    package = Record(id="pkg:1", uri="corpus-resource:code/mylib", content="from .plots import *")
+    module = Record(id="plots:1", uri="corpus-resource:code/mylib.plots", content="import numpy")
+    derived = Record(
+        id="plots:2", uri="python-module:mylib.plots?derived=documentation/histogram", content="`histogram(values)`",
+        metadata={"object": "histogram"},
+    )
+    saved = Record(
+        id="plots:3", uri="corpus-resource:documentation/mylib.plots/example/histogram~2", content="histogram([1])",
+        metadata={"object": "histogram"},
+    )
+    other = Record(id="plots:4", uri="corpus-resource:documentation/mylib.plots/documentation/bar", content="",
+                   metadata={"object": "bar"})
+    assert not golden.matches("mylib.plots.histogram", package)
+    assert golden.matches("mylib.plots", module) and not golden.matches("mylib.plots.histogram", module)
+    assert golden.matches("mylib.plots.histogram", derived) and golden.matches("mylib.plots.histogram", saved)
+    assert not golden.matches("mylib.plots.histogram", other) and not golden.matches("otherlib.plots.histogram", saved)
+
+    # Latency needs at least one run
+    result = runner.invoke(evaluate_retrieval_module.evaluate_retrieval_command, [str(tmp_path), str(golden_path), "--repeat", "0"])
+    assert result.exit_code == 2 and "--repeat" in result.output
@@ -0,0 +1,103 @@
+import os
+import pytest
+from pathlib import Path
+
+from beaker_bunsen.corpus.loaders.exclusions import ExclusionMatcher
+from beaker_bunsen.corpus.loaders.local_file_loader import LocalFileLoader
+
+
+@pytest.fixture()
+def test_data_path():
+    return Path(__file__).parent / "data"
+
+
+def test_plain_patterns_match_substrings():
+    matcher = ExclusionMatcher(["ato", "__version__"])
+
+    assert matcher.matches("/home/user/recipes/irish_potato_caserole")
+    assert matcher.matches("requests/__version__")
+    assert not matcher.matches("/home/user/recipes/winter_risotto")
+
+
+def test_gitignore_patterns():
+    matcher = ExclusionMatcher(["*.tmp", "/build", "drafts/", "docs/**/secret*"])
+
+    assert matcher.matches("a/b/notes.tmp")
+    assert matcher.matches("build", is_dir=True)
+    assert matcher.matches("build/output.txt")
+    assert not matcher.matches("src/build", is_dir=True)
+    assert matcher.matches("src/drafts", is_dir=True)
+    assert matcher.matches("src/drafts/chapter_1.md")
+    assert not matcher.matches("src/drafts")
+    assert matcher.matches("docs/secret.md")
+    assert matcher.matches("docs/a/b/secret.md")
+    assert not matcher.matches("other/secret.md")
+
+
+def test_negation_last_match_wins():
+    matcher = ExclusionMatcher(["*.tmp", "!keep.tmp", "bad_keep.tmp"])
+
+    assert matcher.matches("x/scratch.tmp")
+    assert not matcher.matches("x/keep.tmp")
+    assert matcher.matches("x/bad_keep.tmp")
+
+
+def test_anchored_to_root():
+    matcher = ExclusionMatcher(["/recipes/*_soup"])
+
+    assert matcher.matches("/data/documents/recipes/ham_and_lentil_soup", root="/data/documents")
+    assert not matcher.matches("/data/documents/recipes/ham_and_lentil_soup", root="/data")
+
+
+def test_dotted_separator():
+    matcher = ExclusionMatcher(["requests.comp*", "!requests.compat"], separator=".")
+
+    assert matcher.matches("requests.compare")
+    assert not matcher.matches("requests.compat")
+    assert not matcher.matches("requests.api")
+
+
+def test_local_file_loader_glob_exclusions(test_data_path):
+    local_file_loader = LocalFileLoader()
+    roots = [test_data_path / "documents"]
+    found_files = set(
+        os.path.relpath(resource.uri.path, roots[0])
+        for resource in local_file_loader.discover(locations=[*roots, "!*.html", "!/recipes/*_*", "!!/recipes/tajine_*"])
+    )
+
+    assert found_files == {"yorkshire.txt", "recipes/tajine_maadnous"}
+
+
+def test_character_classes_are_literal():
+    matcher = ExclusionMatcher(["[a-]*.tmp", "file[\\d].txt", "[!x]y.md"])
+
+    assert matcher.matches("src/a.tmp")
+    assert matcher.matches("src/-.tmp")
+    assert not matcher.matches("src/b.tmp")
+    assert matcher.matches("file\\.txt")
+    assert matcher.matches("filed.txt")
+    assert not matcher.matches("file1.txt")
+    assert matcher.matches("docs/zy.md")
+    assert not matcher.matches("docs/xy.md")
+
+
+def test_names_match_any_path_component():
+    matcher = ExclusionMatcher(["__pycache__", "node_modules/", "*.egg-info/"])
+
+    assert matcher.matches("pkg/__pycache__/module.pyc")
+    assert matcher.matches("a/node_modules/b/c.js")
+    assert not matcher.matches("a/node_modules")
+    assert matcher.matches("a/node_modules", is_dir=True)
+    assert matcher.matches("dist/mylib.egg-info/PKG-INFO")
+    assert not matcher.matches("src/mylib.egg-info")
+
+
+def test_patterns_do_not_match_ancestors_of_the_root(tmp_path):
+    root = tmp_path / "build" / "docs"
+    (root / "build_notes").mkdir(parents=True)
+    (root / "index.md").write_text("# Index")
+    (root / "build_notes" / "todo.md").write_text("# Todo")
+    local_file_loader = LocalFileLoader(locations=[str(root)], exclusions=["bui*"])
+
+    found_files = {os.path.relpath(resource.uri.path, root) for resource in local_file_loader.discover()}
+    assert found_files == {"index.md"}
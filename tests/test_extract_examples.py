@@ -0,0 +1,241 @@
+import json
+import os
+
+from click.testing import CliRunner
+
+from beaker_bunsen.corpus.resources import ExampleResource
+from beaker_bunsen.corpus.util.example_harvester import harvest_examples, harvest_many
+from beaker_bunsen.scripts.extract_examples import extract_examples
+from beaker_bunsen.scripts.extraction_index import ExtractionIndex
+
+
+PYTHON_SOURCE = '''"""
+Module docs.
+
+>>> import mod
+>>> mod.add(1, 2)
+3
+"""
+
+def add(a, b):
+    """
+    Adds.
+
+    >>> add(2, 2)
+    4
+    """
+    return a + b
+'''
+
+MARKDOWN_DOC = """# Usage
+
+```python
+import mod
+mod.add(1, 2)
+```
+
+```bash
+pip install mod
+pip list
+```
+
+```{r, echo=FALSE}
+library(mod)
+add(1, 2)
+```
+"""
+
+RST_DOC = """Usage
+=====
+
+.. code-block:: python
+   :linenos:
+
+   import mod
+   mod.add(1, 2)
+
+Done.
+"""
+
+R_SOURCE = """#' Adds numbers
+#' @param a A number
+#' @examples
+#' add(1, 2)
+#' add(3, 4)
+#' @export
+add <- function(a, b) a + b
+"""
+
+RD_DOC = """\\name{add}
+\\title{Add}
+\\examples{
+add(1, 2)
+x <- 10 \\%\\% 3
+}
+"""
+
+
+def test_harvest_examples():
+    python_examples = harvest_examples(PYTHON_SOURCE, "py-mod:mod")
+    assert [(example.code, example.output, example.start_line, example.stop_line) for example in python_examples] == [
+        ("import mod\nmod.add(1, 2)\n", "3\n", 4, 6),
+        ("add(2, 2)\n", "4\n", 13, 14),
+    ]
+    assert "`mod.add`" in python_examples[1].description
+
+    markdown_examples = harvest_examples(MARKDOWN_DOC, "/docs/usage.md")
+    assert [(example.language, example.start_line, example.stop_line) for example in markdown_examples] == [
+        ("python", 4, 5),
+        ("r", 14, 15),
+    ]
+
+    rst_examples = harvest_examples(RST_DOC, "/docs/usage.rst")
+    assert [(example.code, example.language, example.start_line) for example in rst_examples] == [
+        ("import mod\nmod.add(1, 2)\n", "python", 7),
+    ]
+
+    r_examples = harvest_examples(R_SOURCE, "rcran-package:mod/R/add.R#mod")
+    assert [(example.code, example.start_line, example.stop_line) for example in r_examples] == [
+        ("add(1, 2)\nadd(3, 4)\n", 4, 5),
+    ]
+
+    rd_examples = harvest_examples(RD_DOC, "rcran-package:mod/man/add.Rd#mod")
+    assert [example.code for example in rd_examples] == ["add(1, 2)\nx <- 10 %% 3\n"]
+
+    assert harvest_examples("Nothing to see here.", "/docs/empty.md") == []
+
+    # Harvested examples are valid example resources
+    for example in python_examples + markdown_examples + rst_examples + r_examples + rd_examples:
+        ExampleResource(uri="examples:test.md", content=example.as_markdown()).validate(example.as_markdown())
+
+
+def test_harvest_many_in_parallel():
+    items = [(PYTHON_SOURCE, f"py-mod:mod{idx}") for idx in range(40)] + [("No examples", "/docs/none.md")]
+    serial = harvest_many(items, max_workers=1)
+    parallel = harvest_many(items, max_workers=2)
+    assert parallel == serial
+    assert len(parallel[0]) == 2 and parallel[-1] == []
+
+
+def test_extract_examples_without_llm(tmp_path, monkeypatch):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    (docs_dir / "usage.md").write_text(MARKDOWN_DOC)
+    (docs_dir / "notes.md").write_text("No examples in here.\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BUNSEN_CACHE_DIR", str(tmp_path / "cache"))
+
+    result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+
+    dest = tmp_path / "examples-unverified"
+    example_files = sorted(path.name for path in dest.glob("*.md"))
+    assert len(example_files) == 2
+    metadata = json.loads((dest / f"{example_files[0]}.metadata").read_text())
+    assert metadata["extraction_method"] == "harvested"
+    assert metadata["source_uri"].endswith("usage.md")
+    assert "source_sha256_hash" in metadata
+
+
+def test_extract_examples_skips_unchanged_sources(tmp_path, monkeypatch):
+    import beaker_bunsen.scripts.extract_examples as extract_examples_module
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    usage_path = docs_dir / "usage.md"
+    usage_path.write_text(MARKDOWN_DOC)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BUNSEN_CACHE_DIR", str(tmp_path / "cache"))
+    dest = tmp_path / "examples-unverified"
+
+    result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    first_examples = sorted(dest.glob("*.md"))
+    assert len(first_examples) == 2
+
+    # Unchanged sources are skipped on their stat signature, without being read
+    def fail_read(uri, *args, **kwargs):
+        raise AssertionError(f"{uri} should not have been read")
+    with monkeypatch.context() as patch:
+        patch.setattr(extract_examples_module, "read_from_uri", fail_read)
+        result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    assert "has not changed since it was last processed" in result.output
+    assert sorted(dest.glob("*.md")) == first_examples
+
+    # Touching a file without changing it only costs a hash
+    os.utime(usage_path, ns=(0, 0))
+    result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert "Hash for resource" in result.output
+    assert sorted(dest.glob("*.md")) == first_examples
+
+    # Changed sources are reprocessed and their previous examples removed
+    usage_path.write_text(MARKDOWN_DOC.replace("```python", "```python\nimport numpy", 1))
+    result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    second_examples = sorted(dest.glob("*.md"))
+    assert len(second_examples) == 2 and not set(first_examples) & set(second_examples)
+
+    with ExtractionIndex.for_directory(dest) as index:
+        indexed = index.get(f"file:{usage_path}")
+    assert sorted(indexed.example_files) == [str(path) for path in second_examples]
+
+
+def test_extract_examples_with_windowed_llm_requests(local_llm_endpoint, tmp_path, monkeypatch):
+    base_url, requests_log, _in_flight = local_llm_endpoint
+    docs_dir = tmp_path / "src"
+    docs_dir.mkdir()
+    module_lines = [f"value_{idx} = {idx}\n" for idx in range(500)]
+    module_lines[400:400] = ['if __name__ == "__main__":\n', "    print(value_1)\n"]
+    (docs_dir / "module.py").write_text("".join(module_lines))
+    (docs_dir / "constants.py").write_text("VALUE = 1\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BUNSEN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    result = CliRunner().invoke(extract_examples, [str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    # A single window around the `__main__` block is requested, and nothing for the module without candidates
+    assert len(requests_log) == 1
+    example_files = list((tmp_path / "examples-unverified").glob("*.md"))
+    assert len(example_files) == 1
+    metadata = json.loads(example_files[0].with_name(f"{example_files[0].name}.metadata").read_text())
+    assert (metadata["start_line"], metadata["stop_line"]) == (397, 405)
+    assert "print(value_1)" in example_files[0].read_text()
+
+
+def test_extract_examples_after_an_example_was_deleted(tmp_path, monkeypatch):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    usage_path = docs_dir / "usage.md"
+    usage_path.write_text(MARKDOWN_DOC)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BUNSEN_CACHE_DIR", str(tmp_path / "cache"))
+    dest = tmp_path / "examples-unverified"
+
+    result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    deleted, remaining = sorted(dest.glob("*.md"))
+    deleted.unlink()
+
+    # The source is reprocessed, and the example that is already gone is skipped when replacing its examples
+    result = CliRunner().invoke(extract_examples, ["--no-llm", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    examples = sorted(dest.glob("*.md"))
+    assert len(examples) == 2 and remaining not in examples
+    assert sorted(dest.glob("*.metadata")) == [path.with_name(f"{path.name}.metadata") for path in examples]
+    with ExtractionIndex.for_directory(dest) as index:
+        assert sorted(index.get(f"file:{usage_path}").example_files) == [str(path) for path in examples]
+
+    # Examples kept with --keep are still tracked, and are removed by the next run that replaces them
+    usage_path.write_text(MARKDOWN_DOC.replace("```python", "```python\nimport numpy", 1))
+    result = CliRunner().invoke(extract_examples, ["--no-llm", "--keep", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    kept_examples = sorted(dest.glob("*.md"))
+    assert len(kept_examples) == 4 and set(examples) < set(kept_examples)
+    with ExtractionIndex.for_directory(dest) as index:
+        assert sorted(index.get(f"file:{usage_path}").example_files) == [str(path) for path in kept_examples]
+
+    result = CliRunner().invoke(extract_examples, ["--no-llm", "--force", str(docs_dir)])
+    assert result.exit_code == 0, result.output
+    assert len(list(dest.glob("*.md"))) == 2 and not set(kept_examples) & set(dest.glob("*.md"))
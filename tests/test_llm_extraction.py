@@ -0,0 +1,88 @@
+import json
+
+import openai
+import pytest
+
+from beaker_bunsen.scripts.llm_extraction import (
+    ExtractionEngine, ExtractionRequest, ResponseCache, build_windows, merge_window_examples, parse_examples,
+)
+
+
+def test_extraction_engine(local_llm_endpoint, tmp_path):
+    base_url, requests_log, in_flight = local_llm_endpoint
+    requests = [
+        ExtractionRequest(prompt="Find examples", content=f"document {idx}{' flaky' if idx == 3 else ''}")
+        for idx in range(10)
+    ]
+
+    def make_engine():
+        client = openai.AsyncOpenAI(base_url=base_url, api_key="test", max_retries=0)
+        return ExtractionEngine(concurrency=3, cache=ResponseCache(tmp_path / "llm"), client=client)
+
+    engine = make_engine()
+    responses = engine.run(requests)
+    assert [json.loads(response)["line"] for response in responses] == [request.content for request in requests]
+    # Every request is made once, except the rate limited one which is retried
+    assert engine.requests_made == len(requests_log) == 11
+    assert requests_log.count("document 3 flaky") == 2
+    assert 1 < in_flight[1] <= 3
+
+    # A rerun is served entirely from the response cache
+    requests_log.clear()
+    engine = make_engine()
+    assert engine.run(requests) == responses
+    assert requests_log == []
+    assert engine.cache_hits == len(requests)
+
+
+def test_extraction_engine_does_not_cache_malformed_responses(local_llm_endpoint, tmp_path):
+    base_url, requests_log, _in_flight = local_llm_endpoint
+    cache = ResponseCache(tmp_path / "llm")
+    requests = [ExtractionRequest(prompt="Find examples", content="document malformed")]
+
+    def run():
+        client = openai.AsyncOpenAI(base_url=base_url, api_key="test", max_retries=0)
+        engine = ExtractionEngine(cache=cache, client=client)
+        return engine, engine.run(requests)[0]
+
+    engine, response = run()
+    with pytest.raises(ValueError):
+        parse_examples(response)
+    assert engine.requests_made == 1
+
+    # The malformed response wasn't cached, so the next run asks again and caches the good response
+    engine, response = run()
+    assert parse_examples(response) == [] and engine.requests_made == 1
+    engine, cached_response = run()
+    assert cached_response == response and engine.cache_hits == 1 and engine.requests_made == 0
+
+    # Malformed responses cached by earlier versions aren't replayed either
+    cache.set(cache.key(engine.model, requests[0]), engine.model, '{"line": "no examples"}')
+    engine, response = run()
+    assert engine.requests_made == 1 and engine.cache_hits == 0
+    assert len(requests_log) == 3
+
+
+def test_build_windows():
+    module_lines = [f"value_{idx} = {idx}\n" for idx in range(1000)]
+    module_lines[600:600] = ['if __name__ == "__main__":\n', "    print(value_1)\n"]
+    module_lines[100:100] = ['"""\n', "Usage::\n", "\n", "    value_1 + value_2\n", '"""\n']
+
+    # Only the regions that may hold examples are sent, packed in to one window, with their original line numbers
+    windows = build_windows(module_lines, "py-mod:mod", context=1)
+    assert [window.ranges for window in windows] == [[(101, 105), (605, 608)]]
+    rendered = windows[0].render(module_lines)
+    assert "   102 : Usage::\n" in rendered and "   607 :     print(value_1)\n" in rendered
+    assert "...\n" in rendered and "value_300" not in rendered
+    assert build_windows(["value = 1\n"] * 50, "py-mod:mod") == []
+
+    # Example documents are sent whole, split in to overlapping windows
+    windows = build_windows(module_lines, "file:/docs/examples/walkthrough.py", max_lines=400, overlap=40)
+    assert [window.ranges for window in windows] == [[(1, 400)], [(361, 760)], [(721, 1007)]]
+
+    examples = merge_window_examples(windows, [
+        [{"start_line": 10, "stop_line": 12}, {"start_line": 390, "stop_line": 410}],
+        [{"start_line": 395, "stop_line": 405}, {"start_line": 700, "stop_line": 702}],
+        [{"start_line": 700, "stop_line": 701}, {"start_line": 1, "stop_line": 2}],
+    ])
+    assert [(example["start_line"], example["stop_line"]) for example in examples] == [(10, 12), (395, 405), (700, 702)]
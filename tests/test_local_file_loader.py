@@ -141,3 +141,29 @@ def test_exclusions_discover():
     assert any([exclusion in filename for filename in files_from_os_walk])
     assert all([exclusion in filename for filename in excluded_files])
     assert all([exclusion not in filename for filename in found_files])
+
+def test_discovery_order_is_deterministic(test_data_path):
+    local_file_loader = LocalFileLoader(max_workers=4)
+    roots = [test_data_path / "documents", test_data_path / "images"]
+    first_pass = [record.uri for record in local_file_loader.discover(locations=roots)]
+    second_pass = [record.uri for record in local_file_loader.discover(locations=roots)]
+
+    assert first_pass == second_pass
+    # Files directly under a root are yielded before files in its subdirectories
+    assert first_pass.index(f"file:{test_data_path / 'documents' / 'yorkshire.txt'}") < first_pass.index(
+        f"file:{test_data_path / 'documents' / 'recipes' / 'winter_risotto'}"
+    )
+
+
+def test_path_filter(test_data_path):
+    opened_paths = []
+    local_file_loader = LocalFileLoader(path_filter=lambda path: "recipes" in path)
+    roots = [test_data_path / "documents"]
+    resources = list(local_file_loader.discover(
+        locations=roots,
+        filter=lambda resource: opened_paths.append(resource.uri) or True,
+    ))
+
+    assert len(resources) == 4
+    assert all("recipes" in uri for uri in opened_paths)
+    assert all(resource.metadata["collection"] == "recipe" for resource in resources)
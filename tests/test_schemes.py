@@ -4,9 +4,10 @@ import zipfile
 from pathlib import Path
 
 from beaker_bunsen.corpus.loaders.schemes import (
-    read_from_uri,
+    read_from_uri, read_many, module_path_index, zipfile_pool, ZipfilePool,
     LocalFileScheme, PythonModuleScheme, ZipfileScheme, CorpusResourceScheme,
 )
+from beaker_bunsen.corpus.loaders.code_library_loader import PythonLibraryLoader
 from beaker_bunsen.corpus.corpus import Corpus
 
 
@@ -47,6 +48,37 @@ def test_pythonmod_scheme(test_data_path):
     assert "class Charset:" in content
 
 
+def test_pythonmod_path_index(monkeypatch):
+    module_path_index.clear()
+    records = list(PythonLibraryLoader().discover(locations=["requests"]))
+    adapters_path = module_path_index.get("requests.adapters")
+
+    # Any resolution outside of the index would fail
+    monkeypatch.setattr(PythonModuleScheme, "resolve_module_path", staticmethod(lambda mod_name: None))
+    content = PythonModuleScheme.read("py-mod:requests.adapters")
+
+    assert len(records) > 5
+    assert adapters_path and adapters_path.endswith("adapters.py")
+    assert "class HTTPAdapter" in content
+
+    monkeypatch.syspath_prepend(str(Path(__file__).parent))
+    assert module_path_index.get("requests.adapters") is None
+
+
+def test_pythonmod_read_many(monkeypatch):
+    module_path_index.clear()
+    uris = ["py-mod:requests.adapters", "py-mod:uri_template.charset", "py-mod:requests.adapters"]
+    expected = [PythonModuleScheme.read(uri) for uri in uris]
+
+    # Indexed modules are read without resolving them again
+    monkeypatch.setattr(PythonModuleScheme, "resolve_module_path", staticmethod(lambda mod_name: None))
+    assert PythonModuleScheme.read_many(uris) == expected
+
+    module_path_index.clear()
+    with pytest.raises(FileNotFoundError, match="requests.adapters"):
+        PythonModuleScheme.read_many(uris)
+
+
 def test_read_from_uri(test_data_path):
     docfile_path = test_data_path / "documents" / "yorkshire.txt"
     docfile_abs_path = docfile_path.absolute()
@@ -98,6 +130,49 @@ def test_load_from_zipped_file(test_data_path):
     assert "This module contains the transport adapters that Requests uses" in innercontent
 
 
+def test_zipped_file_read_many(tmp_path):
+    zipfile_path = tmp_path / "archive.zip"
+    with zipfile.ZipFile(zipfile_path, "w") as archive:
+        archive.writestr("a.txt", "first")
+        archive.writestr("nested/b.txt", "second")
+        archive.writestr("c.bin", b"\xff\xfe")
+    uris = [
+        ZipfileScheme.get_uri_for_location(location=member, base=str(zipfile_path))
+        for member in ["nested/b.txt", "c.bin", "a.txt"]
+    ]
+
+    contents = ZipfileScheme.read_many(uris)
+    with zipfile_pool.open(zipfile_path) as first_handle, zipfile_pool.open(zipfile_path) as second_handle:
+        pass
+
+    assert contents == ["second", b"\xff\xfe", "first"]
+    assert first_handle is second_handle
+
+    # Rewriting the archive must not return stale content from a pooled handle
+    with zipfile.ZipFile(zipfile_path, "w") as archive:
+        archive.writestr("a.txt", "rewritten archive")
+    assert read_from_uri(uris[-1]) == "rewritten archive"
+
+
+def test_read_many_mixed_schemes(test_data_path, tmp_path):
+    zipfile_path = tmp_path / "archive.zip"
+    with zipfile.ZipFile(zipfile_path, "w") as archive:
+        archive.writestr("a.txt", "zipped content")
+    uris = [
+        f"file://{(test_data_path / 'documents' / 'yorkshire.txt').absolute()}",
+        "py-mod:uri_template.charset",
+        ZipfileScheme.get_uri_for_location(location="a.txt", base=str(zipfile_path)),
+        f"file://{(test_data_path / 'images' / 'kitten_hacker.jpg').absolute()}",
+        f"file://{(test_data_path / 'documents' / 'recipes' / 'winter_risotto').absolute()}",
+    ]
+
+    contents = read_many(uris)
+
+    assert contents == [read_from_uri(uri) for uri in uris]
+    assert contents[2] == "zipped content"
+    assert isinstance(contents[3], bytes)
+
+
 def test_load_resource_from_corpus_dir(test_data_path):
     corpus_path = test_data_path / "corpuses" / "test-corpus"
     resource_from_corpus = Path("code/requests.adapters")
@@ -120,3 +195,23 @@ def test_load_resource_from_corpus_dir(test_data_path):
     assert corpus_uri.startswith(CorpusResourceScheme.URI_SCHEME)
     assert "This module contains the transport adapters that Requests uses" in innercontent
     assert innercontent == rawcontent
+
+
+def test_zipfile_pool_keeps_evicted_handles_open_while_in_use(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("member.txt", name)
+        paths.append(path)
+    pool = ZipfilePool(max_size=1)
+
+    with pool.open(paths[0]) as first:
+        with pool.open(paths[1]) as second:
+            assert second.read("member.txt") == b"b"
+        # `first` was evicted when `second` was opened, but must stay usable until it is released
+        assert first.read("member.txt") == b"a"
+    assert first.fp is None
+    assert second.fp is not None
+    pool.clear()
+    assert second.fp is None
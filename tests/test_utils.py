@@ -1,5 +1,21 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+
 import pytest
-from beaker_bunsen.corpus.util.helpers import count_words, extract_md_codeblocks, extract_json, common_path_portion
+
+from beaker_bunsen.corpus.corpus import Corpus
+from beaker_bunsen.corpus.types import QueryResult, Record
+from beaker_bunsen.corpus.resources import DocumentationResource
+from beaker_bunsen.corpus.util.splitters import RecursiveCharacterTextSplitter
+from beaker_bunsen.corpus.util.context_packing import merge_adjacent_chunks, pack_matches, record_tokens
+from beaker_bunsen.corpus.util.retrieval_cache import RetrievalCache
+from beaker_bunsen.corpus.util.tracing import NullTracer, RecordingTracer, get_tracer, span, traced_iter, tracing
+from beaker_bunsen.corpus.util.telemetry import Histogram, HistogramRegistry, TurnTelemetry
+from beaker_bunsen.corpus.util.helpers import (
+    count_words, extract_md_codeblocks, extract_json, common_path_portion, estimate_tokens, token_count_method,
+)
 
 
 def test_word_count():
@@ -124,3 +140,175 @@ def test_distinct_path_portion():
     assert common_path_portion(paths_relative) == ""
     assert common_path_portion(paths_single) == "/usr/lib/systemd/system"
     assert common_path_portion([]) == ""
+
+
+def test_pack_matches():
+    text = " ".join(f"word{idx}" for idx in range(400))
+    resource = DocumentationResource(uri="file:/docs/guide.md", id="guide", content=text, content_is_complete=True)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=60, length_function=len)
+    chunks = list(resource.as_records(splitter=splitter))
+    assert len(chunks) > 4
+    assert all(chunk.metadata["token_count"] > 0 for chunk in chunks)
+    assert [chunk.metadata["chunk_num"] for chunk in chunks] == list(range(1, len(chunks) + 1))
+
+    def match(record, distance, **metadata):
+        if isinstance(record, str):
+            record = Record(id=record, content=metadata.pop("content"), metadata=metadata)
+        return QueryResult(record=record, distance=distance)
+
+    method = token_count_method()
+    matches = [
+        match(chunks[2], 0.1),
+        match(chunks[1], 0.3),
+        match(chunks[1], 0.35),
+        match(chunks[4], 0.2),
+        match("other:1", 0.4, content="A different document entirely", token_count=6, token_count_method=method),
+        match("copy:1", 0.5, content="a different document, entirely!", token_count=6, token_count_method=method),
+        match("far:1", 5.0, content="Not relevant", token_count=3, token_count_method=method),
+    ]
+
+    # Consecutive chunks are merged back together without repeating their overlap
+    merged = merge_adjacent_chunks(matches)
+    assert [m["record"].id for m in merged] == ["guide:2-3", "guide:5", "other:1", "copy:1", "far:1"]
+    assert merged[0]["distance"] == 0.1
+    joined = merged[0]["record"].content
+    assert chunks[1].content in joined and chunks[2].content in joined
+    assert len(joined) < len(chunks[1].content) + len(chunks[2].content)
+    assert record_tokens(merged[0]["record"]) == chunks[1].metadata["token_count"] + chunks[2].metadata["token_count"]
+
+    # Near duplicates and distant matches are dropped, and the budget is filled by relevance
+    packed = pack_matches(matches, token_budget=10_000, max_distance=1.0)
+    assert [m["record"].id for m in packed] == ["guide:2-3", "guide:5", "other:1"]
+    budget = record_tokens(merged[0]["record"]) + 6
+    packed = pack_matches(matches, token_budget=budget, max_distance=1.0)
+    assert [m["record"].id for m in packed] == ["guide:2-3", "other:1"]
+    assert pack_matches(matches, token_budget=0) == []
+
+    # Counts made by a different method than is used now are counted again, rather than compared with the others
+    recount = Record(id="recount:1", content=text, metadata={"token_count": 1, "token_count_method": "other"})
+    assert record_tokens(recount) == estimate_tokens(text) > 1
+    uncounted = Record(id="uncounted:1", content=None, metadata={"token_count": 7, "token_count_method": "other"})
+    assert record_tokens(uncounted) == 7
+
+
+def test_retrieval_cache():
+    queries = []
+
+    def make_query(response):
+        async def run_query():
+            queries.append(response)
+            await asyncio.sleep(0.01)
+            return response
+        return run_query
+
+    async def turn(cache: RetrievalCache, turn_id):
+        cache.start_turn(turn_id)
+        # Concurrent and repeated requests for the same key, modulo whitespace and case, share one query
+        first, second = await asyncio.gather(
+            cache.get_or_query("examples", "Plot a  graph", 10, make_query("a")),
+            cache.get_or_query("examples", "plot a graph ", 10, make_query("b")),
+        )
+        third = await cache.get_or_query("examples", "Plot a graph", 10, make_query("c"))
+        other_limit = await cache.get_or_query("examples", "Plot a graph", 3, make_query("d"))
+        return first, second, third, other_limit
+
+    cache = RetrievalCache()
+    assert asyncio.run(turn(cache, "turn 1")) == ("a", "a", "a", "d")
+    assert queries == ["a", "d"] and cache.hits == 2
+
+    # A new turn starts with an empty cache
+    assert asyncio.run(turn(cache, "turn 2")) == ("a", "a", "a", "d")
+    assert len(queries) == 4
+
+    # Kept for the session when sized, limited to the most recently used entries
+    cache = RetrievalCache(max_size=1)
+    queries.clear()
+    asyncio.run(turn(cache, "turn 1"))
+    asyncio.run(turn(cache, "turn 2"))
+    assert queries == ["a", "d", "a", "d"]
+    cache = RetrievalCache(max_size=8)
+    queries.clear()
+    asyncio.run(turn(cache, "turn 1"))
+    asyncio.run(turn(cache, "turn 2"))
+    assert queries == ["a", "d"]
+
+    # Failures are not cached
+    async def failing_query():
+        raise RuntimeError("store unavailable")
+
+    async def retry():
+        cache = RetrievalCache()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_query("docs", "query", 3, failing_query)
+        return await cache.get_or_query("docs", "query", 3, make_query("ok"))
+    assert asyncio.run(retry()) == "ok"
+
+
+def test_turn_telemetry_histograms():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value)
+    summary = histogram.as_dict()
+    assert summary["count"] == 100 and summary["min"] == 1 and summary["max"] == 100 and summary["mean"] == 50.5
+    assert summary["p50"] == 50 and summary["p95"] == summary["p99"] == 100
+    assert Histogram().as_dict()["p50"] is None
+
+    registry = HistogramRegistry()
+    telemetry = TurnTelemetry("turn")
+    with telemetry.span("query.examples"):
+        time.sleep(0.01)
+    telemetry.count("retrieval_cache.hits", 2)
+    telemetry.record("query.examples.distance", 0.25)
+    telemetry.record("query.examples.distance", 0.5)
+    event = telemetry.finish(registry)
+    assert event["turn"] == "turn" and event["spans_ms"]["query.examples"] >= 10
+    assert event["counters"] == {"retrieval_cache.hits": 2}
+    assert json.loads(json.dumps(event)) == event
+
+    dump = registry.dump()
+    assert set(dump) == {"query.examples.ms", "retrieval_cache.hits", "query.examples.distance"}
+    assert dump["query.examples.distance"]["count"] == 2 and dump["retrieval_cache.hits"]["sum"] == 2
+
+
+class RecordingStore:
+    def __init__(self):
+        self.records = []
+
+    def add_records(self, bundle, partition=None, data_loader=None):
+        self.records.extend((partition, record) for record in bundle)
+
+
+def test_tracing_corpus_ingest():
+    # Off by default, at the cost of a call
+    assert not get_tracer().enabled
+    items = [1, 2]
+    assert traced_iter(items, "stage") is items
+    assert span("stage") is span("other")
+
+    store = RecordingStore()
+    examples_dir = Path(__file__).parent / "data" / "examples"
+    tracer = RecordingTracer(trace_memory=True)
+    with tracing(tracer):
+        with span("corpus.ingest"):
+            Corpus(store=store).ingest(locations=[f"examples:{examples_dir}"], batch_size=2)
+    tracer.close()
+    assert isinstance(get_tracer(), NullTracer)
+    assert store.records
+
+    summary = tracer.summary()
+    assert {"corpus.ingest", "loader.discover", "embedder.embed", "store.add_records"} <= set(summary)
+    assert summary["corpus.ingest"]["count"] == 1 and summary["corpus.ingest"]["memory_delta_kb"] is not None
+    assert "store.add_records" in tracer.format_summary()
+    assert tracer.top_allocations("corpus.ingest")
+
+    trace = json.loads(json.dumps(tracer.chrome_trace()))
+    events = trace["traceEvents"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    ingest = next(event for event in events if event["name"] == "corpus.ingest")
+    # Every other span is nested within the ingest span
+    assert all(
+        ingest["ts"] <= event["ts"] and event["ts"] + event["dur"] <= ingest["ts"] + ingest["dur"] + 1
+        for event in events
+    )
+    added = sum(event["args"]["records"] for event in events if event["name"] == "store.add_records")
+    assert added == len(store.records)